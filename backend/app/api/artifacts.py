@@ -0,0 +1,89 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+import re
+from typing import Optional, Tuple
+import logging
+
+from app.services.artifact_store import artifact_store
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single `bytes=start-end` range into an inclusive (start, end); None if unsatisfiable"""
+    match = _RANGE_RE.match(header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+    if not match.group(1):
+        # Suffix range: the last N bytes
+        length = int(match.group(2))
+        if length == 0:
+            return None
+        return max(0, size - length), size - 1
+    start = int(match.group(1))
+    end = int(match.group(2)) if match.group(2) else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+@router.get("/stats")
+async def get_artifact_stats():
+    """Get artifact store usage and eviction statistics"""
+    return await artifact_store.stats()
+
+
+@router.post("/evict")
+async def run_artifact_eviction():
+    """Run one eviction pass now"""
+    try:
+        return await artifact_store.evict()
+    except Exception as e:
+        logger.error(f"Artifact eviction failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Artifact eviction failed: {str(e)}")
+
+
+@router.get("/{digest}")
+async def get_artifact(digest: str, request: Request):
+    """Serve an artifact by content hash with ETag revalidation and byte-range support"""
+    try:
+        if not _DIGEST_RE.match(digest):
+            raise HTTPException(status_code=404, detail="Artifact not found")
+        artifact = await artifact_store.get(digest)
+        if artifact is None:
+            raise HTTPException(status_code=404, detail="Artifact not found")
+
+        # Content never changes for a digest, so the digest is a strong ETag
+        etag = f'"{digest}"'
+        headers = {
+            "ETag": etag,
+            "Accept-Ranges": "bytes",
+            "Cache-Control": "public, max-age=31536000, immutable",
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            return Response(status_code=304, headers=headers)
+
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and (not if_range or if_range.strip() == etag):
+            byte_range = _parse_range(range_header, artifact.size)
+            if byte_range is None:
+                return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{artifact.size}"})
+            start, end = byte_range
+            content = await artifact_store.read(artifact, start, end - start + 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{artifact.size}"
+            return Response(content=content, status_code=206, media_type=artifact.content_type, headers=headers)
+
+        content = await artifact_store.read(artifact)
+        return Response(content=content, media_type=artifact.content_type, headers=headers)
+    except HTTPException:
+        raise
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Artifact content missing")
+    except Exception as e:
+        logger.error(f"Failed to serve artifact {digest}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to serve artifact: {str(e)}")
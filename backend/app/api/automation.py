@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert
 import uuid
 import logging
+from datetime import datetime, timezone
 from typing import Dict, Any, List
 
 from app.models.database import get_db
 from app.models.task import Task
 from app.models.execution import Execution, ExecutionCreate, ExecutionResponse
+from app.config import settings
 from app.models.file import File as FileModel
-from app.services.automation import AutomationEngine, automation_engines, websocket_manager
+from app.services.automation import automation_engines, hibernation_stats, control_engine
+from app.services.engine_registry import engine_registry
+from app.services.execution_queue import execution_queue, ACTIVE_STATUSES
+from app.services.worker_pool import worker_pool
+from app.services.browser_pool import browser_pool
+from app.services.progress_writer import progress_writer
+from app.services.screenshots import screenshot_pipeline
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -20,24 +28,128 @@ router = APIRouter()
 async def end_session(session_id: str):
     """Fully close the browser and VNC session, freeing resources."""
     try:
-        if session_id not in automation_engines:
+        # Runs on the worker owning the engine, which also removes it from the registry
+        result = await control_engine(session_id, "end_session")
+        if not result["found"]:
+            if await execution_queue.cancel(session_id):
+                return {"message": "Queued execution cancelled", "session_id": session_id}
             # If engine already gone, consider it already closed
             return {"message": "Session already closed", "session_id": session_id}
-        engine = automation_engines[session_id]
-        await engine.end_session()
-        # Remove engine from registry
-        del automation_engines[session_id]
+        execution_queue.wake()
         return {"message": "Session closed", "session_id": session_id}
     except Exception as e:
         logger.error(f"Failed to close session {session_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to close session: {str(e)}")
 class ExecuteRequest(BaseModel):
-    file_id: int
+    file_id: Optional[int] = None  # Required for scripted tasks; optional for step-based tasks
+    force: bool = False  # Re-run records already applied by earlier executions of the task
+    priority: int = 0  # Higher starts first when the execution queue is backed up
+    user_id: Optional[str] = None  # Submitting user, for fair scheduling across users
+
+class BulkExecuteItem(BaseModel):
+    task_id: int
+    file_id: Optional[int] = None
+    force: bool = False
+    priority: Optional[int] = None  # Defaults to the request-level priority
+
+class BulkExecuteRequest(BaseModel):
+    items: List[BulkExecuteItem]
+    priority: int = 0
+    user_id: Optional[str] = None
+
+@router.post("/execute/bulk")
+async def execute_bulk(
+    request: BulkExecuteRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Queue many (task, file) executions at once; invalid items are rejected individually"""
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items to execute.")
+    if len(request.items) > settings.bulk_execute_max_items:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.bulk_execute_max_items} items per bulk request."
+        )
+    try:
+        task_ids = {item.task_id for item in request.items}
+        file_ids = {item.file_id for item in request.items if item.file_id}
+        tasks = {
+            t.id: t for t in (await db.execute(select(Task).where(Task.id.in_(task_ids)))).scalars()
+        }
+        files = {}
+        if file_ids:
+            files = {
+                f.id: f for f in (await db.execute(
+                    select(FileModel.id, FileModel.task_id).where(FileModel.id.in_(file_ids))
+                )).all()
+            }
+
+        queued_at = datetime.now(timezone.utc)
+        results: List[Dict[str, Any]] = []
+        rows: List[Dict[str, Any]] = []
+        for index, item in enumerate(request.items):
+            entry: Dict[str, Any] = {"index": index, "task_id": item.task_id, "file_id": item.file_id}
+            task = tasks.get(item.task_id)
+            error = None
+            if not task:
+                error = f"Task {item.task_id} not found"
+            elif item.file_id and item.file_id not in files:
+                error = f"File with id {item.file_id} not found."
+            elif item.file_id and files[item.file_id].task_id != item.task_id:
+                error = "File does not belong to this task."
+            if error:
+                results.append({**entry, "status": "rejected", "error": error})
+                continue
+            session_id = str(uuid.uuid4())
+            rows.append({
+                "session_id": session_id,
+                "task_id": item.task_id,
+                "status": "queued",
+                "total_steps": len(task.steps) if task.steps else 0,
+                "file_id": item.file_id,
+                "priority": request.priority if item.priority is None else item.priority,
+                "user_id": request.user_id,
+                "queued_at": queued_at,
+                "launch_options": {"force": item.force}
+            })
+            results.append({**entry, "status": "queued", "session_id": session_id})
+
+        if rows:
+            # One multi-row INSERT; the queue is woken once for the whole group
+            inserted = await db.execute(
+                insert(Execution).returning(Execution.session_id, Execution.id), rows
+            )
+            execution_ids = {session_id: execution_id for session_id, execution_id in inserted.all()}
+            await db.commit()
+            execution_queue.wake()
+            positions = await execution_queue.positions(list(execution_ids))
+            for entry in results:
+                if entry["status"] == "queued":
+                    entry["execution_id"] = execution_ids.get(entry["session_id"])
+                    entry.update(positions.get(entry["session_id"], {}))
+
+        logger.info(f"Bulk queued {len(rows)} executions ({len(results) - len(rows)} rejected)")
+
+        return {
+            "accepted": len(rows),
+            "rejected": len(results) - len(rows),
+            "session_ids": [entry["session_id"] for entry in results if entry["status"] == "queued"],
+            "items": results
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to bulk execute: {str(e)}")
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to start automations: {str(e)}"
+        )
 
 @router.post("/execute/{task_id}")
 async def execute_task(
     task_id: int,
-    background_tasks: BackgroundTasks,
     request: ExecuteRequest,
     db: AsyncSession = Depends(get_db)
 ):
@@ -66,42 +178,35 @@ async def execute_task(
             if file_record.task_id != task_id:
                 raise HTTPException(status_code=400, detail="File does not belong to this task.")
 
-        # Create execution record
+        # Create execution record; the queue starts it once capacity allows
         execution = Execution(
             session_id=session_id,
             task_id=task_id,
-            status="pending",
+            status="queued",
             total_steps=len(task.steps) if task.steps else 0,
-            file_id=file_id
+            file_id=file_id,
+            priority=request.priority,
+            user_id=request.user_id,
+            queued_at=datetime.now(timezone.utc),
+            launch_options={"force": request.force}
         )
         
         db.add(execution)
         await db.commit()
         await db.refresh(execution)
         
-        # Create automation engine
-        engine = AutomationEngine(session_id, websocket_manager)
-        engine.execution_id = execution.id
-        automation_engines[session_id] = engine
-        
-        # Convert task data
-        task_data = {
-            "id": task.id,
-            "name": task.name,
-            "steps": task.steps,
-            "script_path": task.script_path
-        }
-        
-        # Start automation in background
-        background_tasks.add_task(engine.execute_task, task_data, file=file_record, execution_id=execution.id)
+        execution_queue.wake()
+        queue_status = await execution_queue.status(session_id)
         
-        logger.info(f"Started automation for task {task_id}, session {session_id}")
+        logger.info(f"Queued automation for task {task_id}, session {session_id}")
         
         return {
             "session_id": session_id,
             "task_id": task_id,
-            "status": "started",
-            "message": "Automation started successfully"
+            "status": "queued",
+            "position": queue_status.get("position"),
+            "eta_seconds": queue_status.get("eta_seconds"),
+            "message": "Automation queued"
         }
         
     except HTTPException:
@@ -114,19 +219,87 @@ async def execute_task(
             detail=f"Failed to start automation: {str(e)}"
         )
 
+@router.post("/executions/{execution_id}/resume")
+async def resume_execution(
+    execution_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """Re-run a failed, stopped or interrupted execution, skipping records that already succeeded"""
+    try:
+        execution = await db.get(Execution, execution_id)
+        if not execution:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Execution {execution_id} not found"
+            )
+        if execution.status == "completed":
+            raise HTTPException(status_code=400, detail="Execution already completed.")
+        if execution.status == "queued":
+            raise HTTPException(status_code=409, detail="Execution is already queued.")
+
+        if execution.status in ACTIVE_STATUSES:
+            raise HTTPException(status_code=409, detail="Execution is still running.")
+
+        previous = await control_engine(execution.session_id, "status")
+        if previous["found"]:
+            # Release the browser/VNC session held open for manual control
+            await control_engine(execution.session_id, "end_session")
+
+        task = await db.get(Task, execution.task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail=f"Task {execution.task_id} not found")
+
+        # The execution row (and its record checkpoints) is reused under a new session
+        session_id = str(uuid.uuid4())
+        execution.session_id = session_id
+        execution.status = "queued"
+        execution.queued_at = datetime.now(timezone.utc)
+        execution.launch_options = {**(execution.launch_options or {}), "resume": True}
+        execution.error_message = None
+        execution.end_time = None
+        await db.commit()
+
+        execution_queue.wake()
+        queue_status = await execution_queue.status(session_id)
+
+        logger.info(f"Queued resume of execution {execution_id} as session {session_id}")
+
+        return {
+            "session_id": session_id,
+            "execution_id": execution.id,
+            "task_id": execution.task_id,
+            "status": "queued",
+            "position": queue_status.get("position"),
+            "eta_seconds": queue_status.get("eta_seconds"),
+            "message": "Execution queued to resume from last checkpoint"
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to resume execution {execution_id}: {str(e)}")
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to resume execution: {str(e)}"
+        )
+
 @router.post("/pause/{session_id}")
 async def pause_automation(session_id: str):
     """Pause automation"""
     try:
-        if session_id not in automation_engines:
+        result = await control_engine(session_id, "pause")
+        if not result["found"]:
+            if await execution_queue.is_queued(session_id):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Execution is still queued; it can be paused once it starts, or cancelled with stop"
+                )
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Automation session {session_id} not found"
             )
         
-        engine = automation_engines[session_id]
-        await engine.pause(engine.execution_id)
-        
         return {"message": "Automation paused", "session_id": session_id}
         
     except HTTPException:
@@ -142,15 +315,18 @@ async def pause_automation(session_id: str):
 async def resume_automation(session_id: str):
     """Resume automation"""
     try:
-        if session_id not in automation_engines:
+        result = await control_engine(session_id, "resume")
+        if not result["found"]:
+            if await execution_queue.is_queued(session_id):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Execution is still queued and has not started yet"
+                )
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Automation session {session_id} not found"
             )
         
-        engine = automation_engines[session_id]
-        await engine.resume(engine.execution_id)
-        
         return {"message": "Automation resumed", "session_id": session_id}
         
     except HTTPException:
@@ -166,15 +342,15 @@ async def resume_automation(session_id: str):
 async def stop_automation(session_id: str):
     """Stop automation but keep the VNC session/browser open for manual control"""
     try:
-        if session_id not in automation_engines:
+        result = await control_engine(session_id, "stop")
+        if not result["found"]:
+            if await execution_queue.cancel(session_id):
+                return {"message": "Queued execution cancelled", "session_id": session_id}
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Automation session {session_id} not found"
             )
         
-        engine = automation_engines[session_id]
-        await engine.stop(engine.execution_id)
-        
         # IMPORTANT: do NOT delete the engine here so manual control remains available
         return {"message": "Automation stopped (manual control available)", "session_id": session_id}
         
@@ -206,8 +382,9 @@ async def get_automation_status(
                 detail=f"Execution {session_id} not found"
             )
         
-        # Check if engine is still present (manual control may still be available even if not running)
-        is_active = session_id in automation_engines
+        # Check if engine is still present on any worker (manual control may still be available even if not running)
+        engine_status = await control_engine(session_id, "status")
+        is_active = engine_status["found"]
         
         return {
             "session_id": session_id,
@@ -215,6 +392,7 @@ async def get_automation_status(
             "current_step": execution.current_step,
             "total_steps": execution.total_steps,
             "is_active": is_active,
+            "is_hibernated": bool(engine_status.get("is_hibernated")),
             "start_time": execution.start_time,
             "end_time": execution.end_time,
             "error_message": execution.error_message
@@ -228,3 +406,45 @@ async def get_automation_status(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get status: {str(e)}"
         )
+
+@router.get("/pool/stats")
+async def get_browser_pool_stats():
+    """Get warm browser pool statistics"""
+    return browser_pool.stats()
+
+@router.get("/progress-writer/stats")
+async def get_progress_writer_stats():
+    """Get write-behind progress buffer statistics"""
+    return progress_writer.stats()
+
+@router.get("/screenshots/stats")
+async def get_screenshot_stats():
+    """Get screenshot pipeline statistics"""
+    return screenshot_pipeline.stats()
+
+@router.get("/queue/stats")
+async def get_execution_queue_stats():
+    """Get execution queue depth and dispatcher statistics"""
+    return {**(await execution_queue.status()), **execution_queue.stats()}
+
+@router.get("/registry/stats")
+async def get_engine_registry_stats():
+    """Get this worker's engine registry statistics"""
+    return {**engine_registry.stats(), "local_engines": len(automation_engines)}
+
+@router.get("/workers/stats")
+async def get_worker_stats():
+    """Get execution worker processes and their reported load"""
+    return {**worker_pool.stats(), "workers": await engine_registry.workers()}
+
+@router.get("/hibernation/stats")
+async def get_hibernation_stats():
+    """Get idle browser hibernation statistics"""
+    restore_ms = sorted(hibernation_stats["restore_ms"])
+    return {
+        "hibernated": hibernation_stats["hibernated"],
+        "restored": hibernation_stats["restored"],
+        "currently_hibernated": sum(1 for e in automation_engines.values() if e.hibernated),
+        "restore_ms_p50": restore_ms[len(restore_ms) // 2] if restore_ms else None,
+        "restore_ms_max": restore_ms[-1] if restore_ms else None
+    }
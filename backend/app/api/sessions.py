@@ -1,5 +1,7 @@
 from fastapi import APIRouter, HTTPException, Request
 from app.config import settings
+from app.services.execution_queue import execution_queue
+from typing import Optional
 import httpx
 
 router = APIRouter()
@@ -43,8 +45,9 @@ async def list_sessions(request: Request):
     return await forward(request, "GET", "/api/sessions")
 
 @router.get("/queue/status")
-async def queue_status(request: Request):
-    return await forward(request, "GET", "/api/sessions/queue/status")
+async def queue_status(session_id: Optional[str] = None):
+    """Execution queue depth; with `session_id`, that execution's position and ETA"""
+    return await execution_queue.status(session_id)
 
 @router.get("/stats")
 async def stats(request: Request):
@@ -29,6 +29,8 @@ async def create_task(
             description=task_data.description,
             steps=steps_data,
             prerequisites=prerequisites_data,
+            network_policy=task_data.network_policy.model_dump() if task_data.network_policy else None,
+            auth_profile=task_data.auth_profile.model_dump() if task_data.auth_profile else None,
             status="draft"
         )
         
@@ -128,6 +130,14 @@ async def update_task(
         if "prerequisites" in update_data and update_data["prerequisites"]:
             update_data["prerequisites"] = [prereq.model_dump() for prereq in task_update.prerequisites]
         
+        # Handle network policy conversion
+        if "network_policy" in update_data and update_data["network_policy"]:
+            update_data["network_policy"] = task_update.network_policy.model_dump()
+
+        # Handle auth profile conversion
+        if "auth_profile" in update_data and update_data["auth_profile"]:
+            update_data["auth_profile"] = task_update.auth_profile.model_dump()
+        
         for field, value in update_data.items():
             setattr(task, field, value)
         
@@ -1,21 +1,43 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import asyncio
 import logging
 import json
 
-from app.services.automation import websocket_manager
+from app.config import settings
+from app.services.automation import websocket_manager, automation_engines, control_engine
+from app.services.engine_registry import engine_registry
+from app.services.screencast import ScreencastSession
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+async def _signal_remote_engine(session_id: str, command: str):
+    """Keep an engine owned by another worker awake while this worker has viewers"""
+    try:
+        await control_engine(session_id, command)
+    except Exception as e:
+        logger.debug(f"Failed to send '{command}' to remote engine {session_id}: {e}")
+
 @router.websocket("/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """WebSocket endpoint for real-time automation updates"""
+    screencast = None
+    subscriber = None
     try:
-        await websocket_manager.connect(websocket, session_id)
+        subscriber = await websocket_manager.connect(websocket, session_id)
+
+        # A returning viewer wakes a hibernated browser
+        engine = automation_engines.get(session_id)
+        if engine:
+            engine.touch()
+            if engine.hibernated:
+                asyncio.create_task(engine.restore())
+        elif engine_registry.enabled:
+            asyncio.create_task(_signal_remote_engine(session_id, "wake"))
         logger.info(f"WebSocket connected for session: {session_id}")
         
         # Send initial connection message
-        await websocket.send_json({
+        await subscriber.send_json({
             "type": "connection",
             "status": "connected",
             "session_id": session_id,
@@ -31,27 +53,85 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 
                 # Handle different message types
                 message_type = message.get("type")
+                engine = automation_engines.get(session_id)
+                if engine:
+                    engine.touch()
+                elif engine_registry.enabled and message_type in ("ping", "heartbeat"):
+                    asyncio.create_task(_signal_remote_engine(session_id, "touch"))
                 
                 if message_type == "ping":
                     # Respond to ping with pong
-                    await websocket.send_json({
+                    await subscriber.send_json({
                         "type": "pong",
                         "timestamp": message.get("timestamp")
                     })
                 
                 elif message_type == "heartbeat":
                     # Respond to heartbeat
-                    await websocket.send_json({
+                    await subscriber.send_json({
                         "type": "heartbeat_ack",
                         "session_id": session_id
                     })
                 
+                elif message_type == "screencast_start":
+                    # Lightweight viewer: stream JPEG frames from the engine's page instead of VNC
+                    if engine and engine.hibernated:
+                        await engine.restore()
+                    if not engine and settings.execution_workers > 0:
+                        # Pages live in the worker processes; frames are not relayed to the API process
+                        await subscriber.send_json({
+                            "type": "error",
+                            "message": "Screencast unavailable in worker-pool mode (EXECUTION_WORKERS > 0); use the VNC viewer"
+                        })
+                        continue
+                    if not engine or not engine.page:
+                        await subscriber.send_json({
+                            "type": "error",
+                            "message": "No active browser page for this session"
+                        })
+                        continue
+                    if screencast:
+                        await screencast.stop()
+                    screencast = ScreencastSession(
+                        engine.page,
+                        subscriber.send_json,
+                        quality=message.get("quality"),
+                        max_fps=message.get("max_fps"),
+                        max_width=message.get("max_width"),
+                        max_height=message.get("max_height")
+                    )
+                    await screencast.start()
+                    await subscriber.send_json({
+                        "type": "screencast_started",
+                        "quality": screencast.quality,
+                        "max_fps": screencast.max_fps
+                    })
+
+                elif message_type == "screencast_ack":
+                    if screencast:
+                        screencast.ack(int(message.get("frame_id", 0)))
+
+                elif message_type == "screencast_stop":
+                    if screencast:
+                        await screencast.stop()
+                        await subscriber.send_json({
+                            "type": "screencast_stopped",
+                            "stats": screencast.stats()
+                        })
+                        screencast = None
+
+                elif message_type == "screencast_stats":
+                    await subscriber.send_json({
+                        "type": "screencast_stats",
+                        "stats": screencast.stats() if screencast else None
+                    })
+                
                 else:
                     logger.warning(f"Unknown message type: {message_type}")
                 
             except json.JSONDecodeError:
                 logger.error(f"Invalid JSON received from {session_id}")
-                await websocket.send_json({
+                await subscriber.send_json({
                     "type": "error",
                     "message": "Invalid JSON format"
                 })
@@ -65,4 +145,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     except Exception as e:
         logger.error(f"WebSocket error for session {session_id}: {str(e)}")
     finally:
-        websocket_manager.disconnect(session_id)
+        if screencast:
+            await screencast.stop()
+        if subscriber:
+            websocket_manager.disconnect(session_id, subscriber)
@@ -1,9 +1,72 @@
 import logging
 import asyncio
-from typing import Dict, Any, Callable
+import time
+from typing import Dict, Any, Callable, List
+
+from app.services.wait_strategies import wait_for_dom_quiescence
+from app.services.locator_cache import LocatorCache
+from app.services.screenshots import screenshot_pipeline
 
 logger = logging.getLogger(__name__)
 
+ROUTE_APP_URL = "https://angularformadd.netlify.app/"
+# How long the form must stop mutating before the next record starts
+SETTLE_QUIET_MS = 150
+# Upper bound on that wait, so a page that never stops mutating (spinner, clock) costs little
+SETTLE_TIMEOUT_MS = 3000
+
+
+async def _add_route(locators: LocatorCache, start_location, end_location, price):
+    """Fill and save a single route through the app form"""
+    # Click the "Add New Route" button
+    await locators.role("button", name="+ Add New Route").click()
+    
+    # Fill in the start location
+    await locators.role("textbox", name="Enter start location").fill(str(start_location))
+    
+    # Fill in the end location  
+    await locators.role("textbox", name="Enter end location").fill(str(end_location))
+    
+    # Fill in the price
+    await locators.placeholder("0.00").fill(str(price))
+    
+    # Save the route
+    await locators.role("button", name="Save Route").click()
+
+
+def _summary(success_count: int, total_records: int) -> str:
+    if success_count == total_records:
+        return f"Successfully added all {success_count} routes!"
+    return f"Added {success_count} of {total_records} routes; {total_records - success_count} failed."
+
+
+async def _settle(page, record_number: int):
+    """Wait for the UI to settle after saving instead of a fixed delay; logs when the bound is hit"""
+    settle = await wait_for_dom_quiescence(page, quiet_ms=SETTLE_QUIET_MS, timeout=SETTLE_TIMEOUT_MS)
+    if not settle.satisfied:
+        logger.warning(f"Record {record_number}: page still mutating after {SETTLE_TIMEOUT_MS}ms, continuing")
+    return settle
+
+
+async def _capture_result(page, progress_callback):
+    """Show the results panel and capture the final state"""
+    # Click the FAB button (⚡) to show the results
+    await page.get_by_role("button", name="⚡").click()
+    
+    # Let the results panel finish rendering before capturing it
+    await wait_for_dom_quiescence(page, quiet_ms=SETTLE_QUIET_MS)
+
+    # Only the raw capture blocks; encoding and upload report back through the callback
+    timestamp = int(time.time())
+    screenshot_name = await screenshot_pipeline.capture(
+        page, f"route_automation_result_{timestamp}", on_stored=progress_callback
+    )
+    logger.info(f"Screenshot captured: {screenshot_name}")
+    await progress_callback({
+        "message": f"Screenshot captured: {screenshot_name}"
+    })
+
+
 async def run_automation_async(
     page,  # Use existing page from AutomationEngine
     progress_callback: Callable[[Dict[str, Any]], None],
@@ -33,7 +96,9 @@ async def run_automation_async(
 
     try:
         # Navigate to the sample app (using existing page)
-        await page.goto("https://angularformadd.netlify.app/")
+        await page.goto(ROUTE_APP_URL)
+        locators = LocatorCache(page)
+        unsettled = 0
         
         # Insert all 7 routes
         for i, record in enumerate(records, 1):
@@ -51,30 +116,21 @@ async def run_automation_async(
                     "success_count": success_count
                 })
 
-                # Click the "Add New Route" button
-                await page.get_by_role("button", name="+ Add New Route").click()
-                
-                # Fill in the start location
-                await page.get_by_role("textbox", name="Enter start location").fill(str(start_location))
-                
-                # Fill in the end location  
-                await page.get_by_role("textbox", name="Enter end location").fill(str(end_location))
-                
-                # Fill in the price
-                await page.get_by_placeholder("0.00").fill(str(price))
-                
-                # Save the route
-                await page.get_by_role("button", name="Save Route").click()
-                
-                # Small delay to see the action and allow UI to update
-                await asyncio.sleep(1)
+                await _add_route(locators, start_location, end_location, price)
+
+                settle = await _settle(page, i)
+                unsettled += not settle.satisfied
 
                 success_count += 1
                 
                 await progress_callback({
                     "message": f"Successfully processed record {i}/{total_records}.",
                     "processed_count": i,
-                    "success_count": success_count
+                    "success_count": success_count,
+                    "record_number": i,
+                    "record_status": "succeeded",
+                    "wait": settle.to_dict(),
+                    "locator_cache": locators.stats()
                 })
                 
             except Exception as e:
@@ -82,32 +138,161 @@ async def run_automation_async(
                 await progress_callback({
                     "message": f"Error processing record {i}: {e}",
                     "processed_count": i,
+                    "record_number": i,
+                    "record_status": "failed",
                     "error": str(e)
                 })
         
         # Final status update
         await progress_callback({
             "status": "completed",
-            "message": f"Successfully added all {success_count} routes!",
-            "success_count": success_count
+            "message": _summary(success_count, total_records),
+            "success_count": success_count,
+            "unsettled_waits": unsettled
         })
         
-        # Click the FAB button (⚡) to show the results
-        await page.get_by_role("button", name="⚡").click()
-        
-        # Take a screenshot to capture the final state
-        import time
-        timestamp = int(time.time())
-        screenshot_path = f"/screenshots/route_automation_result_{timestamp}.png"
-        await page.screenshot(path=screenshot_path)
-        logger.info(f"Screenshot saved: {screenshot_path}")
+        await _capture_result(page, progress_callback)
+
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during automation: {e}", exc_info=True)
         await progress_callback({
-            "message": f"Screenshot captured: {screenshot_path}",
-            "screenshot": screenshot_path
+            "status": "failed",
+            "message": f"An unexpected error occurred: {e}",
+            "error": str(e)
         })
-        
-        # Wait to ensure all UI updates are visible
-        await asyncio.sleep(3)
+        raise
+
+
+async def run_automation_sharded(
+    pages: List[Any],
+    progress_callback: Callable[[Dict[str, Any]], None],
+    records
+):
+    """
+    Sharded variant of run_automation_async.
+
+    Records are split round-robin across the given pages and processed
+    concurrently. Progress from all shards is aggregated so the callback sees
+    the same `processed_count` / `success_count` contract as the serial run.
+    If a shard aborts, each of its unprocessed records is reported failed.
+
+    The pages are expected to share one browser context, so the shards share
+    the target app's cookies and localStorage. This script only adds
+    independent records to a form, which is safe under that constraint; a
+    script whose records depend on per-session app state must not be sharded.
+
+    Args:
+        pages: Playwright page instances, one per shard. The first page is
+            used for the final results screenshot.
+        progress_callback: A function to send real-time progress updates.
+    """
+    if not records:
+        raise ValueError("No records provided.")
+    if not pages:
+        raise ValueError("No pages provided.")
+
+    total_records = len(records)
+    shard_count = min(len(pages), total_records)
+    counters = {"processed_count": 0, "success_count": 0, "unsettled": 0}
+
+    await progress_callback({
+        "status": "running",
+        "message": f"Starting automation for {total_records} records across {shard_count} shards.",
+        "processed_count": 0,
+        "total_records": total_records,
+        "success_count": 0,
+        "shards": shard_count
+    })
+
+    finished = set()
+
+    async def run_shard(shard_index: int, page, shard_records):
+        await page.goto(ROUTE_APP_URL)
+        locators = LocatorCache(page)
+        for i, record in shard_records:
+            try:
+                start_location = record.get("start_location")
+                end_location = record.get("end_location")
+                price = record.get("price")
+
+                if not all([start_location, end_location, price is not None]):
+                    raise ValueError("Record is missing required fields.")
+
+                await progress_callback({
+                    "message": f"[shard {shard_index}] Adding route {i}/{total_records}: {start_location} → {end_location}",
+                    "processed_count": counters["processed_count"],
+                    "success_count": counters["success_count"],
+                    "shard": shard_index
+                })
+
+                await _add_route(locators, start_location, end_location, price)
+
+                settle = await _settle(page, i)
+                counters["unsettled"] += not settle.satisfied
+
+                counters["processed_count"] += 1
+                counters["success_count"] += 1
+                await progress_callback({
+                    "message": f"[shard {shard_index}] Successfully processed record {i}/{total_records}.",
+                    "processed_count": counters["processed_count"],
+                    "success_count": counters["success_count"],
+                    "record_number": i,
+                    "record_status": "succeeded",
+                    "shard": shard_index,
+                    "wait": settle.to_dict(),
+                    "locator_cache": locators.stats()
+                })
+                finished.add(i)
+
+            except Exception as e:
+                finished.add(i)
+                counters["processed_count"] += 1
+                logger.error(f"Shard {shard_index} failed to process record {i}: {e}")
+                await progress_callback({
+                    "message": f"Error processing record {i}: {e}",
+                    "processed_count": counters["processed_count"],
+                    "record_number": i,
+                    "record_status": "failed",
+                    "error": str(e),
+                    "shard": shard_index
+                })
+
+    # Round-robin keeps shards balanced and preserves 1-based record numbering
+    numbered = list(enumerate(records, 1))
+    shards = [numbered[n::shard_count] for n in range(shard_count)]
+    results = await asyncio.gather(
+        *(run_shard(n, pages[n], shard) for n, shard in enumerate(shards)),
+        return_exceptions=True
+    )
+
+    # A shard that dies outside the per-record handler (e.g. navigation) only loses its own records;
+    # report each of them failed so checkpoints and resume see them
+    for n, result in enumerate(results):
+        if isinstance(result, Exception):
+            logger.error(f"Shard {n} aborted: {result}")
+            for i, _ in shards[n]:
+                if i in finished:
+                    continue
+                counters["processed_count"] += 1
+                await progress_callback({
+                    "message": f"Error processing record {i}: shard {n} aborted: {result}",
+                    "processed_count": counters["processed_count"],
+                    "record_number": i,
+                    "record_status": "failed",
+                    "error": f"Shard {n} aborted: {result}",
+                    "shard": n
+                })
+
+    try:
+        # Final status update
+        await progress_callback({
+            "status": "completed",
+            "message": _summary(counters["success_count"], total_records),
+            "success_count": counters["success_count"],
+            "unsettled_waits": counters["unsettled"]
+        })
+
+        await _capture_result(pages[0], progress_callback)
 
     except Exception as e:
         logger.error(f"An unexpected error occurred during automation: {e}", exc_info=True)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings
 from pydantic import AliasChoices, Field
 
@@ -24,6 +24,20 @@ class Settings(BaseSettings):
     upload_dir: str = "/app/uploads"
     screenshot_dir: str = "/app/screenshots"
     max_upload_size: int = 10485760
+
+    # Screenshot pipeline settings
+    screenshot_format: str = "webp"  # webp, jpeg or png
+    screenshot_quality: int = 80
+    screenshot_thumbnail_width: int = 320  # 0 disables thumbnails
+    screenshot_workers: int = 2  # threads encoding and uploading captures
+    screenshot_drain_timeout: float = 30.0  # seconds an execution waits for pending uploads
+
+    # Artifact store settings
+    artifact_global_quota_bytes: int = 5368709120  # 5GB across all artifacts, met by evicting unreferenced ones; 0 disables
+    artifact_task_quota_bytes: int = 1073741824  # 1GB of distinct artifacts per task, met by unlinking the oldest runs' artifacts (their URLs then 404); 0 disables
+    artifact_max_age_days: int = 30  # evict unreferenced artifacts not accessed for this long, even within quota; 0 disables
+    artifact_orphan_grace_minutes: int = 60  # quota eviction never takes unreferenced artifacts accessed more recently than this
+    artifact_eviction_interval: int = 600  # seconds between eviction passes; 0 disables the job
     
     # VNC settings
     VNC_PUBLIC_HOST: str = "localhost"
@@ -37,9 +51,74 @@ class Settings(BaseSettings):
     playwright_timeout: int = 30000
     playwright_viewport_width: int = 1920
     playwright_viewport_height: int = 1080
+
+    # Browser pool settings
+    browser_pool_min_size: int = 1
+    browser_pool_max_size: int = 4
+    browser_pool_contexts_per_browser: int = 8
+    browser_pool_max_uses: int = 50
+    browser_pool_health_interval: int = 30
+
+    # Shared static asset cache settings
+    asset_cache_enabled: bool = False
+    asset_cache_dir: str = "/app/asset_cache"
+    asset_cache_max_bytes: int = 536870912  # 512MB
+    asset_cache_ttl_seconds: int = 3600  # revalidate with ETag/Last-Modified after this
+    asset_cache_offline: bool = False  # serve only from cache, never fetch static assets
+    asset_cache_har_import: Optional[str] = None  # HAR file to seed the cache at startup
+    asset_cache_har_export: Optional[str] = None  # HAR file written at shutdown
+
+    # Idle hibernation settings
+    hibernate_idle_minutes: int = 15  # 0 disables hibernation of finished, unwatched sessions
+    hibernate_check_interval: int = 30  # seconds between idle checks
+
+    # Automation execution settings
+    progress_flush_interval_ms: int = 1000  # max age of buffered execution progress
+    progress_flush_max_pending: int = 50  # buffered updates that trigger an early flush
+    automation_shard_count: int = 1  # pages processing records concurrently per execution
+    dedup_enabled: bool = False  # opt-in: skip records a task already applied in earlier executions (?force=true re-runs them)
+    dedup_lookup_chunk_size: int = 1000  # record hashes checked per query
+    locator_cache_enabled: bool = True  # pin role/placeholder locators to CSS handles in opted-in scripts
+    locator_cache_attempt_timeout_ms: int = 1000  # how long an action tries a pinned handle before re-resolving
+    trace_buffer_enabled: bool = True  # keep rolling per-record trace chunks, saved only on failure
+    trace_buffer_chunks: int = 3  # chunks (records) kept before a failure; sharded runs keep one whole-run chunk instead
+    trace_buffer_screenshots: bool = False  # include screencast frames in traces (larger, slower)
+    latency_publish_interval_ms: int = 2000  # how often live action latency summaries go to viewers
+
+    # Authenticated state cache settings
+    auth_state_ttl_minutes: int = 60  # cached login state lifetime unless the task's auth profile overrides it
+    auth_probe_timeout_ms: int = 5000  # how long the logged-in probe waits before forcing a fresh login
+    auth_state_encryption_key: Optional[str] = None  # defaults to a key derived from secret_key
+    auth_login_lock_seconds: int = 300  # cross-process login lock expiry (engine registry); bounds a crashed holder
     
+    # Execution queue settings
+    execution_max_concurrent: int = 4  # executions holding a browser at once; finished runs kept open are hibernated to admit queued ones
+    queue_poll_interval: float = 2.0  # seconds between dispatcher passes when not woken
+    queue_priority_aging_minutes: int = 10  # queued executions gain one priority level per interval; 0 disables
+    queue_user_weights: Dict[str, float] = {}  # user_id -> share weight (default 1.0)
+    queue_task_weights: Dict[str, float] = {}  # task id -> share weight (default 1.0)
+    queue_default_duration_seconds: int = 120  # ETA basis before any execution has finished
+    bulk_execute_max_items: int = 500  # items accepted by one bulk execute request
+    execution_workers: int = 0  # worker processes running engines; 0 runs them in the API process
+    execution_worker_max_engines: int = 2  # engines (including ones held for manual control) per worker process
+    execution_worker_restart_delay: float = 5.0  # seconds before a crashed worker is restarted
+    execution_worker_stop_timeout: float = 30.0  # seconds a worker gets to stop its engines on shutdown
+
+    # Multi-worker engine registry settings
+    engine_registry_enabled: bool = False  # required when running more than one uvicorn worker
+    redis_url: str = "redis://redis:6379/0"
+    engine_heartbeat_interval: int = 10  # seconds; a worker is presumed dead after three missed beats
+    engine_command_timeout: float = 10.0  # seconds to wait for the owning worker to answer
+
     # WebSocket settings
     ws_heartbeat_interval: int = 30
+    ws_send_queue_size: int = 100  # per-connection outbound messages before progress is dropped
+
+    # Screencast viewer settings
+    screencast_default_quality: int = 60
+    screencast_default_max_fps: float = 5.0
+    screencast_max_fps: float = 15.0
+    screencast_ack_timeout: float = 2.0
 
     # Multi-session settings
     enable_multi_session: bool = Field(default=False, validation_alias=AliasChoices('enable_multi_session', 'ENABLE_MULTI_SESSION'))
@@ -14,8 +14,17 @@ from app.config import settings
 from app.models.database import init_db, AsyncSessionLocal
 from app.models.task import Task
 from sqlalchemy import select
-from app.services.automation import AutomationEngine
-from app.api import tasks, automation, files, websocket, sessions, test_browser
+from app.services.automation import AutomationEngine, automation_engines, websocket_manager, run_engine_command
+from app.services.browser_pool import browser_pool
+from app.services.asset_cache import asset_cache
+from app.services.progress_writer import progress_writer
+from app.services.checkpoints import checkpoint_writer
+from app.services.screenshots import screenshot_pipeline
+from app.services.artifact_store import artifact_store
+from app.services.engine_registry import engine_registry
+from app.services.execution_queue import execution_queue
+from app.services.worker_pool import worker_pool
+from app.api import tasks, automation, files, websocket, sessions, test_browser, artifacts
 
 
 # Configure logging
@@ -49,9 +58,48 @@ async def lifespan(app: FastAPI):
             )
             db.add(new_task)
             await db.commit()
+
+    if settings.asset_cache_enabled:
+        try:
+            await asset_cache.load()
+            if settings.asset_cache_har_import:
+                await asset_cache.import_har(settings.asset_cache_har_import)
+        except Exception as e:
+            logger.error(f"Asset cache initialization failed: {str(e)}")
+
+    await artifact_store.start()
+    try:
+        await engine_registry.start(
+            run_engine_command,
+            websocket_manager.deliver_local,
+            wake_handler=execution_queue.wake_local,
+            load_provider=lambda: {"role": "api", **execution_queue.load()}
+        )
+    except Exception as e:
+        logger.error(f"Engine registry startup failed: {str(e)}")
+    # With a worker pool this process only enqueues; the workers dispatch and run engines
+    pooled = await worker_pool.start()
+    if not pooled:
+        # Pre-warm the shared browser pool; executions fall back to lazy launch on failure
+        try:
+            await browser_pool.start()
+        except Exception as e:
+            logger.error(f"Browser pool warm-up failed: {str(e)}")
+    await execution_queue.start(dispatch=not pooled)
     yield
     # On shutdown
-    # (any cleanup logic here)
+    await execution_queue.shutdown()
+    await worker_pool.shutdown()
+    await engine_registry.shutdown(list(automation_engines.keys()))
+    await artifact_store.shutdown()
+    await screenshot_pipeline.shutdown()
+    await checkpoint_writer.shutdown()
+    await progress_writer.shutdown()
+    await browser_pool.shutdown()
+    if settings.asset_cache_enabled:
+        await asset_cache.flush()
+        if settings.asset_cache_har_export:
+            await asset_cache.export_har(settings.asset_cache_har_export)
 
 # Create FastAPI app
 app = FastAPI(lifespan=lifespan)
@@ -74,6 +122,7 @@ app.include_router(tasks.router, prefix="/api/tasks", tags=["tasks"])
 app.include_router(automation.router, prefix="/api/automation", tags=["automation"])
 app.include_router(files.router, prefix="/api/files", tags=["files"])
 app.include_router(sessions.router, prefix="/api/sessions", tags=["sessions"])
+app.include_router(artifacts.router, prefix="/api/artifacts", tags=["artifacts"])
 app.include_router(test_browser.router, prefix="/api/test-browser", tags=["test-browser"])
 app.include_router(websocket.router, prefix="/ws", tags=["websocket"])
 
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.models.database import Base
+
+class Artifact(Base):
+    """A stored blob keyed by the sha256 of its content; identical captures share one row"""
+    __tablename__ = "artifacts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    digest = Column(String(64), unique=True, nullable=False, index=True)  # sha256 hex of the content
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(100), nullable=False)
+    storage_path = Column(String(500), nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)  # number of ExecutionArtifact rows pointing here
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ExecutionArtifact(Base):
+    """Reference from an execution to an artifact it produced"""
+    __tablename__ = "execution_artifacts"
+    __table_args__ = (UniqueConstraint("execution_id", "artifact_id", name="uq_execution_artifact"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    execution_id = Column(Integer, ForeignKey("executions.id", ondelete="CASCADE"), nullable=False, index=True)
+    artifact_id = Column(Integer, ForeignKey("artifacts.id", ondelete="CASCADE"), nullable=False, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=True, index=True)  # for per-task quotas
+    name = Column(String(255), nullable=True)  # e.g. route_automation_result_1700000000.webp
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
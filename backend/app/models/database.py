@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, MetaData, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
@@ -34,6 +34,30 @@ async def get_db():
         finally:
             await session.close()
 
+# Columns added to tables that existing databases already have; create_all never
+# alters an existing table, so init_db adds these idempotently
+ADDED_COLUMNS = [
+    ("tasks", "network_policy"),
+    ("tasks", "auth_profile"),
+    ("executions", "metrics"),
+    ("executions", "priority"),
+    ("executions", "user_id"),
+    ("executions", "queued_at"),
+    ("executions", "launch_options"),
+]
+
+def _add_missing_columns(conn):
+    for table_name, column_name in ADDED_COLUMNS:
+        column = Base.metadata.tables[table_name].c[column_name]
+        ddl = f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column_name} {column.type.compile(dialect=conn.dialect)}"
+        if column.server_default is not None:
+            ddl += f" DEFAULT {column.server_default.arg}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+        conn.execute(text(ddl))
+        if column.index:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table_name}_{column_name} ON {table_name} ({column_name})"))
+
 async def init_db():
     """Initialize database"""
     try:
@@ -42,9 +66,12 @@ async def init_db():
             from app.models.task import Task
             from app.models.execution import Execution
             from app.models.file import File
+            from app.models.record_index import AppliedRecord
+            from app.models.artifact import Artifact, ExecutionArtifact
 
             # Create all tables
             await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(_add_missing_columns)
             
         logger.info("Database initialized successfully")
     except Exception as e:
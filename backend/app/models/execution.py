@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Boolean, ForeignKey, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.models.database import Base
@@ -12,7 +12,7 @@ class Execution(Base):
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String(255), unique=True, nullable=False, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
-    status = Column(String(50), nullable=False)  # pending, running, paused, completed, failed
+    status = Column(String(50), nullable=False)  # queued, pending, running, paused, completed, failed, cancelled
     current_step = Column(Integer, default=0)
     total_steps = Column(Integer, default=0)
     
@@ -23,11 +23,31 @@ class Execution(Base):
     error_message = Column(Text, nullable=True)
     screenshots = Column(JSON, nullable=True)  # List of screenshot paths
     logs = Column(JSON, nullable=True)  # Execution logs
+    metrics = Column(JSON, nullable=True)  # Performance telemetry keyed by subsystem
+    priority = Column(Integer, nullable=False, default=0, server_default="0")  # Higher runs first among queued executions
+    user_id = Column(String(255), nullable=True, index=True)  # Submitter, used for fair scheduling
+    queued_at = Column(DateTime(timezone=True), nullable=True)
+    launch_options = Column(JSON, nullable=True)  # Engine flags applied when the queue starts it (force, resume)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     task = relationship("Task", back_populates="executions")
     file = relationship("File", back_populates="executions")
+    records = relationship("ExecutionRecord", back_populates="execution", cascade="all, delete-orphan")
+
+class ExecutionRecord(Base):
+    """Per-record outcome checkpoint, used to resume an execution where it stopped"""
+    __tablename__ = "execution_records"
+    __table_args__ = (UniqueConstraint("execution_id", "record_index", name="uq_execution_record"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    execution_id = Column(Integer, ForeignKey("executions.id", ondelete="CASCADE"), nullable=False, index=True)
+    record_index = Column(Integer, nullable=False)  # 0-based row index in the source file
+    status = Column(String(50), nullable=False)  # succeeded, failed, skipped (already applied by an earlier execution)
+    error_message = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    execution = relationship("Execution", back_populates="records")
 
 # Pydantic models for API
 class ExecutionCreate(BaseModel):
@@ -54,6 +74,10 @@ class ExecutionResponse(BaseModel):
     error_message: Optional[str]
     screenshots: Optional[List[str]]
     logs: Optional[List[Dict[str, Any]]]
+    metrics: Optional[Dict[str, Any]] = None
+    priority: int = 0
+    user_id: Optional[str] = None
+    queued_at: Optional[datetime] = None
     created_at: datetime
     
     class Config:
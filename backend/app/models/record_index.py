@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.models.database import Base
+
+class AppliedRecord(Base):
+    """Content hash of a record already applied by a task, used to skip re-uploaded rows"""
+    __tablename__ = "applied_records"
+    __table_args__ = (UniqueConstraint("task_id", "record_hash", name="uq_applied_record"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    record_hash = Column(String(64), nullable=False)  # sha256 of the normalized record
+    last_execution_id = Column(Integer, ForeignKey("executions.id", ondelete="SET NULL"), nullable=True)
+    applied_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
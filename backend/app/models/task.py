@@ -16,6 +16,8 @@ class Task(Base):
     prerequisites = Column(JSON, nullable=True)  # File requirements, etc.
     status = Column(String(50), default="draft")  # draft, ready, running, completed, failed
     script_path = Column(String(255), nullable=True) # Path to the automation script
+    network_policy = Column(JSON, nullable=True)  # Resource blocking rules applied to the browser context
+    auth_profile = Column(JSON, nullable=True)  # Login steps and probe used to reuse cached authenticated state
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -30,6 +32,21 @@ class TaskStep(BaseModel):
     value: Optional[str] = None  # Text to type, option to select, etc.
     description: Optional[str] = None
 
+class NetworkPolicy(BaseModel):
+    block_resource_types: List[str] = []  # image, font, media, stylesheet, ...
+    block_url_patterns: List[str] = []  # URL globs, e.g. "*.woff2" or "https://cdn.example.com/*"
+    block_hosts: List[str] = []  # Hosts (and their subdomains) to block
+    allow_hosts: List[str] = []  # Hosts never blocked, overriding the rules above
+    block_trackers: bool = False  # Block well-known analytics/ad hosts
+
+class AuthProfile(BaseModel):
+    name: Optional[str] = None  # Shared credential profile; tasks with the same name share one cached login
+    login_steps: List[TaskStep]  # Steps that log in; may use {{ field }} bound from credentials_env
+    probe_url: Optional[str] = None  # Page to open when checking whether the session is still logged in
+    probe_selector: str  # Element only visible when logged in
+    credentials_env: Dict[str, str] = {}  # Template field -> environment variable holding the secret
+    ttl_minutes: Optional[int] = None  # Overrides AUTH_STATE_TTL_MINUTES
+
 class TaskPrerequisite(BaseModel):
     type: str  # file_upload, environment_variable, etc.
     name: str
@@ -42,6 +59,8 @@ class TaskCreate(BaseModel):
     steps: Optional[List[TaskStep]] = None # Make steps optional
     prerequisites: Optional[List[TaskPrerequisite]] = None
     script_path: Optional[str] = None # Add script_path
+    network_policy: Optional[NetworkPolicy] = None
+    auth_profile: Optional[AuthProfile] = None
 
 class TaskUpdate(BaseModel):
     name: Optional[str] = None
@@ -50,6 +69,8 @@ class TaskUpdate(BaseModel):
     prerequisites: Optional[List[TaskPrerequisite]] = None
     status: Optional[str] = None
     script_path: Optional[str] = None # Add script_path
+    network_policy: Optional[NetworkPolicy] = None
+    auth_profile: Optional[AuthProfile] = None
 
 class TaskResponse(BaseModel):
     id: int
@@ -59,6 +80,8 @@ class TaskResponse(BaseModel):
     prerequisites: Optional[List[TaskPrerequisite]]
     status: str
     script_path: Optional[str] # Add script_path
+    network_policy: Optional[NetworkPolicy] = None
+    auth_profile: Optional[AuthProfile] = None
     created_at: datetime
     updated_at: Optional[datetime]
     
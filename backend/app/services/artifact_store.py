@@ -0,0 +1,293 @@
+from sqlalchemy import select, update, delete, func, text
+from sqlalchemy.dialects.postgresql import insert
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+import asyncio
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+from app.config import settings
+from app.models.database import AsyncSessionLocal
+from app.models.artifact import Artifact, ExecutionArtifact
+from app.services.storage import get_storage_service, LocalStorage, StorageService
+
+logger = logging.getLogger(__name__)
+
+
+def artifact_url(digest: str) -> str:
+    return f"/api/artifacts/{digest}"
+
+
+class ArtifactStore:
+    """Content-addressed artifact storage with reference counting and eviction.
+
+    Blobs are stored once per sha256 under `artifacts/` in the configured
+    StorageService; executions reference them through ExecutionArtifact rows.
+    Unreferenced artifacts stay around for dedup until they go unaccessed for
+    `artifact_max_age_days`, even within quota. Over the global quota, the
+    least recently used unreferenced ones go first, but never within
+    `artifact_orphan_grace_minutes` of their last access (a fresh `put` that
+    is about to be linked). Artifacts an execution links are never evicted.
+
+    Per-task quotas are enforced when an execution links an artifact, by
+    unlinking that task's oldest references. Once eviction removes those
+    artifacts, the older executions' stored `/api/artifacts/<digest>`
+    screenshot URLs return 404.
+
+    `put` and eviction serialize on a Postgres advisory lock per digest, so a
+    re-upload of content being evicted cannot lose its blob, across processes.
+    """
+    def __init__(self):
+        self._storage: Optional[StorageService] = None
+        self._eviction_task: Optional[asyncio.Task] = None
+        self.puts = 0
+        self.dedup_hits = 0
+        self.bytes_deduplicated = 0
+        self.evicted = 0
+        self.evicted_bytes = 0
+
+    def storage(self) -> StorageService:
+        if self._storage is None:
+            # Local artifacts share the screenshots volume instead of the uploads directory
+            if settings.STORAGE_BACKEND == "minio":
+                self._storage = get_storage_service()
+            else:
+                self._storage = LocalStorage(settings.screenshot_dir)
+        return self._storage
+
+    @staticmethod
+    def object_name(digest: str) -> str:
+        return f"artifacts/{digest[:2]}/{digest}"
+
+    @staticmethod
+    async def _lock_digest(db, digest: str):
+        """Hold the digest's advisory lock until the session's transaction ends"""
+        await db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:digest))"), {"digest": digest})
+
+    async def put(self, data: bytes, content_type: str) -> str:
+        """Store `data` unless identical content already exists; returns its digest"""
+        digest = await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest())
+        self.puts += 1
+        async with AsyncSessionLocal() as db:
+            await self._lock_digest(db, digest)
+            existing = (await db.execute(select(Artifact.id).where(Artifact.digest == digest))).scalar_one_or_none()
+            if existing is not None:
+                # Refresh recency so the orphan grace period covers the upcoming link
+                await db.execute(update(Artifact).where(Artifact.id == existing).values(last_accessed_at=func.now()))
+                await db.commit()
+                self.dedup_hits += 1
+                self.bytes_deduplicated += len(data)
+                return digest
+
+            storage_path = await asyncio.to_thread(self.storage().upload_bytes, data, self.object_name(digest), content_type)
+            await db.execute(
+                insert(Artifact)
+                .values(digest=digest, size=len(data), content_type=content_type, storage_path=storage_path, ref_count=0)
+                .on_conflict_do_nothing(index_elements=["digest"])
+            )
+            await db.commit()
+        return digest
+
+    async def link(self, execution_id: int, task_id: Optional[int], digest: str, name: Optional[str] = None) -> bool:
+        """Reference an artifact from an execution, then enforce the task's quota"""
+        try:
+            async with AsyncSessionLocal() as db:
+                artifact_id = (await db.execute(select(Artifact.id).where(Artifact.digest == digest))).scalar_one_or_none()
+                if artifact_id is None:
+                    logger.warning(f"Cannot link missing artifact {digest} to execution {execution_id}")
+                    return False
+                result = await db.execute(
+                    insert(ExecutionArtifact)
+                    .values(execution_id=execution_id, artifact_id=artifact_id, task_id=task_id, name=name)
+                    .on_conflict_do_nothing(constraint="uq_execution_artifact")
+                    .returning(ExecutionArtifact.id)
+                )
+                if result.scalar_one_or_none() is not None:
+                    await db.execute(
+                        update(Artifact).where(Artifact.id == artifact_id).values(ref_count=Artifact.ref_count + 1)
+                    )
+                await db.commit()
+            if task_id is not None and settings.artifact_task_quota_bytes > 0:
+                await self._enforce_task_quota(task_id)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to link artifact {digest} to execution {execution_id}: {e}")
+            return False
+
+    async def get(self, digest: str) -> Optional[Artifact]:
+        """Artifact metadata for serving; refreshes its LRU timestamp at most once a minute"""
+        async with AsyncSessionLocal() as db:
+            artifact = (await db.execute(select(Artifact).where(Artifact.digest == digest))).scalar_one_or_none()
+            if artifact is None:
+                return None
+            now = datetime.now(timezone.utc)
+            if artifact.last_accessed_at is None or now - artifact.last_accessed_at > timedelta(minutes=1):
+                await db.execute(update(Artifact).where(Artifact.id == artifact.id).values(last_accessed_at=now))
+                await db.commit()
+            return artifact
+
+    async def read(self, artifact: Artifact, offset: int = 0, length: Optional[int] = None) -> bytes:
+        storage = self.storage()
+        if offset == 0 and (length is None or length >= artifact.size):
+            return await asyncio.to_thread(storage.download_bytes, artifact.storage_path)
+        return await asyncio.to_thread(storage.download_range, artifact.storage_path, offset, length)
+
+    async def _drop_links(self, db, links: List[Tuple[int, int]]):
+        """Delete (link_id, artifact_id) references and decrement the artifacts' ref counts"""
+        await db.execute(delete(ExecutionArtifact).where(ExecutionArtifact.id.in_([link_id for link_id, _ in links])))
+        for artifact_id, count in Counter(artifact_id for _, artifact_id in links).items():
+            await db.execute(
+                update(Artifact)
+                .where(Artifact.id == artifact_id)
+                .values(ref_count=func.greatest(Artifact.ref_count - count, 0))
+            )
+
+    async def _enforce_task_quota(self, task_id: int):
+        """Release the task's oldest references until its distinct artifacts fit the quota"""
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(ExecutionArtifact.id, ExecutionArtifact.artifact_id, Artifact.size)
+                .join(Artifact, Artifact.id == ExecutionArtifact.artifact_id)
+                .where(ExecutionArtifact.task_id == task_id)
+                .order_by(ExecutionArtifact.created_at.asc(), ExecutionArtifact.id.asc())
+            )).all()
+            sizes = {artifact_id: size for _, artifact_id, size in rows}
+            remaining = Counter(artifact_id for _, artifact_id, _ in rows)
+            usage = sum(sizes.values())
+            dropped = []
+            for link_id, artifact_id, size in rows:
+                if usage <= settings.artifact_task_quota_bytes:
+                    break
+                dropped.append((link_id, artifact_id))
+                remaining[artifact_id] -= 1
+                if remaining[artifact_id] == 0:
+                    usage -= size
+            if dropped:
+                await self._drop_links(db, dropped)
+                await db.commit()
+                logger.info(f"Task {task_id} over artifact quota; released {len(dropped)} references")
+
+    async def evict(self) -> Dict[str, int]:
+        """One eviction pass: reconcile ref counts, then drop aged and over-quota unreferenced artifacts"""
+        now = datetime.now(timezone.utc)
+        victims: Dict[int, Any] = {}
+        async with AsyncSessionLocal() as db:
+            # Execution deletes cascade to links without touching counts; recount from the links
+            counts = (
+                select(func.count(ExecutionArtifact.id))
+                .where(ExecutionArtifact.artifact_id == Artifact.id)
+                .scalar_subquery()
+            )
+            await db.execute(update(Artifact).values(ref_count=counts))
+            await db.commit()
+
+            candidates = (
+                select(Artifact.id, Artifact.digest, Artifact.storage_path, Artifact.size, Artifact.last_accessed_at)
+                .where(Artifact.ref_count == 0)
+            )
+            if settings.artifact_max_age_days > 0:
+                expired = await db.execute(
+                    candidates.where(Artifact.last_accessed_at < now - timedelta(days=settings.artifact_max_age_days))
+                )
+                victims.update({row.id: row for row in expired})
+
+            if settings.artifact_global_quota_bytes > 0:
+                total = (await db.execute(select(func.coalesce(func.sum(Artifact.size), 0)))).scalar_one()
+                total -= sum(row.size for row in victims.values())
+                if total > settings.artifact_global_quota_bytes:
+                    lru = await db.execute(
+                        candidates
+                        .where(Artifact.id.notin_(list(victims.keys()) or [0]))
+                        .where(Artifact.last_accessed_at < now - timedelta(minutes=settings.artifact_orphan_grace_minutes))
+                        .order_by(Artifact.last_accessed_at.asc())
+                    )
+                    for row in lru:
+                        if total <= settings.artifact_global_quota_bytes:
+                            break
+                        victims[row.id] = row
+                        total -= row.size
+                    if total > settings.artifact_global_quota_bytes:
+                        logger.warning(
+                            f"Artifacts exceed the global quota by {total - settings.artifact_global_quota_bytes} bytes "
+                            f"held by executions or within the orphan grace period"
+                        )
+
+        evicted_bytes = 0
+        evicted = 0
+        for row in victims.values():
+            if await self._evict_one(row):
+                evicted += 1
+                evicted_bytes += row.size
+        self.evicted += evicted
+        self.evicted_bytes += evicted_bytes
+        if evicted:
+            logger.info(f"Artifact eviction removed {evicted} artifacts")
+        return {"evicted": evicted, "evicted_bytes": evicted_bytes}
+
+    async def _evict_one(self, row) -> bool:
+        """Delete one selected artifact under its digest lock, unless it was reused since selection"""
+        async with AsyncSessionLocal() as db:
+            await self._lock_digest(db, row.digest)
+            deleted = (await db.execute(
+                delete(Artifact)
+                .where(Artifact.id == row.id)
+                .where(Artifact.last_accessed_at <= row.last_accessed_at)
+                .where(~select(ExecutionArtifact.id).where(ExecutionArtifact.artifact_id == row.id).exists())
+                .returning(Artifact.id)
+            )).scalar_one_or_none()
+            if deleted is None:
+                return False
+            # Blob first: if it cannot be removed the row stays and a later pass retries
+            try:
+                await asyncio.to_thread(self.storage().delete_file, row.storage_path)
+            except Exception as e:
+                logger.warning(f"Failed to delete artifact blob {row.storage_path}: {e}")
+                await db.rollback()
+                return False
+            await db.commit()
+            return True
+
+    async def start(self):
+        if self._eviction_task is None and settings.artifact_eviction_interval > 0:
+            self._eviction_task = asyncio.create_task(self._eviction_loop())
+
+    async def shutdown(self):
+        if self._eviction_task:
+            self._eviction_task.cancel()
+            self._eviction_task = None
+
+    async def _eviction_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(settings.artifact_eviction_interval)
+                await self.evict()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Artifact eviction failed: {e}")
+
+    async def stats(self) -> Dict[str, Any]:
+        async with AsyncSessionLocal() as db:
+            count, total, referenced = (await db.execute(
+                select(
+                    func.count(Artifact.id),
+                    func.coalesce(func.sum(Artifact.size), 0),
+                    func.count(Artifact.id).filter(Artifact.ref_count > 0),
+                )
+            )).one()
+        return {
+            "artifacts": count,
+            "referenced": referenced,
+            "total_bytes": int(total),
+            "global_quota_bytes": settings.artifact_global_quota_bytes,
+            "puts": self.puts,
+            "dedup_hits": self.dedup_hits,
+            "bytes_deduplicated": self.bytes_deduplicated,
+            "evicted": self.evicted,
+            "evicted_bytes": self.evicted_bytes,
+        }
+
+
+# Global artifact store instance
+artifact_store = ArtifactStore()
@@ -0,0 +1,401 @@
+from playwright.async_api import BrowserContext, Route, Request
+from collections import OrderedDict
+from datetime import datetime, timezone
+import asyncio
+import base64
+import fcntl
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Any, List, Optional
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+STATIC_RESOURCE_TYPES = {"script", "stylesheet", "image", "font", "media"}
+STATIC_EXTENSIONS = (
+    ".js", ".mjs", ".css", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg", ".ico",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot", ".mp4", ".webm", ".map"
+)
+# Headers that describe the wire encoding rather than the cached body
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive", "date"}
+
+
+class CacheEntry:
+    """Index entry mapping a GET URL to a content-addressed blob"""
+    def __init__(self, url: str, sha256: str, size: int, status: int, headers: Dict[str, str],
+                 stored_at: float, last_access: Optional[float] = None):
+        self.url = url
+        self.sha256 = sha256
+        self.size = size
+        self.status = status
+        self.headers = headers
+        self.stored_at = stored_at
+        self.last_access = last_access or stored_at
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+    def is_fresh(self, now: float) -> bool:
+        return now - self.stored_at < settings.asset_cache_ttl_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "sha256": self.sha256,
+            "size": self.size,
+            "status": self.status,
+            "headers": self.headers,
+            "stored_at": self.stored_at,
+            "last_access": self.last_access,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CacheEntry":
+        return cls(
+            data["url"], data["sha256"], int(data["size"]), int(data.get("status", 200)),
+            data.get("headers") or {}, float(data["stored_at"]), data.get("last_access")
+        )
+
+
+class AssetCache:
+    """Shared on-disk, content-addressed cache for static GET responses.
+
+    Blobs live under `<dir>/blobs/<sha[:2]>/<sha>` so byte-identical assets
+    served from different URLs are stored once. The URL index is kept in
+    memory in LRU order and persisted to `<dir>/index.json` on flush.
+
+    Worker processes sharing the directory merge their index into the file
+    under an exclusive `flock`, keeping the newer entry per URL, so flushes
+    do not overwrite each other. Each process only picks up the others'
+    entries on its next `load`, and size-cap eviction is per process: a blob
+    evicted by one process is re-fetched by the others (missing blobs are
+    treated as misses).
+    """
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.lock_path = os.path.join(cache_dir, "index.lock")
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.total_bytes = 0
+        self._blob_refs: Dict[str, int] = {}
+        self._dirty = False
+        self._lock = asyncio.Lock()
+        self._loaded = False
+
+    async def load(self):
+        """Load the persisted index (idempotent)"""
+        if self._loaded:
+            return
+        await asyncio.to_thread(os.makedirs, self.blob_dir, exist_ok=True)
+        try:
+            raw = await asyncio.to_thread(self._read_index)
+        except Exception as e:
+            logger.warning(f"Asset cache index unreadable, starting empty: {e}")
+            raw = []
+        for item in sorted(raw, key=lambda d: d.get("last_access") or 0):
+            entry = CacheEntry.from_dict(item)
+            if os.path.exists(self._blob_path(entry.sha256)):
+                self._add_entry(entry)
+        self._loaded = True
+        logger.info(f"Asset cache loaded: {len(self.entries)} entries, {self.total_bytes} bytes")
+
+    async def flush(self):
+        """Persist the index if it changed"""
+        if not self._dirty:
+            return
+        async with self._lock:
+            snapshot = [e.to_dict() for e in self.entries.values()]
+            self._dirty = False
+        await asyncio.to_thread(self._write_index, snapshot)
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        entry = self.entries.get(url)
+        if entry:
+            entry.last_access = time.time()
+            self.entries.move_to_end(url)
+            self._dirty = True
+        return entry
+
+    async def read_body(self, entry: CacheEntry) -> bytes:
+        return await asyncio.to_thread(self._read_file, self._blob_path(entry.sha256))
+
+    async def store(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> CacheEntry:
+        """Store a response body and index it under `url`"""
+        sha = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(sha)
+        if sha not in self._blob_refs:
+            await asyncio.to_thread(self._write_blob, path, body)
+        clean_headers = {k.lower(): v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+        entry = CacheEntry(url, sha, len(body), status, clean_headers, time.time())
+        async with self._lock:
+            self._remove_entry(url)
+            self._add_entry(entry)
+            self._dirty = True
+            evicted = self._evict_over_cap()
+        for blob_sha in evicted:
+            await asyncio.to_thread(self._delete_file, self._blob_path(blob_sha))
+        return entry
+
+    def refresh(self, entry: CacheEntry):
+        """Mark an entry as revalidated"""
+        entry.stored_at = time.time()
+        self._dirty = True
+
+    async def import_har(self, har_path: str) -> int:
+        """Seed the cache from a HAR file's GET 200 responses"""
+        har = await asyncio.to_thread(self._read_json, har_path)
+        imported = 0
+        for item in har.get("log", {}).get("entries", []):
+            request = item.get("request", {})
+            response = item.get("response", {})
+            content = response.get("content", {})
+            if request.get("method") != "GET" or response.get("status") != 200 or "text" not in content:
+                continue
+            if content.get("encoding") == "base64":
+                body = base64.b64decode(content["text"])
+            else:
+                body = content["text"].encode("utf-8")
+            headers = {h["name"]: h["value"] for h in response.get("headers", [])}
+            await self.store(request["url"], 200, headers, body)
+            imported += 1
+        logger.info(f"Imported {imported} assets from HAR {har_path}")
+        return imported
+
+    async def export_har(self, har_path: str) -> int:
+        """Write the cache contents as a HAR 1.2 file"""
+        har_entries = []
+        for entry in list(self.entries.values()):
+            try:
+                body = await self.read_body(entry)
+            except FileNotFoundError:
+                continue
+            har_entries.append({
+                "startedDateTime": datetime.fromtimestamp(entry.stored_at, tz=timezone.utc).isoformat(),
+                "time": 0,
+                "request": {
+                    "method": "GET", "url": entry.url, "httpVersion": "HTTP/1.1",
+                    "headers": [], "queryString": [], "cookies": [], "headersSize": -1, "bodySize": 0
+                },
+                "response": {
+                    "status": entry.status, "statusText": "", "httpVersion": "HTTP/1.1",
+                    "headers": [{"name": k, "value": v} for k, v in entry.headers.items()],
+                    "cookies": [],
+                    "content": {
+                        "size": entry.size,
+                        "mimeType": entry.headers.get("content-type", "application/octet-stream"),
+                        "text": base64.b64encode(body).decode("ascii"),
+                        "encoding": "base64"
+                    },
+                    "redirectURL": "", "headersSize": -1, "bodySize": entry.size
+                },
+                "cache": {},
+                "timings": {"send": 0, "wait": 0, "receive": 0}
+            })
+        har = {"log": {"version": "1.2", "creator": {"name": settings.app_name, "version": "1.0"}, "entries": har_entries}}
+        await asyncio.to_thread(self._write_json, har_path, har)
+        logger.info(f"Exported {len(har_entries)} assets to HAR {har_path}")
+        return len(har_entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "blobs": len(self._blob_refs),
+            "total_bytes": self.total_bytes,
+            "max_bytes": settings.asset_cache_max_bytes,
+        }
+
+    def _add_entry(self, entry: CacheEntry):
+        self.entries[entry.url] = entry
+        refs = self._blob_refs.get(entry.sha256, 0)
+        if refs == 0:
+            self.total_bytes += entry.size
+        self._blob_refs[entry.sha256] = refs + 1
+
+    def _remove_entry(self, url: str) -> Optional[str]:
+        """Drop an index entry; returns the blob sha if it became unreferenced"""
+        entry = self.entries.pop(url, None)
+        if not entry:
+            return None
+        refs = self._blob_refs.get(entry.sha256, 1) - 1
+        if refs <= 0:
+            self._blob_refs.pop(entry.sha256, None)
+            self.total_bytes -= entry.size
+            return entry.sha256
+        self._blob_refs[entry.sha256] = refs
+        return None
+
+    def _evict_over_cap(self) -> List[str]:
+        evicted = []
+        while self.total_bytes > settings.asset_cache_max_bytes and len(self.entries) > 1:
+            oldest_url = next(iter(self.entries))
+            sha = self._remove_entry(oldest_url)
+            if sha:
+                evicted.append(sha)
+        return evicted
+
+    def _blob_path(self, sha: str) -> str:
+        return os.path.join(self.blob_dir, sha[:2], sha)
+
+    def _read_index(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.index_path):
+            return []
+        return self._read_json(self.index_path)
+
+    def _write_index(self, snapshot: List[Dict[str, Any]]):
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                merged = {item["url"]: item for item in self._read_index()}
+            except Exception as e:
+                logger.warning(f"Asset cache index unreadable, overwriting: {e}")
+                merged = {}
+            for item in snapshot:
+                current = merged.get(item["url"])
+                if current is None or item["stored_at"] >= current.get("stored_at", 0):
+                    merged[item["url"]] = item
+            # Drop entries whose blob another process evicted
+            entries = [item for item in merged.values() if os.path.exists(self._blob_path(item["sha256"]))]
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            self._write_json(tmp_path, entries)
+            os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def _read_json(path: str) -> Any:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path: str, data: Any):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _write_blob(path: str, body: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _delete_file(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _is_static_asset(request: Request) -> bool:
+    if request.method != "GET":
+        return False
+    if request.resource_type in STATIC_RESOURCE_TYPES:
+        return True
+    return request.url.split("?", 1)[0].lower().endswith(STATIC_EXTENSIONS)
+
+
+def _is_storable(headers: Dict[str, str]) -> bool:
+    cache_control = headers.get("cache-control", "").lower()
+    return "no-store" not in cache_control and "private" not in cache_control
+
+
+class AssetCacheRoute:
+    """Per-context route handler serving static assets from the shared AssetCache"""
+    def __init__(self, cache: AssetCache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.stored = 0
+        self.bytes_from_cache = 0
+
+    async def attach(self, context: BrowserContext):
+        await context.route("**/*", self._handle)
+
+    async def _handle(self, route: Route, request: Request):
+        if not _is_static_asset(request):
+            await route.fallback()
+            return
+
+        entry = self.cache.lookup(request.url)
+        if entry and (entry.is_fresh(time.time()) or settings.asset_cache_offline):
+            await self._fulfill_from_cache(route, entry)
+            return
+
+        if settings.asset_cache_offline:
+            # Offline runs never touch the network for static assets
+            self.misses += 1
+            await route.abort("internetdisconnected")
+            return
+
+        validators = {}
+        if entry and entry.etag:
+            validators["if-none-match"] = entry.etag
+        if entry and entry.last_modified:
+            validators["if-modified-since"] = entry.last_modified
+
+        try:
+            response = await route.fetch(headers={**request.headers, **validators} if validators else None)
+        except Exception as e:
+            if entry:
+                # Serve stale content rather than failing the page load
+                await self._fulfill_from_cache(route, entry)
+                return
+            logger.debug(f"Asset fetch failed for {request.url}: {e}")
+            await route.abort()
+            return
+
+        if response.status == 304 and entry:
+            self.cache.refresh(entry)
+            self.revalidated += 1
+            await self._fulfill_from_cache(route, entry)
+            return
+
+        self.misses += 1
+        body = await response.body()
+        if response.status == 200 and _is_storable(response.headers):
+            try:
+                await self.cache.store(request.url, response.status, response.headers, body)
+                self.stored += 1
+            except Exception as e:
+                logger.warning(f"Failed to cache asset {request.url}: {e}")
+        await route.fulfill(response=response, body=body)
+
+    async def _fulfill_from_cache(self, route: Route, entry: CacheEntry):
+        try:
+            body = await self.cache.read_body(entry)
+        except FileNotFoundError:
+            await route.fallback()
+            return
+        self.hits += 1
+        self.bytes_from_cache += len(body)
+        await route.fulfill(status=entry.status, headers=entry.headers, body=body)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "stored": self.stored,
+            "bytes_from_cache": self.bytes_from_cache,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+# Global asset cache instance
+asset_cache = AssetCache(settings.asset_cache_dir)
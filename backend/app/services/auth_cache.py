@@ -0,0 +1,164 @@
+from cryptography.fernet import Fernet, InvalidToken
+from playwright.async_api import Page
+from contextlib import asynccontextmanager
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Any, Optional
+import logging
+
+from app.config import settings
+from app.services.storage import get_storage_service, StorageService
+from app.services.engine_registry import engine_registry
+from app.services.step_engine import compile_steps, BoundPlan
+
+logger = logging.getLogger(__name__)
+
+
+class CachedAuthState:
+    def __init__(self, state: Dict[str, Any], created_at: float):
+        self.state = state
+        self.created_at = created_at
+
+    def is_expired(self, ttl_minutes: int) -> bool:
+        return time.time() - self.created_at >= ttl_minutes * 60
+
+
+class AuthStateCache:
+    """Encrypted cache of Playwright `storage_state` per task or credential profile.
+
+    States are Fernet-encrypted with a key derived from `secret_key` (or
+    `auth_state_encryption_key`) and stored through the configured
+    StorageService. A per-profile lock makes concurrent executions wait for a
+    single login instead of stampeding the login page; with the engine
+    registry connected the lock also spans worker processes.
+    """
+    def __init__(self):
+        self._memory: Dict[str, CachedAuthState] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._fernet: Optional[Fernet] = None
+        self._storage: Optional[StorageService] = None
+
+    def storage(self) -> StorageService:
+        # MinioStorage checks its bucket on construction; build it once
+        if self._storage is None:
+            self._storage = get_storage_service()
+        return self._storage
+
+    def _cipher(self) -> Fernet:
+        if self._fernet is None:
+            secret = settings.auth_state_encryption_key or settings.secret_key
+            key = base64.urlsafe_b64encode(hashlib.sha256(secret.encode("utf-8")).digest())
+            self._fernet = Fernet(key)
+        return self._fernet
+
+    @staticmethod
+    def _object_name(profile_key: str) -> str:
+        digest = hashlib.sha256(profile_key.encode("utf-8")).hexdigest()[:32]
+        return f"auth_state/{digest}.bin"
+
+    @asynccontextmanager
+    async def lock(self, profile_key: str):
+        # The local lock keeps this process's waiters off Redis while one of them holds it
+        async with self._locks.setdefault(profile_key, asyncio.Lock()):
+            async with engine_registry.lock(f"auth:{profile_key}", settings.auth_login_lock_seconds):
+                yield
+
+    async def load(self, profile_key: str, ttl_minutes: int) -> Optional[CachedAuthState]:
+        """Return the unexpired cached state, reading through to storage on a miss.
+
+        An expired memory entry is dropped and storage re-read, since another
+        process may already have saved a fresh login.
+        """
+        cached = self._memory.get(profile_key)
+        if cached and cached.is_expired(ttl_minutes):
+            self._memory.pop(profile_key, None)
+            cached = None
+        if cached is None:
+            cached = await asyncio.to_thread(self._read, profile_key)
+            if cached is None or cached.is_expired(ttl_minutes):
+                return None
+            self._memory[profile_key] = cached
+        return cached
+
+    async def save(self, profile_key: str, state: Dict[str, Any]) -> CachedAuthState:
+        cached = CachedAuthState(state, time.time())
+        await asyncio.to_thread(self._write, profile_key, cached)
+        self._memory[profile_key] = cached
+        return cached
+
+    async def invalidate(self, profile_key: str, created_at: Optional[float] = None):
+        """Forget a rejected state in memory and in storage.
+
+        With `created_at`, the stored copy is only deleted if it is still that
+        state, so a fresh login saved meanwhile by another execution survives.
+        """
+        self._memory.pop(profile_key, None)
+        await asyncio.to_thread(self._delete, profile_key, created_at)
+
+    def _read(self, profile_key: str) -> Optional[CachedAuthState]:
+        storage = self.storage()
+        try:
+            blob = storage.download_bytes(self._object_name(profile_key))
+        except FileNotFoundError:
+            return None
+        try:
+            envelope = json.loads(self._cipher().decrypt(blob))
+        except (InvalidToken, ValueError) as e:
+            logger.warning(f"Discarding unreadable auth state for profile {profile_key}: {e}")
+            return None
+        return CachedAuthState(envelope["state"], float(envelope["created_at"]))
+
+    def _delete(self, profile_key: str, created_at: Optional[float]):
+        if created_at is not None:
+            stored = self._read(profile_key)
+            if stored is None or stored.created_at != created_at:
+                return
+        try:
+            self.storage().delete_file(self._object_name(profile_key))
+        except Exception as e:
+            logger.warning(f"Failed to delete stored auth state for profile {profile_key}: {e}")
+
+    def _write(self, profile_key: str, cached: CachedAuthState):
+        storage = self.storage()
+        payload = json.dumps({"state": cached.state, "created_at": cached.created_at}).encode("utf-8")
+        storage.upload_bytes(self._cipher().encrypt(payload), self._object_name(profile_key), "application/octet-stream")
+
+
+def profile_key(task_id: Optional[int], profile: Dict[str, Any]) -> str:
+    """Cache key: the named credential profile if given, else the task"""
+    return f"profile:{profile['name']}" if profile.get("name") else f"task:{task_id}"
+
+
+def profile_ttl(profile: Dict[str, Any]) -> int:
+    return int(profile.get("ttl_minutes") or settings.auth_state_ttl_minutes)
+
+
+async def probe_authenticated(page: Page, profile: Dict[str, Any]) -> bool:
+    """Cheap validity probe: the logged-in marker is visible on the probe URL"""
+    try:
+        if profile.get("probe_url"):
+            await page.goto(profile["probe_url"], timeout=settings.playwright_timeout)
+        await page.locator(profile["probe_selector"]).first.wait_for(
+            state="visible", timeout=settings.auth_probe_timeout_ms
+        )
+        return True
+    except Exception:
+        return False
+
+
+async def perform_login(page: Page, profile: Dict[str, Any]):
+    """Run the profile's login steps, binding `{{ field }}` values from environment variables"""
+    credentials = {
+        field: os.environ.get(env_name, "")
+        for field, env_name in (profile.get("credentials_env") or {}).items()
+    }
+    plan = compile_steps(profile.get("login_steps") or [])
+    await BoundPlan(plan, page).run(credentials)
+
+
+# Global auth state cache instance
+auth_state_cache = AuthStateCache()
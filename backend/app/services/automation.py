@@ -1,9 +1,11 @@
-from playwright.async_api import async_playwright, Browser, Page
+from playwright.async_api import Browser, BrowserContext, Page
 import asyncio
 import os
+import time
 from datetime import datetime
 import pytz
-from typing import Dict, Any, Optional
+from collections import deque
+from typing import Dict, Any, Deque, List, Optional, Set
 import logging
 import httpx
 
@@ -11,36 +13,167 @@ from app.config import settings
 from tempfile import NamedTemporaryFile
 from app.services.data_loader import load_and_validate_records
 from app.services.storage import get_storage_service
-from app.models.database import AsyncSessionLocal
-from app.models.execution import Execution
+from app.services.browser_pool import browser_pool, BrowserLease
+from app.services.network_policy import NetworkPolicyEnforcer
+from app.services.asset_cache import asset_cache, AssetCacheRoute
+from app.services.step_engine import run_task_steps, AutomationStopped
+from app.services.progress_writer import progress_writer
+from app.services.checkpoints import checkpoint_writer, load_succeeded_indexes, cached_records
+from app.services.dedup import record_hash, find_applied, mark_applied
+from app.services.screenshots import screenshot_pipeline, capture_owner
+from app.services.artifact_store import artifact_store, artifact_url
+from app.services.trace_buffer import TraceRingBuffer
+from app.services.instrumentation import ActionMetrics, InstrumentedPage
+from app.services.engine_registry import engine_registry
+from app.services.auth_cache import auth_state_cache, profile_key, profile_ttl, probe_authenticated, perform_login
 
 logger = logging.getLogger(__name__)
 
+class WebSocketSubscriber:
+    """One viewer connection with a bounded outbound queue and its own writer task.
+
+    Progress messages are coalesced: a new one replaces a queued one, and when
+    the queue is full the oldest progress message is dropped. Other messages
+    (status transitions, errors) are never dropped; a consumer whose queue
+    stays over capacity, or whose send stalls for `ws_heartbeat_interval`, is
+    evicted.
+    """
+    def __init__(self, websocket, session_id: str, manager: "WebSocketManager"):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.manager = manager
+        self.queue: Deque[Dict] = deque()
+        self.max_queue = settings.ws_send_queue_size
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+        self._ready = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._writer = asyncio.create_task(self._write_loop())
+
+    @staticmethod
+    def _is_droppable(message: Dict) -> bool:
+        # Screencast frames are not droppable: the viewer must see and ack each one or the
+        # stream stalls until the ack timeout. They self-throttle (one frame in flight) anyway.
+        return message.get("type") == "latency" or (
+            message.get("type") == "status" and message.get("status") == "progress"
+        )
+
+    def enqueue(self, message: Dict):
+        """Queue a message without blocking the caller"""
+        if self.closed:
+            return
+        if self._is_droppable(message):
+            if self.queue and self._is_droppable(self.queue[-1]) and self.queue[-1].get("type") == message.get("type"):
+                # Superseded by newer progress
+                self.queue[-1] = message
+                self.coalesced += 1
+                self._ready.set()
+                return
+            if len(self.queue) >= self.max_queue:
+                for i, queued in enumerate(self.queue):
+                    if self._is_droppable(queued):
+                        del self.queue[i]
+                        self.dropped += 1
+                        break
+                else:
+                    self.dropped += 1
+                    return
+        elif len(self.queue) >= self.max_queue * 2:
+            # Cannot keep up even with non-droppable traffic
+            logger.warning(f"Evicting lagging WebSocket consumer for session {self.session_id}")
+            self.manager.evict(self)
+            return
+        self.queue.append(message)
+        self._ready.set()
+
+    async def send_json(self, message: Dict):
+        """Awaitable alias of enqueue, so the subscriber can stand in for a WebSocket sender"""
+        self.enqueue(message)
+
+    async def _write_loop(self):
+        interval = settings.ws_heartbeat_interval
+        try:
+            while not self.closed:
+                if not self.queue:
+                    self._ready.clear()
+                    try:
+                        await asyncio.wait_for(self._ready.wait(), timeout=interval)
+                    except asyncio.TimeoutError:
+                        # Idle: probe the connection so dead consumers are noticed
+                        self.queue.append({"type": "heartbeat", "session_id": self.session_id})
+                    continue
+                message = self.queue.popleft()
+                await asyncio.wait_for(self.websocket.send_json(message), timeout=interval)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.info(f"Evicting WebSocket consumer for session {self.session_id}: {e}")
+            self.manager.evict(self)
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+        if self._writer and not self._writer.done() and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+
 class WebSocketManager:
-    """WebSocket connection manager"""
+    """WebSocket connection manager with fan-out to many subscribers per session"""
     def __init__(self):
-        self.connections: Dict[str, Any] = {}
+        self.connections: Dict[str, Set[WebSocketSubscriber]] = {}
+        self.evicted = 0
     
-    async def connect(self, websocket, session_id: str):
+    async def connect(self, websocket, session_id: str) -> WebSocketSubscriber:
         """Connect a WebSocket"""
         await websocket.accept()
-        self.connections[session_id] = websocket
-        logger.info(f"WebSocket connected for session: {session_id}")
+        subscriber = WebSocketSubscriber(websocket, session_id, self)
+        self.connections.setdefault(session_id, set()).add(subscriber)
+        subscriber.start()
+        logger.info(f"WebSocket connected for session: {session_id} ({len(self.connections[session_id])} subscriber(s))")
+        return subscriber
     
-    def disconnect(self, session_id: str):
-        """Disconnect a WebSocket"""
-        if session_id in self.connections:
+    def disconnect(self, session_id: str, subscriber: Optional[WebSocketSubscriber] = None):
+        """Disconnect one subscriber, or every subscriber of the session"""
+        subscribers = self.connections.get(session_id)
+        if not subscribers:
+            return
+        targets = [subscriber] if subscriber else list(subscribers)
+        for target in targets:
+            if target in subscribers:
+                subscribers.discard(target)
+                target.close()
+        if not subscribers:
             del self.connections[session_id]
-            logger.info(f"WebSocket disconnected for session: {session_id}")
+        logger.info(f"WebSocket disconnected for session: {session_id}")
+
+    def evict(self, subscriber: WebSocketSubscriber):
+        """Drop a slow or dead consumer and close its socket"""
+        self.evicted += 1
+        self.disconnect(subscriber.session_id, subscriber)
+        asyncio.create_task(self._close_socket(subscriber.websocket))
+
+    @staticmethod
+    async def _close_socket(websocket):
+        try:
+            await websocket.close(code=1008)
+        except Exception:
+            pass
+
+    def subscriber_count(self, session_id: str) -> int:
+        return len(self.connections.get(session_id, ()))
     
     async def send_to_session(self, session_id: str, message: Dict):
-        """Send message to specific session"""
-        if session_id in self.connections:
-            try:
-                await self.connections[session_id].send_json(message)
-            except Exception as e:
-                logger.error(f"Failed to send message to session {session_id}: {str(e)}")
-                self.disconnect(session_id)
+        """Send message to every subscriber of a session, including viewers on other workers"""
+        await self.deliver_local(session_id, message)
+        await engine_registry.publish_event(session_id, message)
+
+    async def deliver_local(self, session_id: str, message: Dict):
+        """Enqueue for this worker's subscribers without waiting on slow clients"""
+        for subscriber in list(self.connections.get(session_id, ())):
+            subscriber.enqueue(message)
 
 # Global WebSocket manager instance
 websocket_manager = WebSocketManager()
@@ -50,21 +183,43 @@ class AutomationEngine:
         self.session_id = session_id
         self.ws_manager = websocket_manager
         self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = None
+        self.browser_lease: Optional[BrowserLease] = None
         self.page: Optional[Page] = None
         self.is_paused = False
         self.is_running = False
         self.vnc_session: Optional[Dict[str, Any]] = None
         self.task_id: Optional[int] = None
+        self.execution_id: Optional[int] = None
+        self.task_data: Dict[str, Any] = {}
+        self.network_policy: Optional[NetworkPolicyEnforcer] = None
+        self.asset_cache_route: Optional[AssetCacheRoute] = None
+        self.metrics: Dict[str, Any] = {}
+        self._record_index_map: List[int] = []
+        self._step_offset = 0
+        self._record_hashes: List[str] = []
+        self._applied_hashes: List[str] = []
+        self.screenshots: List[str] = []
+        self.trace_buffer: Optional[TraceRingBuffer] = None
+        self.action_metrics = ActionMetrics()
+        self._latency_published_at = 0.0
+        self.last_activity = time.monotonic()
+        self.hibernated = False
+        self.ended = False
+        self._snapshot: Dict[str, Any] = {}
+        self._hibernate_lock = asyncio.Lock()
+        self._idle_task: Optional[asyncio.Task] = None
         
         # Set timezone
         self.timezone = pytz.timezone(settings.timezone)
         os.environ['TZ'] = settings.timezone
     
-    async def initialize_browser(self):
-        """Initialize browser with proper VNC configuration"""
+    async def initialize_browser(self, storage_state: Optional[Dict[str, Any]] = None, start_url: Optional[str] = None):
+        """Acquire a pooled browser context with proper VNC configuration.
+
+        `storage_state` and `start_url` are used when restoring a hibernated session.
+        """
         try:
-            self.playwright = await async_playwright().start()
-            
             # Determine display (single-session default or per-session)
             display = settings.vnc_display
             if settings.enable_multi_session:
@@ -86,49 +241,22 @@ class AutomationEngine:
                     logger.error(f"Failed to allocate VNC session: {e}")
                     raise
 
-            # Browser launch arguments optimized for VNC
-            browser_args = [
-                f'--display={display}',  # CRITICAL: Use VNC display
-                '--no-sandbox',
-                '--disable-setuid-sandbox',
-                '--disable-dev-shm-usage',
-                '--disable-gpu',
-                '--disable-software-rasterizer',
-                f'--window-size={settings.playwright_viewport_width},{settings.playwright_viewport_height}',
-                '--window-position=0,0',
-                '--start-maximized',
-                '--force-device-scale-factor=1',
-                f'--lang=en-US',
-                f'--timezone={settings.timezone}'
-            ]
-            
-            # Launch browser - MUST be headless=False for VNC visibility
-            self.browser = await self.playwright.chromium.launch(
-                headless=False,  # CRITICAL: Must be False to see in VNC
-                args=browser_args
-            )
-            
-            # Create context with timezone
-            context = await self.browser.new_context(
-                viewport={
-                    'width': settings.playwright_viewport_width,
-                    'height': settings.playwright_viewport_height
-                },
-                timezone_id=settings.timezone,
-                locale='en-US',
-                device_scale_factor=1
-            )
-            
-            self.page = await context.new_page()
+            # Restored sessions bring their own storage state; otherwise reuse a cached login
+            if storage_state is None and self.task_data.get("auth_profile"):
+                await self._acquire_authenticated_context(display)
+            else:
+                await self._acquire_context(display, storage_state)
             
             # Show a visible page immediately so VNC is not blank
-            start_url = os.getenv('AUTOMATION_START_URL', 'https://rhobots.ai')
+            start_url = start_url or os.getenv('AUTOMATION_START_URL', 'https://rhobots.ai')
+            load_started = time.perf_counter()
             await self.page.goto(start_url)
+            self.metrics.setdefault("start_page_load_ms", round((time.perf_counter() - load_started) * 1000, 1))
             
             # Log browser info
             logger.info(f"Browser initialized for session {self.session_id}")
             logger.info(f"Timezone: {settings.timezone}")
-            logger.info(f"Display: {settings.vnc_display}")
+            logger.info(f"Display: {display}")
             logger.info("Browser should be visible in VNC viewer")
             
             return True
@@ -138,6 +266,100 @@ class AutomationEngine:
             await self.send_status("error", f"Browser initialization failed: {str(e)}")
             return False
     
+    async def _acquire_context(self, display: str, storage_state: Optional[Dict[str, Any]] = None):
+        """Lease a pooled context, attach the task's routes and open the working page"""
+        # Reuse a warm browser from the shared pool; only the context is per-execution
+        context_options = {"storage_state": storage_state} if storage_state else {}
+        self.browser_lease = await browser_pool.acquire(display, **context_options)
+        self.browser = self.browser_lease.browser
+        self.context = self.browser_lease.context
+
+        # Serve static assets from the shared cache. Registered before the network
+        # policy so the policy's handler runs first and blocked assets never hit the cache.
+        if settings.asset_cache_enabled:
+            await asset_cache.load()
+            self.asset_cache_route = AssetCacheRoute(asset_cache)
+            await self.asset_cache_route.attach(self.context)
+
+        # Apply the task's resource blocking rules before any navigation
+        policy = self.task_data.get("network_policy")
+        if policy:
+            self.network_policy = NetworkPolicyEnforcer(policy)
+            if not self.network_policy.is_empty:
+                await self.network_policy.attach(self.context)
+
+        self.page = await self.context.new_page()
+
+    async def _release_context(self):
+        if self.browser_lease:
+            await browser_pool.release(self.browser_lease)
+        self.browser_lease = None
+        self.context = None
+        self.page = None
+
+    async def _try_cached_auth(self, display: str, profile: Dict[str, Any], cached) -> bool:
+        """Open a context with the cached state; keep it only if the logged-in probe passes"""
+        await self._acquire_context(display, cached.state)
+        if await probe_authenticated(self.page, profile):
+            return True
+        await self._release_context()
+        return False
+
+    async def _acquire_authenticated_context(self, display: str):
+        """Acquire a logged-in context, reusing the task's cached storage state when still valid.
+
+        Executions sharing an auth profile serialize on its lock, so a stale or
+        missing state triggers one login while the others wait and reuse it.
+        """
+        profile = self.task_data["auth_profile"]
+        key = profile_key(self.task_id, profile)
+        ttl = profile_ttl(profile)
+        started = time.perf_counter()
+        outcome = "cache_hit"
+
+        cached = await auth_state_cache.load(key, ttl)
+        rejected_at = None
+        if cached and not await self._try_cached_auth(display, profile, cached):
+            rejected_at = cached.created_at
+            await auth_state_cache.invalidate(key, rejected_at)
+            cached = None
+
+        if cached is None:
+            async with auth_state_cache.lock(key):
+                # Another execution may have logged in while we waited for the lock
+                cached = await auth_state_cache.load(key, ttl)
+                if cached and cached.created_at != rejected_at and await self._try_cached_auth(display, profile, cached):
+                    outcome = "cache_hit_after_wait"
+                else:
+                    outcome = "login"
+                    await self._acquire_context(display)
+                    await perform_login(self.page, profile)
+                    if not await probe_authenticated(self.page, profile):
+                        raise RuntimeError("Login steps finished but the logged-in probe did not pass")
+                    await auth_state_cache.save(key, await self.context.storage_state())
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.metrics["auth"] = {"outcome": outcome, "profile": key, "elapsed_ms": elapsed_ms}
+        if outcome == "login":
+            logger.info(f"Session {self.session_id}: Auth cache miss for {key}; logged in and cached state in {elapsed_ms}ms")
+        else:
+            logger.info(f"Session {self.session_id}: Auth cache hit for {key} ({outcome}) in {elapsed_ms}ms")
+
+    def collect_metrics(self) -> Dict[str, Any]:
+        """Snapshot of per-execution performance telemetry, stored on Execution.metrics"""
+        metrics = dict(self.metrics)
+        if self.trace_buffer:
+            metrics["tracing"] = self.trace_buffer.stats()
+        if self.action_metrics.by_action:
+            metrics["latency"] = self.action_metrics.summary()
+        if self.network_policy:
+            metrics["network_policy"] = self.network_policy.stats()
+        if self.asset_cache_route:
+            metrics["asset_cache"] = self.asset_cache_route.stats()
+        if self.execution_id is not None and "progress_writes" not in metrics:
+            metrics["progress_writes"] = progress_writer.execution_stats(self.execution_id)
+        return metrics
+
     async def send_status(self, status: str, message: str, data: Dict = None):
         """Send status update via WebSocket"""
         await self.ws_manager.send_to_session(
@@ -151,10 +373,17 @@ class AutomationEngine:
             }
         )
     
-    async def execute_task(self, task_data: Dict[str, Any], file = None, execution_id: Optional[int] = None):
+    async def execute_task(self, task_data: Dict[str, Any], file = None, execution_id: Optional[int] = None, resume: bool = False, force: bool = False):
         self.is_running = True
         logger.info(f"Session {self.session_id}: Executing task '{task_data['name']}'")
 
+        self.task_data = task_data or {}
+        self.screenshots = []
+        self.metrics.pop("progress_writes", None)
+        # Captures made while this run's task executes are drained with it
+        capture_owner.set(self.session_id)
+        self.action_metrics = ActionMetrics()
+
         # Record task id for session allocation
         try:
             self.task_id = int(task_data.get('id')) if task_data and task_data.get('id') is not None else None
@@ -164,109 +393,325 @@ class AutomationEngine:
         # Always initialize the browser so VNC displays activity
         if not await self.initialize_browser():
             logger.error(f"Session {self.session_id}: Halting task due to browser initialization failure.")
+            self.is_running = False
             await self.cleanup()
             return
 
         try:
-            # Resolve records from provided file (required)
-            if file is None:
+            await self.send_status("running", f"Running task '{self.task_data.get('name')}'")
+            await self._start_tracing()
+
+            # Tasks built from steps run through the step engine; scripted tasks need a file
+            steps = self.task_data.get("steps") or []
+            use_steps = bool(steps) and not self.task_data.get("script_path")
+
+            # Resolve records from provided file (required for scripts, optional for steps)
+            if file is None and not use_steps:
                 raise ValueError("No file provided. Upload a CSV/XLSX and start again.")
+            records = await self._load_records(file) if file is not None else []
 
-            storage_backend = settings.STORAGE_BACKEND
-            local_path = None
-            tmp_path = None
-            try:
-                if storage_backend == "minio":
-                    storage = get_storage_service()
-                    with NamedTemporaryFile(delete=False, suffix=f".{getattr(file, 'file_type', 'csv')}") as tmp:
-                        tmp_path = tmp.name
-                    storage.download_file(file.storage_path, tmp_path)
-                    local_path = tmp_path
-                else:
-                    # local storage; file.storage_path is typically an absolute path
-                    local_path = file.storage_path if os.path.isabs(file.storage_path) else os.path.join(settings.upload_dir, file.storage_path)
-
-                parsed = load_and_validate_records(local_path)
-                records = parsed.get("records", [])
-                if not records:
-                    raise ValueError("No valid data rows found after parsing the file.")
-
-                # Mark execution as running with total steps
-                if execution_id is not None:
-                    await self._update_execution(execution_id, {
-                        "status": "running",
-                        "start_time": datetime.now(self.timezone),
-                        "total_steps": len(records),
-                        "current_step": 0,
-                        "error_message": None
-                    })
+            # On resume, skip records this execution already applied successfully
+            skip = await load_succeeded_indexes(execution_id) if (resume and execution_id is not None) else set()
+            skip |= await self._skip_applied_records(records, skip, execution_id, force)
+            self._record_index_map = [idx for idx in range(len(records)) if idx not in skip] or [0]
+            self._step_offset = len(skip)
+            pending_records = [records[idx] for idx in range(len(records)) if idx not in skip]
+
+            # Mark execution as running with total steps
+            if execution_id is not None:
+                await self._update_execution(execution_id, {
+                    "status": "running",
+                    "start_time": datetime.now(self.timezone),
+                    "total_steps": len(records) or 1,
+                    "current_step": self._step_offset,
+                    "error_message": None
+                })
 
+            if records and not pending_records:
+                logger.info(f"Session {self.session_id}: All {len(records)} records already applied; nothing to resume.")
+                await self.send_status("completed", "All records were already processed. Manual control is now active.")
+            elif use_steps:
+                logger.info(f"Session {self.session_id}: Running {len(steps)} task steps for {len(pending_records) or 1} record(s).")
+                await self.run_task_steps(steps, pending_records, execution_id)
+                await self.send_status("completed", "Task steps finished. Manual control is now active.")
+            else:
                 # Run the actual route automation script with async browser workflow
-                logger.info(f"Session {self.session_id}: Running route automation script for {len(records)} records.")
-                await self.run_route_automation(records, execution_id)
+                logger.info(f"Session {self.session_id}: Running route automation script for {len(pending_records)} records ({len(skip)} skipped).")
+                await self.run_route_automation(pending_records, execution_id)
                 await self.send_status("completed", "Route automation finished. Manual control is now active.")
-                if execution_id is not None:
-                    await self._update_execution(execution_id, {
-                        "status": "completed",
-                        "end_time": datetime.now(self.timezone)
-                    })
-            finally:
-                if tmp_path and os.path.exists(tmp_path):
-                    try:
-                        os.remove(tmp_path)
-                    except Exception:
-                        pass
+            # Let queued screenshot uploads land in the execution before it is marked complete
+            await screenshot_pipeline.drain(self.session_id)
+            await self._publish_latency(force=True)
+            await self._stop_tracing(execution_id)
+            if execution_id is not None and not self.is_running:
+                # Stopped during the last operation; stop() already recorded the status
+                await self._flush_record_outcomes(execution_id)
+                await self._update_execution(execution_id, {"metrics": self.collect_metrics()})
+            elif execution_id is not None:
+                await self._flush_record_outcomes(execution_id)
+                await self._update_execution(execution_id, {
+                    "status": "completed",
+                    "end_time": datetime.now(self.timezone),
+                    "metrics": self.collect_metrics()
+                })
 
             # Keep the browser open for manual interaction (no time limit)
             logger.info(f"Session {self.session_id}: Browser will remain open indefinitely for manual inspection.")
             
             # Wait indefinitely - user can manually close or use stop command
+            self._start_idle_watch()
             while self.is_running:
                 await asyncio.sleep(10)  # Check every 10 seconds if still running
 
+        except AutomationStopped:
+            logger.info(f"Session {self.session_id}: Automation stopped; remaining records left unprocessed.")
+            await screenshot_pipeline.drain(self.session_id)
+            await self._stop_tracing(execution_id)
+            if execution_id is not None:
+                # stop() already wrote status "stopped"; keep it and add the telemetry
+                await self._flush_record_outcomes(execution_id)
+                await self._update_execution(execution_id, {"metrics": self.collect_metrics()})
         except Exception as e:
+            # The run is over; the engine only stays registered for manual control
+            self.is_running = False
             logger.error(f"Session {self.session_id}: Task execution failed: {e}", exc_info=True)
             await self.send_status("error", f"Automation failed: {str(e)}")
+            await screenshot_pipeline.drain(self.session_id)
+            await self._stop_tracing(execution_id, failed=True)
             if execution_id is not None:
+                await self._flush_record_outcomes(execution_id)
                 await self._update_execution(execution_id, {
                     "status": "failed",
                     "end_time": datetime.now(self.timezone),
-                    "error_message": str(e)
+                    "error_message": str(e),
+                    "metrics": self.collect_metrics()
                 })
         finally:
             # Intentionally not cleaning up immediately to keep VNC visible
             # await self.cleanup()
             logger.info(f"Session {self.session_id}: Task finished. Browser will remain open.")
+            if execution_id is not None:
+                # Later metrics writes (hibernation) keep the final counts
+                self.metrics["progress_writes"] = progress_writer.execution_stats(execution_id)
+                progress_writer.forget(execution_id)
+            self._start_idle_watch()
 
 
 
+    async def _publish_latency(self, force: bool = False):
+        """Push the live latency summary to viewers, at most once per publish interval"""
+        now = time.monotonic()
+        if not self.action_metrics.by_action:
+            return
+        if not force and (now - self._latency_published_at) * 1000 < settings.latency_publish_interval_ms:
+            return
+        self._latency_published_at = now
+        await self.ws_manager.send_to_session(self.session_id, {
+            "type": "latency",
+            "execution_id": self.execution_id,
+            "data": self.action_metrics.summary(top_locators=10),
+            "timestamp": datetime.now(self.timezone).isoformat()
+        })
+
+    async def _start_tracing(self):
+        """Begin chunked tracing of the execution's context when the ring buffer is enabled"""
+        if not settings.trace_buffer_enabled or not self.context:
+            return
+        try:
+            self.trace_buffer = TraceRingBuffer(self.context)
+            await self.trace_buffer.start()
+        except Exception as e:
+            logger.warning(f"Session {self.session_id}: Could not start trace buffer: {e}")
+            self.trace_buffer = None
+
+    async def _stop_tracing(self, execution_id: Optional[int], failed: bool = False):
+        if not self.trace_buffer:
+            return
+        label = "execution_failed" if failed else "records_failed"
+        digests = await self.trace_buffer.stop(failed=failed, label=label)
+        await self._attach_traces(execution_id, digests, label)
+
+    async def _attach_traces(self, execution_id: Optional[int], digests: List[str], label: str):
+        if not digests:
+            return
+        if execution_id is not None:
+            for n, digest in enumerate(digests, 1):
+                await artifact_store.link(execution_id, self.task_id, digest, f"trace_{label}_{n}.zip")
+        urls = [artifact_url(digest) for digest in digests]
+        logger.info(f"Session {self.session_id}: Saved {len(digests)} trace chunk(s) for {label}")
+        await self.send_status("progress", f"Trace saved for {label}", {"traces": urls})
+
+    async def _load_records(self, file) -> List[Dict[str, Any]]:
+        """Records for the file, reusing the rows parsed at upload time when available"""
+        records = cached_records(file)
+        if records is not None:
+            return records
+
+        tmp_path = None
+        try:
+            if settings.STORAGE_BACKEND == "minio":
+                storage = get_storage_service()
+                with NamedTemporaryFile(delete=False, suffix=f".{getattr(file, 'file_type', 'csv')}") as tmp:
+                    tmp_path = tmp.name
+                storage.download_file(file.storage_path, tmp_path)
+                local_path = tmp_path
+            else:
+                # local storage; file.storage_path is typically an absolute path
+                local_path = file.storage_path if os.path.isabs(file.storage_path) else os.path.join(settings.upload_dir, file.storage_path)
+
+            parsed = load_and_validate_records(local_path)
+            records = parsed.get("records", [])
+            if not records:
+                raise ValueError("No valid data rows found after parsing the file.")
+            return records
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except Exception:
+                    pass
+
+    async def _skip_applied_records(self, records, skip: Set[int], execution_id: Optional[int], force: bool) -> Set[int]:
+        """Indexes of records an earlier execution of this task already applied"""
+        self._record_hashes = [record_hash(r) for r in records] if settings.dedup_enabled else []
+        if not self._record_hashes or self.task_id is None:
+            return set()
+        candidates = [idx for idx in range(len(records)) if idx not in skip]
+        applied = set() if force else await find_applied(self.task_id, [self._record_hashes[idx] for idx in candidates])
+        duplicates = {idx for idx in candidates if self._record_hashes[idx] in applied}
+
+        self.metrics["dedup"] = {"checked": len(candidates), "skipped": len(duplicates), "forced": force}
+        if duplicates:
+            logger.info(f"Session {self.session_id}: Skipping {len(duplicates)} records already applied by earlier executions.")
+            await self.send_status("progress", f"Skipping {len(duplicates)} records already applied", {
+                "skipped_duplicates": len(duplicates)
+            })
+            if execution_id is not None:
+                for idx in duplicates:
+                    await checkpoint_writer.record(execution_id, idx, "skipped")
+        return duplicates
+
+    async def _flush_record_outcomes(self, execution_id: int):
+        """Persist buffered checkpoints and applied-record hashes"""
+        await checkpoint_writer.flush(execution_id)
+        if self._applied_hashes and self.task_id is not None:
+            hashes, self._applied_hashes = self._applied_hashes, []
+            await mark_applied(self.task_id, execution_id, hashes)
+
+    def _progress_callback(self, execution_id: Optional[int], message: str):
+        """Build the async progress callback passed to automation scripts"""
+        async def progress_callback(progress_data: Dict[str, Any]):
+            await self.send_status("progress", message, progress_data)
+            await self._publish_latency()
+            try:
+                # Persist the per-record outcome so a failed or restarted run can resume
+                record_number = progress_data.get("record_number")
+                if execution_id is not None and record_number and progress_data.get("record_status"):
+                    record_index = self._record_index_map[int(record_number) - 1]
+                    await checkpoint_writer.record(
+                        execution_id, record_index, progress_data["record_status"], progress_data.get("error")
+                    )
+                    if progress_data["record_status"] == "succeeded" and self._record_hashes:
+                        self._applied_hashes.append(self._record_hashes[record_index])
+                        if len(self._applied_hashes) >= settings.dedup_lookup_chunk_size:
+                            await self._flush_record_outcomes(execution_id)
+
+                # Cut the trace at every record; a failure keeps the last few chunks
+                if self.trace_buffer and record_number and progress_data.get("record_status"):
+                    record_failed = progress_data["record_status"] == "failed"
+                    if self.trace_buffer.per_record:
+                        digests = await self.trace_buffer.rotate(failed=record_failed, label=f"record_{record_number}")
+                        await self._attach_traces(execution_id, digests, f"record_{record_number}")
+                    elif record_failed:
+                        # Sharded runs keep one whole-run chunk, saved when tracing stops
+                        self.trace_buffer.failed_records += 1
+
+                # Screenshots report in once their background upload has finished
+                if execution_id is not None and progress_data.get("screenshot"):
+                    for key in ("artifact", "thumbnail_artifact"):
+                        if progress_data.get(key):
+                            await artifact_store.link(execution_id, self.task_id, progress_data[key], progress_data.get("name"))
+                    self.screenshots.append(progress_data["screenshot"])
+                    await self._update_execution(execution_id, {"screenshots": list(self.screenshots)})
+
+                # Update current step if provided
+                step = None
+                if "processed_count" in progress_data:
+                    step = progress_data.get("processed_count")
+                elif "step" in progress_data:
+                    step = progress_data.get("step")
+                if execution_id is not None and step is not None:
+                    await self._update_execution(execution_id, {"current_step": self._step_offset + int(step)})
+            except Exception:
+                # Do not disrupt automation on telemetry failures
+                pass
+        return progress_callback
+
+    async def _wait_while_paused(self, op=None):
+        """Block between operations while paused; abort if stopped"""
+        while self.is_paused and self.is_running:
+            await asyncio.sleep(0.5)
+        if not self.is_running:
+            raise AutomationStopped("Automation stopped")
+
+    async def _interactive_pause(self, op):
+        """Hand control to the user until they resume"""
+        self.is_paused = True
+        await self.send_status("paused", op.description or "Interactive pause: resume to continue")
+        await self._wait_while_paused(op)
+
+    async def run_task_steps(self, steps, records, execution_id: Optional[int] = None):
+        """Compile the task's steps and run them against the current page"""
+        try:
+            await run_task_steps(
+                InstrumentedPage(self.page, self.action_metrics),
+                steps,
+                self._progress_callback(execution_id, "Task progress"),
+                records=records or None,
+                before_op=self._wait_while_paused,
+                on_interactive_pause=self._interactive_pause
+            )
+        except AutomationStopped:
+            raise
+        except Exception as e:
+            logger.error(f"Task steps failed: {str(e)}")
+            await self.send_status("error", f"Task steps failed: {str(e)}")
+            raise
+
     async def run_route_automation(self, records, execution_id: Optional[int] = None):
         """Run the actual route automation script using existing browser.
 
         This calls the async route_automation function with the current page instance.
         """
         try:
-            # Import the async route automation function
-            from app.automation_scripts.route_automation import run_automation_async
+            # Import the async route automation functions
+            from app.automation_scripts.route_automation import run_automation_async, run_automation_sharded
             
             # Define progress callback (async version for route automation)
-            async def progress_callback(progress_data: Dict[str, Any]):
-                await self.send_status("progress", "Route automation progress", progress_data)
-                try:
-                    # Update current step if provided
-                    step = None
-                    if "processed_count" in progress_data:
-                        step = progress_data.get("processed_count")
-                    elif "step" in progress_data:
-                        step = progress_data.get("step")
-                    if execution_id is not None and step is not None:
-                        await self._update_execution(execution_id, {"current_step": int(step)})
-                except Exception:
-                    # Do not disrupt automation on telemetry failures
-                    pass
+            progress_callback = self._progress_callback(execution_id, "Route automation progress")
 
-            # Run the automation script with existing page
-            await run_automation_async(self.page, progress_callback, records)
+            shard_count = min(max(1, settings.automation_shard_count), len(records))
+            if self.trace_buffer:
+                # Shards share one traced context, so per-record chunks would interleave them
+                self.trace_buffer.per_record = shard_count == 1
+            if shard_count == 1:
+                # Run the automation script with existing page
+                await run_automation_async(InstrumentedPage(self.page, self.action_metrics), progress_callback, records)
+            else:
+                # Extra shard pages share the execution's context (cookies, localStorage) and are closed afterwards
+                extra_pages = [await self.context.new_page() for _ in range(shard_count - 1)]
+                try:
+                    await run_automation_sharded(
+                        [InstrumentedPage(p, self.action_metrics) for p in [self.page, *extra_pages]],
+                        progress_callback,
+                        records
+                    )
+                finally:
+                    for shard_page in extra_pages:
+                        try:
+                            await shard_page.close()
+                        except Exception as e:
+                            logger.warning(f"Failed to close shard page: {e}")
             
         except Exception as e:
             logger.error(f"Route automation failed: {str(e)}")
@@ -361,6 +806,7 @@ class AutomationEngine:
         self.is_paused = False
         await self.send_status("stopped", "Automation stopped")
         if execution_id is not None:
+            await self._flush_record_outcomes(execution_id)
             await self._update_execution(execution_id, {
                 "status": "stopped",
                 "end_time": datetime.now(self.timezone)
@@ -368,21 +814,104 @@ class AutomationEngine:
         # Do NOT cleanup here to allow manual control via VNC after stopping
         return
 
+    def touch(self):
+        """Record viewer or API activity, postponing hibernation"""
+        self.last_activity = time.monotonic()
+
+    def _start_idle_watch(self):
+        if settings.hibernate_idle_minutes > 0 and not self.ended and self._idle_task is None:
+            self._idle_task = asyncio.create_task(self._idle_watch())
+
+    async def _idle_watch(self):
+        """Hibernate the browser once nobody has watched or controlled it for a while"""
+        idle_limit = settings.hibernate_idle_minutes * 60
+        while not self.ended:
+            await asyncio.sleep(settings.hibernate_check_interval)
+            if self.hibernated or self.ended:
+                continue
+            if self.ws_manager.subscriber_count(self.session_id) > 0:
+                self.touch()
+                continue
+            if time.monotonic() - self.last_activity >= idle_limit:
+                try:
+                    await self.hibernate()
+                except Exception as e:
+                    logger.error(f"Session {self.session_id}: Hibernation failed: {e}")
+
+    async def hibernate(self):
+        """Snapshot storage state and URL, then release the browser context and VNC session"""
+        async with self._hibernate_lock:
+            if self.hibernated or not self.context:
+                return
+            self._snapshot = {
+                "storage_state": await self.context.storage_state(),
+                "url": self.page.url if self.page else None
+            }
+            await self.cleanup()
+            self.hibernated = True
+            hibernation_stats["hibernated"] += 1
+            self.metrics.setdefault("hibernation", {"hibernated": 0, "restored": 0, "restore_ms": []})
+            self.metrics["hibernation"]["hibernated"] += 1
+            logger.info(f"Session {self.session_id}: Hibernated idle browser (url={self._snapshot['url']})")
+        await self.send_status("hibernated", "Browser hibernated after inactivity; it will be restored when you reconnect.")
+        if self.execution_id is not None:
+            await self._update_execution(self.execution_id, {"metrics": self.collect_metrics()})
+
+    async def restore(self) -> bool:
+        """Bring a hibernated session back with its saved storage state and URL"""
+        async with self._hibernate_lock:
+            if not self.hibernated:
+                return True
+            started = time.perf_counter()
+            ok = await self.initialize_browser(
+                storage_state=self._snapshot.get("storage_state"),
+                start_url=self._snapshot.get("url")
+            )
+            if not ok:
+                return False
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.hibernated = False
+            self._snapshot = {}
+            self.touch()
+            hibernation_stats["restored"] += 1
+            hibernation_stats["restore_ms"].append(elapsed_ms)
+            del hibernation_stats["restore_ms"][:-100]
+            self.metrics["hibernation"]["restored"] += 1
+            self.metrics["hibernation"]["restore_ms"].append(elapsed_ms)
+            logger.info(f"Session {self.session_id}: Restored hibernated browser in {elapsed_ms}ms")
+        await self.send_status("restored", "Browser restored", {"restore_ms": elapsed_ms, "vnc_session": self.vnc_session})
+        if self.execution_id is not None:
+            await self._update_execution(self.execution_id, {"metrics": self.collect_metrics()})
+        return True
+
     async def end_session(self):
         """Fully end the session and cleanup resources (used when user closes the session)"""
+        self.ended = True
+        if self._idle_task:
+            self._idle_task.cancel()
+        if self.execution_id is not None:
+            progress_writer.forget(self.execution_id)
         await self.cleanup()
     
     async def cleanup(self):
-        """Clean up browser resources"""
+        """Return the browser context to the pool and release the VNC session"""
         try:
             if self.page:
                 await self.page.close()
-            if self.browser:
-                await self.browser.close()
-            if hasattr(self, 'playwright'):
-                await self.playwright.stop()
+            if self.browser_lease:
+                await browser_pool.release(self.browser_lease)
+                # Per-session displays go away with the VNC session, so their browsers must too
+                if settings.enable_multi_session and self.vnc_session:
+                    await browser_pool.close_display(self.browser_lease.display)
+            if self.asset_cache_route:
+                await asset_cache.flush()
         except Exception as e:
             logger.error(f"Cleanup error: {str(e)}")
+        finally:
+            self.page = None
+            self.context = None
+            self.browser = None
+            self.browser_lease = None
 
         # Destroy VNC session if allocated
         try:
@@ -393,19 +922,64 @@ class AutomationEngine:
                         await client.delete(f"{settings.session_manager_url}/api/sessions/{sid}", timeout=15.0)
         except Exception as e:
             logger.error(f"Session cleanup error: {str(e)}")
+        finally:
+            self.vnc_session = None
 
     async def _update_execution(self, execution_id: int, fields: Dict[str, Any]):
-        """Update execution row in DB."""
-        try:
-            async with AsyncSessionLocal() as db:
-                exec_obj = await db.get(Execution, execution_id)
-                if not exec_obj:
-                    return
-                for k, v in (fields or {}).items():
-                    setattr(exec_obj, k, v)
-                await db.commit()
-        except Exception as e:
-            logger.error(f"Failed to update execution {execution_id}: {e}")
+        """Update execution row in DB (buffered; status changes are written immediately)."""
+        await progress_writer.update(execution_id, fields)
+
+# Process-wide hibernation counters
+hibernation_stats: Dict[str, Any] = {"hibernated": 0, "restored": 0, "restore_ms": []}
 
-# Global automation engines
+# Global automation engines (owned by this worker)
 automation_engines: Dict[str, AutomationEngine] = {}
+
+
+async def register_engine(engine: AutomationEngine):
+    """Track a new engine locally and claim its session in the shared registry"""
+    automation_engines[engine.session_id] = engine
+    await engine_registry.register(engine.session_id, engine.execution_id)
+
+
+async def run_engine_command(session_id: str, command: str) -> Dict[str, Any]:
+    """Apply a control command to an engine owned by this worker"""
+    engine = automation_engines.get(session_id)
+    if engine is None:
+        return {"found": False}
+    if command != "end_session":
+        engine.touch()
+    if command == "pause":
+        await engine.pause(engine.execution_id)
+    elif command == "resume":
+        await engine.resume(engine.execution_id)
+    elif command == "stop":
+        await engine.stop(engine.execution_id)
+    elif command == "end_session":
+        await engine.end_session()
+        automation_engines.pop(session_id, None)
+        await engine_registry.unregister(session_id)
+    elif command == "wake":
+        if engine.hibernated:
+            asyncio.create_task(engine.restore())
+    elif command not in ("status", "touch"):
+        raise ValueError(f"Unknown engine command '{command}'")
+    return {
+        "found": True,
+        "is_running": engine.is_running,
+        "is_hibernated": engine.hibernated,
+        "worker": engine_registry.worker_id
+    }
+
+
+async def control_engine(session_id: str, command: str) -> Dict[str, Any]:
+    """Run a control command on whichever worker owns the session's engine"""
+    if session_id in automation_engines:
+        return await run_engine_command(session_id, command)
+    if engine_registry.enabled:
+        result = await engine_registry.forward(session_id, command)
+        if result is not None:
+            if result.get("error"):
+                raise RuntimeError(result["error"])
+            return result
+    return {"found": False}
@@ -0,0 +1,355 @@
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright
+import asyncio
+import time
+from typing import Dict, Any, List, Optional
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PooledBrowser:
+    """A warm Chromium instance owned by the pool"""
+    def __init__(self, browser: Browser, display: str):
+        self.browser = browser
+        self.display = display
+        self.uses = 0
+        self.active_contexts = 0
+        self.created_at = time.monotonic()
+        self.retired = False
+
+    def is_healthy(self) -> bool:
+        return not self.retired and self.browser.is_connected()
+
+
+class BrowserLease:
+    """A BrowserContext handed out to one execution"""
+    def __init__(self, pooled: PooledBrowser, context: BrowserContext):
+        self.pooled = pooled
+        self.context = context
+
+    @property
+    def browser(self) -> Browser:
+        return self.pooled.browser
+
+    @property
+    def display(self) -> str:
+        return self.pooled.display
+
+
+class BrowserPool:
+    """Process-wide pool of warm browsers sharing a single Playwright driver.
+
+    Browsers are kept per X display. Each execution gets its own BrowserContext
+    on the least-loaded healthy browser. A browser that has handed out
+    `browser_pool_max_uses` contexts is retired: it takes no new ones and is
+    closed once its last context is released. A display never holds more than
+    `browser_pool_max_size` browsers, draining ones included; when all of them
+    are exhausted, `acquire` waits for one to retire instead of launching.
+
+    The lock only guards pool bookkeeping. Launching or closing Chromium happens
+    outside it: a launch is first reserved under the lock (counted in
+    `_launching`) and the new browser is registered once it is up.
+    """
+    def __init__(self):
+        self._playwright: Optional[Playwright] = None
+        self._browsers: Dict[str, List[PooledBrowser]] = {}
+        self._launching: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+        # Notified under the lock whenever a context, browser or launch reservation goes away
+        self._slot_freed = asyncio.Condition(self._lock)
+        self._health_task: Optional[asyncio.Task] = None
+        self.stats_counters: Dict[str, int] = {
+            "launched": 0,
+            "recycled": 0,
+            "unhealthy": 0,
+            "contexts_created": 0,
+        }
+
+    async def start(self):
+        """Start the shared driver and pre-warm the default display"""
+        await self._ensure_driver()
+        await self._top_up(settings.vnc_display)
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+        logger.info(f"Browser pool started with {len(self._browsers.get(settings.vnc_display, []))} warm browser(s)")
+
+    async def shutdown(self):
+        """Close every browser and stop the shared driver"""
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        async with self._lock:
+            closing = [pooled for browsers in self._browsers.values() for pooled in browsers]
+            self._browsers = {}
+        for pooled in closing:
+            await self._close_browser(pooled)
+        if self._playwright:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.error(f"Failed to stop Playwright driver: {e}")
+            self._playwright = None
+
+    async def acquire(self, display: Optional[str] = None, **context_options) -> BrowserLease:
+        """Create a fresh BrowserContext on a warm browser for the given display.
+
+        Extra keyword arguments (e.g. `storage_state`) are passed to `new_context`.
+        """
+        display = display or settings.vnc_display
+        await self._ensure_driver()
+        launch = False
+        while True:
+            async with self._slot_freed:
+                closing = self._prune(display)
+                pooled = self._select_browser(display)
+                if pooled is not None:
+                    self._claim(pooled)
+                elif self._has_room(display):
+                    self._reserve_launch(display)
+                    launch = True
+                elif not closing:
+                    # At max size and every browser is exhausted; wait for one to drain and retire
+                    await self._slot_freed.wait()
+                    continue
+            for stale in closing:
+                await self._close_browser(stale)
+            if pooled is not None or launch:
+                break
+        if launch:
+            pooled = await self._launch(display, claim=True)
+        try:
+            context = await pooled.browser.new_context(
+                viewport={
+                    'width': settings.playwright_viewport_width,
+                    'height': settings.playwright_viewport_height
+                },
+                timezone_id=settings.timezone,
+                locale='en-US',
+                device_scale_factor=1,
+                **context_options
+            )
+        except Exception:
+            async with self._lock:
+                pooled.active_contexts -= 1
+                pooled.retired = True
+                retire = self._detach_if_retired(pooled)
+                self._slot_freed.notify_all()
+            if retire:
+                await self._close_browser(pooled)
+            raise
+        self.stats_counters["contexts_created"] += 1
+        return BrowserLease(pooled, context)
+
+    async def release(self, lease: BrowserLease):
+        """Close the lease's context and return its browser to the pool"""
+        try:
+            await lease.context.close()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled context: {e}")
+        pooled = lease.pooled
+        async with self._lock:
+            pooled.active_contexts = max(0, pooled.active_contexts - 1)
+            if pooled.uses >= settings.browser_pool_max_uses or not pooled.browser.is_connected():
+                pooled.retired = True
+            retire = self._detach_if_retired(pooled)
+            self._slot_freed.notify_all()
+        if retire:
+            await self._close_browser(pooled)
+        if _is_default_display(pooled.display):
+            await self._top_up(pooled.display)
+
+    async def close_display(self, display: str):
+        """Close all browsers bound to a display that is being torn down"""
+        async with self._lock:
+            closing = self._browsers.pop(display, [])
+            self._slot_freed.notify_all()
+        for pooled in closing:
+            await self._close_browser(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats_counters,
+            "launching": dict(self._launching),
+            "displays": {
+                display: [
+                    {
+                        "uses": p.uses,
+                        "active_contexts": p.active_contexts,
+                        "healthy": p.is_healthy(),
+                        "age_seconds": round(time.monotonic() - p.created_at, 1)
+                    }
+                    for p in browsers
+                ]
+                for display, browsers in self._browsers.items()
+            }
+        }
+
+    async def _ensure_driver(self):
+        if self._playwright is None:
+            async with self._lock:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+
+    def _launch_args(self, display: str) -> List[str]:
+        # Browser launch arguments optimized for VNC
+        return [
+            f'--display={display}',  # CRITICAL: Use VNC display
+            '--no-sandbox',
+            '--disable-setuid-sandbox',
+            '--disable-dev-shm-usage',
+            '--disable-gpu',
+            '--disable-software-rasterizer',
+            f'--window-size={settings.playwright_viewport_width},{settings.playwright_viewport_height}',
+            '--window-position=0,0',
+            '--start-maximized',
+            '--force-device-scale-factor=1',
+            f'--lang=en-US',
+            f'--timezone={settings.timezone}'
+        ]
+
+    def _reserve_launch(self, display: str, count: int = 1):
+        """Count launches about to start so concurrent callers respect the size limits. Caller holds the lock."""
+        self._launching[display] = self._launching.get(display, 0) + count
+
+    async def _launch(self, display: str, claim: bool = False) -> PooledBrowser:
+        """Launch a reserved browser without holding the lock, then register it.
+
+        With `claim` the new browser is registered already carrying the caller's context.
+        """
+        try:
+            # Launch browser - MUST be headless=False for VNC visibility
+            browser = await self._playwright.chromium.launch(
+                headless=False,  # CRITICAL: Must be False to see in VNC
+                args=self._launch_args(display)
+            )
+        except Exception:
+            async with self._lock:
+                self._launching[display] -= 1
+                self._slot_freed.notify_all()
+            raise
+        pooled = PooledBrowser(browser, display)
+        async with self._lock:
+            if claim:
+                self._claim(pooled)
+            self._launching[display] -= 1
+            self._browsers.setdefault(display, []).append(pooled)
+            self._slot_freed.notify_all()
+        self.stats_counters["launched"] += 1
+        logger.info(f"Launched pooled browser on display {display}")
+        return pooled
+
+    def _prune(self, display: str) -> List[PooledBrowser]:
+        """Drop idle unhealthy browsers and return them for closing. Caller holds the lock."""
+        browsers = self._browsers.setdefault(display, [])
+        stale = [p for p in browsers if not p.is_healthy() and p.active_contexts == 0]
+        for pooled in stale:
+            self.stats_counters["unhealthy"] += 1
+            browsers.remove(pooled)
+        if stale:
+            self._slot_freed.notify_all()
+        return stale
+
+    def _select_browser(self, display: str) -> Optional[PooledBrowser]:
+        """Pick the least-loaded healthy browser, or None when there is none or a new one should be launched. Caller holds the lock."""
+        browsers = self._browsers.setdefault(display, [])
+        healthy = [
+            p for p in browsers
+            if p.is_healthy() and p.uses < settings.browser_pool_max_uses
+        ]
+        least_loaded = min(healthy, key=lambda p: p.active_contexts, default=None)
+        if least_loaded is None or (
+            least_loaded.active_contexts >= settings.browser_pool_contexts_per_browser
+            and self._has_room(display)
+        ):
+            return None
+        return least_loaded
+
+    def _has_room(self, display: str) -> bool:
+        """Whether another browser fits under `browser_pool_max_size`, counting draining and launching ones. Caller holds the lock."""
+        browsers = self._browsers.get(display, [])
+        return len(browsers) + self._launching.get(display, 0) < settings.browser_pool_max_size
+
+    def _claim(self, pooled: PooledBrowser):
+        """Count a new context on the browser, retiring it once its uses run out. Caller holds the lock."""
+        pooled.uses += 1
+        pooled.active_contexts += 1
+        if pooled.uses >= settings.browser_pool_max_uses:
+            # Takes no new contexts; release() closes it once this one drains
+            pooled.retired = True
+
+    async def _top_up(self, display: str):
+        """Keep `browser_pool_min_size` healthy browsers warm, launching outside the lock"""
+        async with self._lock:
+            browsers = self._browsers.get(display, [])
+            healthy = [p for p in browsers if p.is_healthy()]
+            launching = self._launching.get(display, 0)
+            # Retired browsers still draining hold their slot under the max size
+            missing = min(
+                settings.browser_pool_min_size - len(healthy) - launching,
+                settings.browser_pool_max_size - len(browsers) - launching
+            )
+            if missing <= 0:
+                return
+            self._reserve_launch(display, missing)
+        for launched in range(missing):
+            try:
+                await self._launch(display)
+            except Exception as e:
+                logger.error(f"Failed to pre-warm browser on display {display}: {e}")
+                # _launch released the failed reservation; drop the ones not attempted
+                async with self._lock:
+                    self._launching[display] -= missing - launched - 1
+                    self._slot_freed.notify_all()
+                break
+
+    def _detach_if_retired(self, pooled: PooledBrowser) -> bool:
+        """Remove a retired browser once its last context is gone; True if the caller should close it. Caller holds the lock."""
+        if not pooled.retired or pooled.active_contexts > 0:
+            return False
+        browsers = self._browsers.get(pooled.display, [])
+        if pooled not in browsers:
+            return False
+        browsers.remove(pooled)
+        self.stats_counters["recycled"] += 1
+        return True
+
+    async def _close_browser(self, pooled: PooledBrowser):
+        pooled.retired = True
+        try:
+            if pooled.browser.is_connected():
+                await pooled.browser.close()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled browser on display {pooled.display}: {e}")
+
+    async def _health_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(settings.browser_pool_health_interval)
+                async with self._lock:
+                    displays = list(self._browsers.keys())
+                    for display in displays:
+                        browsers = self._browsers[display]
+                        for pooled in list(browsers):
+                            if not pooled.browser.is_connected():
+                                pooled.retired = True
+                                self.stats_counters["unhealthy"] += 1
+                                if pooled.active_contexts == 0:
+                                    browsers.remove(pooled)
+                    self._slot_freed.notify_all()
+                for display in displays:
+                    if _is_default_display(display):
+                        await self._top_up(display)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Browser pool health check error: {e}")
+
+
+def _is_default_display(display: str) -> bool:
+    return display == settings.vnc_display
+
+
+# Global browser pool instance
+browser_pool = BrowserPool()
@@ -0,0 +1,108 @@
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+import asyncio
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple
+import logging
+
+from app.config import settings
+from app.models.database import AsyncSessionLocal
+from app.models.execution import ExecutionRecord
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointWriter:
+    """Buffers per-record outcomes and upserts them into `execution_records` in batches.
+
+    Outcomes are flushed when `progress_flush_max_pending` are buffered, after
+    `progress_flush_interval_ms`, or explicitly when the execution changes status.
+    """
+    def __init__(self):
+        self._pending: Dict[int, Dict[int, Tuple[str, Optional[str]]]] = {}
+        self._first_at: Dict[int, float] = {}
+        self._lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def record(self, execution_id: int, record_index: int, status: str, error: Optional[str] = None):
+        """Buffer the outcome of one record"""
+        self._ensure_flusher()
+        pending = self._pending.setdefault(execution_id, {})
+        self._first_at.setdefault(execution_id, time.monotonic())
+        pending[record_index] = (status, error)
+        if len(pending) >= settings.progress_flush_max_pending:
+            await self.flush(execution_id)
+
+    async def flush(self, execution_id: Optional[int] = None):
+        """Upsert buffered outcomes for one execution, or for all when omitted"""
+        async with self._lock:
+            ids = [execution_id] if execution_id is not None else list(self._pending.keys())
+            batch = {eid: self._pending.pop(eid) for eid in ids if eid in self._pending}
+            for eid in batch:
+                self._first_at.pop(eid, None)
+        for eid, outcomes in batch.items():
+            await self._write(eid, outcomes)
+
+    async def _write(self, execution_id: int, outcomes: Dict[int, Tuple[str, Optional[str]]]):
+        rows = [
+            {"execution_id": execution_id, "record_index": idx, "status": status, "error_message": error}
+            for idx, (status, error) in outcomes.items()
+        ]
+        stmt = insert(ExecutionRecord).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_execution_record",
+            set_={"status": stmt.excluded.status, "error_message": stmt.excluded.error_message, "updated_at": func.now()}
+        )
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(stmt)
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to write checkpoints for execution {execution_id}: {e}")
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        interval = settings.progress_flush_interval_ms / 1000
+        while True:
+            try:
+                await asyncio.sleep(interval / 2)
+                now = time.monotonic()
+                for eid in [eid for eid, at in list(self._first_at.items()) if now - at >= interval]:
+                    await self.flush(eid)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Checkpoint flush loop error: {e}")
+
+    async def shutdown(self):
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+
+async def load_succeeded_indexes(execution_id: int) -> Set[int]:
+    """Record indexes already applied successfully by this execution"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(ExecutionRecord.record_index)
+            .where(ExecutionRecord.execution_id == execution_id)
+            .where(ExecutionRecord.status == "succeeded")
+        )
+        return set(result.scalars().all())
+
+
+def cached_records(file) -> Optional[List[Dict[str, Any]]]:
+    """Parsed records stored with the file at upload time, if present"""
+    validation = getattr(file, "validation_results", None) or {}
+    records = validation.get("records")
+    if records and validation.get("total_rows", len(records)) == len(records):
+        return records
+    return None
+
+
+# Global checkpoint writer instance
+checkpoint_writer = CheckpointWriter()
@@ -0,0 +1,66 @@
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
+import hashlib
+import json
+from typing import Dict, Any, Iterable, List, Set
+import logging
+
+from app.config import settings
+from app.models.database import AsyncSessionLocal
+from app.models.record_index import AppliedRecord
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_value(value: Any) -> str:
+    return " ".join(str(value if value is not None else "").split()).casefold()
+
+
+def record_hash(record: Dict[str, Any]) -> str:
+    """Stable sha256 of a record, insensitive to key order, case and whitespace"""
+    normalized = {str(k).strip().lower(): _normalize_value(v) for k, v in (record or {}).items()}
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _chunks(items: List[str]) -> Iterable[List[str]]:
+    size = max(1, settings.dedup_lookup_chunk_size)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def find_applied(task_id: int, hashes: List[str]) -> Set[str]:
+    """Hashes already applied by an earlier execution of the task (one query per chunk)"""
+    applied: Set[str] = set()
+    unique = list(dict.fromkeys(hashes))
+    async with AsyncSessionLocal() as db:
+        for chunk in _chunks(unique):
+            result = await db.execute(
+                select(AppliedRecord.record_hash)
+                .where(AppliedRecord.task_id == task_id)
+                .where(AppliedRecord.record_hash.in_(chunk))
+            )
+            applied.update(result.scalars().all())
+    return applied
+
+
+async def mark_applied(task_id: int, execution_id: int, hashes: List[str]):
+    """Upsert successful record hashes for the task, pointing them at this execution"""
+    unique = list(dict.fromkeys(hashes))
+    if not unique:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            for chunk in _chunks(unique):
+                stmt = insert(AppliedRecord).values([
+                    {"task_id": task_id, "record_hash": h, "last_execution_id": execution_id}
+                    for h in chunk
+                ])
+                stmt = stmt.on_conflict_do_update(
+                    constraint="uq_applied_record",
+                    set_={"last_execution_id": stmt.excluded.last_execution_id, "applied_at": func.now()}
+                )
+                await db.execute(stmt)
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Failed to update applied-record index for task {task_id}: {e}")
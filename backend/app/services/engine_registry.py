@@ -0,0 +1,314 @@
+import redis.asyncio as aioredis
+from redis.exceptions import LockError
+from sqlalchemy import update
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import os
+import socket
+import uuid
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+import logging
+
+from app.config import settings
+from app.models.database import AsyncSessionLocal
+from app.models.execution import Execution
+
+logger = logging.getLogger(__name__)
+
+ENGINE_KEY = "engine:{session_id}"
+WORKER_KEY = "worker:{worker_id}"
+CONTROL_CHANNEL = "engine-control:{worker_id}"
+REPLY_KEY = "engine-reply:{request_id}"
+LOCK_KEY = "lock:{name}"
+EVENTS_CHANNEL = "engine-events"
+# Published when executions are queued so dispatching workers pick them up without waiting a poll
+QUEUE_CHANNEL = "execution-queue"
+
+# Deletes the registry entry only if this worker still owns it
+_RELEASE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current and cjson.decode(current)['worker'] == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class EngineRegistry:
+    """Redis-backed map of session_id -> owning backend worker.
+
+    Each uvicorn worker heartbeats a `worker:<id>` key and listens on its own
+    control channel. Control commands for an engine owned by another worker
+    are published there and answered through a short-lived reply list.
+    Session events are re-published so WebSocket viewers on any worker get
+    them. Entries whose worker stopped heartbeating are reaped and their
+    unfinished executions marked failed. The heartbeat value carries the
+    worker's role and current load so peers can report on every process.
+    """
+    def __init__(self):
+        self.enabled = settings.engine_registry_enabled
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._redis: Optional[aioredis.Redis] = None
+        self._tasks: List[asyncio.Task] = []
+        self._command_handler: Optional[Callable[[str, str], Awaitable[Dict[str, Any]]]] = None
+        self._event_handler: Optional[Callable[[str, Dict], Awaitable[None]]] = None
+        self._wake_handler: Optional[Callable[[], None]] = None
+        self._load_provider: Optional[Callable[[], Dict[str, Any]]] = None
+        self.stats_counters = {"forwarded": 0, "served": 0, "timeouts": 0, "orphans_reaped": 0}
+
+    async def start(
+        self,
+        command_handler: Callable[[str, str], Awaitable[Dict[str, Any]]],
+        event_handler: Callable[[str, Dict], Awaitable[None]],
+        wake_handler: Optional[Callable[[], None]] = None,
+        load_provider: Optional[Callable[[], Dict[str, Any]]] = None,
+    ):
+        if not self.enabled:
+            return
+        self._command_handler = command_handler
+        self._event_handler = event_handler
+        self._wake_handler = wake_handler
+        self._load_provider = load_provider
+        self._redis = aioredis.from_url(settings.redis_url, decode_responses=True)
+        try:
+            await self._heartbeat()
+            pubsub = self._redis.pubsub()
+            channels = [CONTROL_CHANNEL.format(worker_id=self.worker_id), EVENTS_CHANNEL]
+            if wake_handler:
+                channels.append(QUEUE_CHANNEL)
+            await pubsub.subscribe(*channels)
+        except Exception:
+            # Fall back to single-worker behaviour rather than failing every execution
+            await self._redis.close()
+            self._redis = None
+            raise
+        self._tasks = [
+            asyncio.create_task(self._listen(pubsub)),
+            asyncio.create_task(self._heartbeat_loop()),
+            asyncio.create_task(self._reap_loop()),
+        ]
+        logger.info(f"Engine registry started for worker {self.worker_id}")
+
+    async def shutdown(self, local_sessions: List[str]):
+        if not self._redis:
+            return
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        try:
+            # Engines die with this worker; dropping the heartbeat lets peers reap their entries
+            for session_id in local_sessions:
+                await self.unregister(session_id)
+            await self._redis.delete(WORKER_KEY.format(worker_id=self.worker_id))
+        finally:
+            await self._redis.close()
+            self._redis = None
+
+    @property
+    def connected(self) -> bool:
+        return self._redis is not None
+
+    async def register(self, session_id: str, execution_id: Optional[int] = None):
+        if not self._redis:
+            return
+        await self._redis.set(
+            ENGINE_KEY.format(session_id=session_id),
+            json.dumps({"worker": self.worker_id, "execution_id": execution_id})
+        )
+
+    async def unregister(self, session_id: str):
+        if not self._redis:
+            return
+        await self._redis.eval(_RELEASE_SCRIPT, 1, ENGINE_KEY.format(session_id=session_id), self.worker_id)
+
+    async def owner(self, session_id: str) -> Optional[Dict[str, Any]]:
+        if not self._redis:
+            return None
+        raw = await self._redis.get(ENGINE_KEY.format(session_id=session_id))
+        return json.loads(raw) if raw else None
+
+    async def is_alive(self, worker_id: str) -> bool:
+        return bool(await self._redis.exists(WORKER_KEY.format(worker_id=worker_id)))
+
+    async def forward(self, session_id: str, command: str) -> Optional[Dict[str, Any]]:
+        """Run `command` on the worker owning the session; None if no live owner exists"""
+        entry = await self.owner(session_id)
+        if not entry or entry["worker"] == self.worker_id:
+            return None
+        if not await self.is_alive(entry["worker"]):
+            await self._reap(session_id, entry)
+            return None
+
+        request_id = uuid.uuid4().hex
+        payload = json.dumps({"request_id": request_id, "session_id": session_id, "command": command})
+        receivers = await self._redis.publish(CONTROL_CHANNEL.format(worker_id=entry["worker"]), payload)
+        if not receivers:
+            await self._reap(session_id, entry)
+            return None
+        self.stats_counters["forwarded"] += 1
+        reply = await self._redis.blpop(REPLY_KEY.format(request_id=request_id), timeout=settings.engine_command_timeout)
+        if reply is None:
+            self.stats_counters["timeouts"] += 1
+            raise TimeoutError(f"Worker {entry['worker']} did not answer '{command}' for session {session_id}")
+        return json.loads(reply[1])
+
+    @asynccontextmanager
+    async def lock(self, name: str, expire_seconds: float):
+        """Mutex shared by every process on the registry; a no-op when it is not connected.
+
+        The key expires after `expire_seconds` so a crashed holder cannot block others forever.
+        """
+        if not self._redis:
+            yield
+            return
+        lock = self._redis.lock(LOCK_KEY.format(name=name), timeout=expire_seconds)
+        await lock.acquire()
+        try:
+            yield
+        finally:
+            try:
+                await lock.release()
+            except LockError as e:
+                logger.warning(f"Registry lock {name} expired before release: {e}")
+
+    async def publish_event(self, session_id: str, message: Dict):
+        if not self._redis:
+            return
+        try:
+            await self._redis.publish(
+                EVENTS_CHANNEL,
+                json.dumps({"origin": self.worker_id, "session_id": session_id, "message": message}, default=str)
+            )
+        except Exception as e:
+            logger.debug(f"Failed to publish session event: {e}")
+
+    async def notify_queue(self):
+        """Tell dispatching workers that new executions are waiting"""
+        if not self._redis:
+            return
+        try:
+            await self._redis.publish(QUEUE_CHANNEL, self.worker_id)
+        except Exception as e:
+            logger.debug(f"Failed to publish queue wake-up: {e}")
+
+    async def workers(self) -> List[Dict[str, Any]]:
+        """Live workers with their last reported role and load"""
+        if not self._redis:
+            return []
+        workers = []
+        async for key in self._redis.scan_iter(match=WORKER_KEY.format(worker_id="*"), count=200):
+            raw = await self._redis.get(key)
+            if not raw:
+                continue
+            try:
+                info = json.loads(raw)
+            except ValueError:
+                info = {}
+            if not isinstance(info, dict):
+                info = {}
+            workers.append({"worker_id": key.split(":", 1)[1], **info})
+        return sorted(workers, key=lambda w: w["worker_id"])
+
+    async def _listen(self, pubsub):
+        control_channel = CONTROL_CHANNEL.format(worker_id=self.worker_id)
+        while True:
+            try:
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    if message["channel"] == QUEUE_CHANNEL:
+                        if self._wake_handler:
+                            self._wake_handler()
+                        continue
+                    data = json.loads(message["data"])
+                    if message["channel"] == control_channel:
+                        asyncio.create_task(self._serve(data))
+                    elif data.get("origin") != self.worker_id and self._event_handler:
+                        await self._event_handler(data["session_id"], data["message"])
+            except asyncio.CancelledError:
+                await pubsub.close()
+                raise
+            except Exception as e:
+                logger.warning(f"Engine registry listener error: {e}")
+                await asyncio.sleep(1)
+
+    async def _serve(self, data: Dict[str, Any]):
+        try:
+            result = await self._command_handler(data["session_id"], data["command"])
+        except Exception as e:
+            result = {"found": True, "error": str(e)}
+        self.stats_counters["served"] += 1
+        reply_key = REPLY_KEY.format(request_id=data["request_id"])
+        await self._redis.rpush(reply_key, json.dumps(result, default=str))
+        await self._redis.expire(reply_key, max(1, int(settings.engine_command_timeout) * 2))
+
+    async def _heartbeat(self):
+        ttl = max(1, settings.engine_heartbeat_interval * 3)
+        info = {"pid": os.getpid()}
+        if self._load_provider:
+            try:
+                info.update(self._load_provider())
+            except Exception as e:
+                logger.debug(f"Worker load report failed: {e}")
+        await self._redis.set(WORKER_KEY.format(worker_id=self.worker_id), json.dumps(info, default=str), ex=ttl)
+
+    async def _heartbeat_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(settings.engine_heartbeat_interval)
+                await self._heartbeat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Engine registry heartbeat failed: {e}")
+
+    async def _reap_loop(self):
+        while True:
+            try:
+                await asyncio.sleep(settings.engine_heartbeat_interval * 2)
+                alive: Dict[str, bool] = {}
+                async for key in self._redis.scan_iter(match=ENGINE_KEY.format(session_id="*"), count=200):
+                    raw = await self._redis.get(key)
+                    if not raw:
+                        continue
+                    entry = json.loads(raw)
+                    worker = entry["worker"]
+                    if worker not in alive:
+                        alive[worker] = await self.is_alive(worker)
+                    if not alive[worker]:
+                        await self._reap(key.split(":", 1)[1], entry)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Engine registry reaper failed: {e}")
+
+    async def _reap(self, session_id: str, entry: Dict[str, Any]):
+        """Drop an entry whose worker died; the worker that wins the delete fails the execution"""
+        deleted = await self._redis.eval(
+            _RELEASE_SCRIPT, 1, ENGINE_KEY.format(session_id=session_id), entry["worker"]
+        )
+        if not deleted:
+            return
+        self.stats_counters["orphans_reaped"] += 1
+        logger.warning(f"Reaped orphaned engine for session {session_id} (worker {entry['worker']} is gone)")
+        if entry.get("execution_id") is None:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Execution)
+                    .where(Execution.id == entry["execution_id"])
+                    .where(Execution.status.in_(["pending", "running", "paused"]))
+                    .values(status="failed", error_message="Backend worker owning this session stopped")
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Failed to mark orphaned execution {entry['execution_id']} as failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "worker_id": self.worker_id, **self.stats_counters}
+
+
+# Global engine registry instance
+engine_registry = EngineRegistry()
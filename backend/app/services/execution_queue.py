@@ -0,0 +1,375 @@
+from sqlalchemy import select, update, func
+import asyncio
+import math
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Set
+import httpx
+import logging
+
+from app.config import settings
+from app.models.database import AsyncSessionLocal
+from app.models.execution import Execution
+from app.models.task import Task
+from app.models.file import File as FileModel
+from app.services.automation import AutomationEngine, automation_engines, websocket_manager, register_engine
+from app.services.engine_registry import engine_registry
+
+logger = logging.getLogger(__name__)
+
+# Statuses that hold (or are about to hold) a browser slot
+ACTIVE_STATUSES = ("pending", "running", "paused")
+
+
+def engines_holding_browser() -> int:
+    """Engines in this process that keep a browser, including finished runs left open for manual control"""
+    return sum(
+        1 for engine in automation_engines.values()
+        if not engine.hibernated and not engine.ended and (engine.is_running or engine.context is not None)
+    )
+
+
+# Arbitrary constant identifying the dispatcher's Postgres advisory lock
+_DISPATCH_LOCK_KEY = 7201904
+
+
+def task_snapshot(task: Task) -> Dict[str, Any]:
+    """Plain task snapshot handed to the engine's background run"""
+    return {
+        "id": task.id,
+        "name": task.name,
+        "steps": task.steps,
+        "script_path": task.script_path,
+        "network_policy": task.network_policy,
+        "auth_profile": task.auth_profile
+    }
+
+
+class ExecutionQueue:
+    """Persistent admission queue for executions.
+
+    Submitted executions are stored with status `queued`. A dispatcher loop
+    starts them while fewer than `execution_max_concurrent` are active, this
+    process's engines still holding a browser leave room, and the session
+    manager (in multi-session mode) reports free capacity.
+    Among queued executions the highest effective priority wins (priority
+    plus aging), then the user and task with the fewest active executions
+    relative to their weight, then the oldest submission.
+
+    In worker-pool mode the API process only submits (`dispatch=False`) and
+    each worker process dispatches up to its own `local_capacity` engines;
+    in-process the local capacity is `execution_max_concurrent` itself.
+    """
+    def __init__(self):
+        self._wake = asyncio.Event()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._launched: Set[asyncio.Task] = set()
+        self.dispatching = True
+        self.local_capacity: Optional[int] = None
+        self.dispatched = 0
+        self.deferred_passes = 0
+
+    async def start(self, dispatch: bool = True, local_capacity: Optional[int] = None):
+        self.dispatching = dispatch
+        self.local_capacity = local_capacity
+        await self._recover()
+        if dispatch and self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._dispatch_loop())
+
+    async def shutdown(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+            self._loop_task = None
+
+    def wake(self):
+        self._wake.set()
+        if not self.dispatching:
+            # Executions run in other processes; nudge their dispatchers
+            asyncio.create_task(engine_registry.notify_queue())
+
+    def wake_local(self):
+        self._wake.set()
+
+    async def _recover(self):
+        """Without a registry this worker is the only owner, so leftover active rows are dead"""
+        if engine_registry.enabled:
+            return
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Execution)
+                .where(Execution.status.in_(ACTIVE_STATUSES))
+                .values(status="failed", error_message="Backend restarted before the execution finished")
+            )
+            await db.commit()
+        if result.rowcount:
+            logger.warning(f"Marked {result.rowcount} interrupted executions as failed")
+
+    async def is_queued(self, session_id: str) -> bool:
+        async with AsyncSessionLocal() as db:
+            found = await db.execute(
+                select(Execution.id)
+                .where(Execution.session_id == session_id)
+                .where(Execution.status == "queued")
+            )
+            return found.first() is not None
+
+    async def cancel(self, session_id: str) -> bool:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(Execution)
+                .where(Execution.session_id == session_id)
+                .where(Execution.status == "queued")
+                .values(status="cancelled", end_time=func.now())
+            )
+            await db.commit()
+        return bool(result.rowcount)
+
+    async def _dispatch_loop(self):
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=settings.queue_poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                await self.dispatch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Execution queue dispatch failed: {e}")
+
+    async def _session_manager_capacity(self) -> Optional[int]:
+        if not settings.enable_multi_session:
+            return None
+        try:
+            async with httpx.AsyncClient() as client:
+                resp = await client.get(f"{settings.session_manager_url}/api/sessions", timeout=5.0)
+                resp.raise_for_status()
+                return max(0, int(resp.json().get("available", 0)))
+        except Exception as e:
+            # Unknown capacity: admit nothing rather than launch into failures
+            logger.warning(f"Session manager capacity check failed: {e}")
+            return 0
+
+    async def dispatch(self) -> int:
+        """Start as many queued executions as capacity allows; returns how many were started"""
+        # Finished runs keep their browser for manual control; count them like the workers do
+        local_capacity = self.local_capacity if self.local_capacity is not None else settings.execution_max_concurrent
+        local_free = local_capacity - engines_holding_browser()
+        if local_free <= 0:
+            local_free = await self._reclaim_finished(1 - local_free)
+        if local_free <= 0:
+            self.deferred_passes += 1
+            return 0
+        async with AsyncSessionLocal() as db:
+            # One dispatcher pass at a time across workers
+            if not (await db.execute(select(func.pg_try_advisory_xact_lock(_DISPATCH_LOCK_KEY)))).scalar():
+                return 0
+            active = await self._active_counts(db)
+            free = min(settings.execution_max_concurrent - active["total"], local_free)
+            if free <= 0:
+                self.deferred_passes += 1
+                return 0
+            queued = (await db.execute(select(Execution).where(Execution.status == "queued"))).scalars().all()
+            if not queued:
+                return 0
+            capacity = await self._session_manager_capacity()
+            if capacity is not None:
+                free = min(free, capacity)
+            if free <= 0:
+                self.deferred_passes += 1
+                return 0
+
+            started: List[Execution] = []
+            candidates = list(queued)
+            while candidates and len(started) < free:
+                chosen = min(candidates, key=lambda e: self._rank(e, active))
+                candidates.remove(chosen)
+                claimed = await db.execute(
+                    update(Execution)
+                    .where(Execution.id == chosen.id)
+                    .where(Execution.status == "queued")
+                    .values(status="pending")
+                )
+                if not claimed.rowcount:
+                    continue
+                started.append(chosen)
+                active["users"][chosen.user_id] = active["users"].get(chosen.user_id, 0) + 1
+                active["tasks"][chosen.task_id] = active["tasks"].get(chosen.task_id, 0) + 1
+            await db.commit()
+
+        for execution in started:
+            await self._launch(execution)
+        self.dispatched += len(started)
+        return len(started)
+
+    async def _reclaim_finished(self, needed: int) -> int:
+        """Hibernate finished engines held for manual control, least recently used first, while work is queued.
+
+        Without this, runs left open (hibernation off, or not yet idle long
+        enough) would hold every slot and stall the queue. Returns the slots freed.
+        """
+        async with AsyncSessionLocal() as db:
+            waiting = (await db.execute(
+                select(func.count(Execution.id)).where(Execution.status == "queued")
+            )).scalar_one()
+        if not waiting:
+            return 0
+        finished = sorted(
+            (e for e in automation_engines.values() if not e.is_running and not e.hibernated and not e.ended),
+            key=lambda e: e.last_activity
+        )
+        freed = 0
+        for engine in finished:
+            if freed >= min(needed, waiting):
+                break
+            try:
+                await engine.hibernate()
+            except Exception as e:
+                logger.warning(f"Failed to hibernate finished session {engine.session_id} for queued work: {e}")
+                continue
+            if engine.hibernated:
+                freed += 1
+                logger.info(f"Hibernated finished session {engine.session_id} to admit queued executions")
+        return freed
+
+    async def _active_counts(self, db) -> Dict[str, Any]:
+        rows = (await db.execute(
+            select(Execution.user_id, Execution.task_id, func.count(Execution.id))
+            .where(Execution.status.in_(ACTIVE_STATUSES))
+            .group_by(Execution.user_id, Execution.task_id)
+        )).all()
+        users: Dict[Optional[str], int] = {}
+        tasks: Dict[int, int] = {}
+        for user_id, task_id, count in rows:
+            users[user_id] = users.get(user_id, 0) + count
+            tasks[task_id] = tasks.get(task_id, 0) + count
+        return {"total": sum(users.values()), "users": users, "tasks": tasks}
+
+    @staticmethod
+    def _rank(execution: Execution, active: Dict[str, Any]):
+        """Sort key: lower runs first"""
+        priority = execution.priority or 0
+        queued_at = execution.queued_at or execution.created_at or datetime.now(timezone.utc)
+        if settings.queue_priority_aging_minutes > 0:
+            waited_min = (datetime.now(timezone.utc) - queued_at).total_seconds() / 60
+            priority += waited_min / settings.queue_priority_aging_minutes
+        user_weight = settings.queue_user_weights.get(execution.user_id or "", 1.0) or 1.0
+        task_weight = settings.queue_task_weights.get(str(execution.task_id), 1.0) or 1.0
+        user_share = active["users"].get(execution.user_id, 0) / user_weight
+        task_share = active["tasks"].get(execution.task_id, 0) / task_weight
+        return (-math.floor(priority), user_share, task_share, queued_at)
+
+    async def _launch(self, execution: Execution):
+        try:
+            async with AsyncSessionLocal() as db:
+                task = await db.get(Task, execution.task_id)
+                file_record = await db.get(FileModel, execution.file_id) if execution.file_id else None
+            if task is None:
+                raise ValueError(f"Task {execution.task_id} no longer exists")
+            options = execution.launch_options or {}
+            engine = AutomationEngine(execution.session_id, websocket_manager)
+            engine.execution_id = execution.id
+            # Counts as holding a browser from now on, before its run task gets scheduled
+            engine.is_running = True
+            await register_engine(engine)
+            run = asyncio.create_task(engine.execute_task(
+                task_snapshot(task),
+                file=file_record,
+                execution_id=execution.id,
+                resume=bool(options.get("resume")),
+                force=bool(options.get("force"))
+            ))
+            self._launched.add(run)
+            run.add_done_callback(self._on_finished)
+            logger.info(f"Dispatched execution {execution.id} (session {execution.session_id}, user {execution.user_id})")
+        except Exception as e:
+            logger.error(f"Failed to launch execution {execution.id}: {e}")
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Execution).where(Execution.id == execution.id).values(status="failed", error_message=str(e))
+                )
+                await db.commit()
+
+    def _on_finished(self, task: asyncio.Task):
+        self._launched.discard(task)
+        self.wake_local()
+
+    async def status(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Queue depth and, for a session, its position and estimated start time"""
+        active, order, avg_duration = await self._snapshot()
+        result: Dict[str, Any] = {
+            "queued": len(order),
+            "total": len(order),
+            "active": active["total"],
+            "max_concurrent": settings.execution_max_concurrent,
+            "avg_duration_seconds": round(avg_duration, 1),
+        }
+        if session_id:
+            result["session_id"] = session_id
+            result.update(self._estimate(order, session_id, active, avg_duration))
+        return result
+
+    async def positions(self, session_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Position and ETA for several sessions from one queue snapshot"""
+        active, order, avg_duration = await self._snapshot()
+        return {sid: self._estimate(order, sid, active, avg_duration) for sid in session_ids}
+
+    async def _snapshot(self):
+        async with AsyncSessionLocal() as db:
+            active = await self._active_counts(db)
+            queued = (await db.execute(select(Execution).where(Execution.status == "queued"))).scalars().all()
+            recent = (await db.execute(
+                select(Execution.start_time, Execution.end_time)
+                .where(Execution.start_time.isnot(None))
+                .where(Execution.end_time.isnot(None))
+                .order_by(Execution.end_time.desc())
+                .limit(50)
+            )).all()
+        durations = [(end - start).total_seconds() for start, end in recent if end > start]
+        avg_duration = sum(durations) / len(durations) if durations else settings.queue_default_duration_seconds
+
+        # Simulate dispatch order with the same ranking the dispatcher uses
+        order: List[Execution] = []
+        counts = {"users": dict(active["users"]), "tasks": dict(active["tasks"])}
+        candidates = list(queued)
+        while candidates:
+            chosen = min(candidates, key=lambda e: self._rank(e, counts))
+            candidates.remove(chosen)
+            order.append(chosen)
+            counts["users"][chosen.user_id] = counts["users"].get(chosen.user_id, 0) + 1
+            counts["tasks"][chosen.task_id] = counts["tasks"].get(chosen.task_id, 0) + 1
+        return active, order, avg_duration
+
+    @staticmethod
+    def _estimate(order: List[Execution], session_id: str, active: Dict[str, Any], avg_duration: float) -> Dict[str, Any]:
+        position = next((i for i, e in enumerate(order, 1) if e.session_id == session_id), None)
+        result: Dict[str, Any] = {"position": position}
+        if position is not None:
+            # Slots free in waves of `cap`; the first wave waits on whatever is running now
+            cap = max(1, settings.execution_max_concurrent)
+            free_now = max(0, cap - active["total"])
+            waves = 0 if position <= free_now else math.ceil((position - free_now) / cap)
+            result["eta_seconds"] = round(waves * avg_duration, 1)
+        return result
+
+    def load(self) -> Dict[str, Any]:
+        """This process's engine load, reported through the registry heartbeat"""
+        return {
+            "dispatching": self.dispatching,
+            "engines": len(automation_engines),
+            "holding_browser": engines_holding_browser(),
+            "running": sum(1 for e in automation_engines.values() if e.is_running),
+            "capacity": self.local_capacity,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "dispatching": self.dispatching,
+            "dispatched": self.dispatched,
+            "deferred_passes": self.deferred_passes,
+            "launched_here": len(self._launched),
+        }
+
+
+# Global execution queue instance
+execution_queue = ExecutionQueue()
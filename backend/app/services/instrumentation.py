@@ -0,0 +1,181 @@
+from playwright.async_api import Page, Locator
+import bisect
+import time
+from typing import Dict, Any, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+BUCKET_BOUNDS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# Page/Locator methods timed as actions
+PAGE_ACTIONS = {
+    "goto", "reload", "go_back", "click", "fill", "type", "press", "select_option", "check",
+    "wait_for_selector", "wait_for_load_state", "wait_for_url", "wait_for_timeout",
+    "evaluate", "screenshot",
+}
+# Page actions whose first argument is a selector (used as the locator key)
+PAGE_SELECTOR_ACTIONS = {"click", "fill", "type", "press", "select_option", "check", "wait_for_selector"}
+LOCATOR_ACTIONS = {
+    "click", "dblclick", "fill", "type", "press", "select_option", "check", "uncheck",
+    "hover", "wait_for", "evaluate", "text_content", "inner_text", "input_value", "is_visible",
+    "screenshot",
+}
+# Methods returning a Locator that should stay instrumented
+PAGE_LOCATOR_FACTORIES = {
+    "locator", "get_by_role", "get_by_text", "get_by_label", "get_by_placeholder",
+    "get_by_test_id", "get_by_alt_text", "get_by_title",
+}
+LOCATOR_FACTORIES = PAGE_LOCATOR_FACTORIES | {"nth", "filter", "and_", "or_"}
+LOCATOR_PROPERTIES = {"first", "last"}
+# Distinct locator keys tracked per execution before the rest are pooled under "other"
+MAX_LOCATOR_KEYS = 200
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with count/sum/min/max"""
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms: Optional[float] = None
+        self.max_ms = 0.0
+        self.errors = 0
+
+    def observe(self, ms: float, error: bool = False):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+        if error:
+            self.errors += 1
+
+    def percentile(self, q: float) -> float:
+        """Bucket upper bound containing the q-th quantile (max for the open bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return float(BUCKET_BOUNDS_MS[i]) if i < len(BUCKET_BOUNDS_MS) else round(self.max_ms, 1)
+        return round(self.max_ms, 1)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 1),
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "min_ms": round(self.min_ms or 0.0, 1),
+            "max_ms": round(self.max_ms, 1),
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": dict(zip([*map(str, BUCKET_BOUNDS_MS), "inf"], self.buckets)),
+        }
+
+
+class ActionMetrics:
+    """Per-execution latency histograms keyed by action type and by action + locator"""
+    def __init__(self):
+        self.by_action: Dict[str, LatencyHistogram] = {}
+        self.by_locator: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    def observe(self, action: str, target: Optional[str], ms: float, error: bool = False):
+        self.by_action.setdefault(action, LatencyHistogram()).observe(ms, error)
+        if target:
+            key = (action, target)
+            if key not in self.by_locator and len(self.by_locator) >= MAX_LOCATOR_KEYS:
+                key = (action, "other")
+            self.by_locator.setdefault(key, LatencyHistogram()).observe(ms, error)
+
+    def summary(self, top_locators: int = 20) -> Dict[str, Any]:
+        """Action histograms plus the slowest locators by total time"""
+        slowest = sorted(self.by_locator.items(), key=lambda item: item[1].total_ms, reverse=True)
+        return {
+            "actions": {action: hist.summary() for action, hist in sorted(self.by_action.items())},
+            "locators": [
+                {"action": action, "locator": target, **hist.summary()}
+                for (action, target), hist in slowest[:top_locators]
+            ],
+        }
+
+
+def _unwrap(value):
+    return value._target if isinstance(value, _Instrumented) else value
+
+
+def _describe(factory: str, args, kwargs) -> str:
+    parts = [repr(a) for a in args] + [f"{k}={v!r}" for k, v in kwargs.items()]
+    return f"{factory}({', '.join(parts)})"
+
+
+def _build_locator(factory, name: str, metrics: "ActionMetrics", prefix: Optional[str], args, kwargs) -> "InstrumentedLocator":
+    """Call a locator factory with real Playwright objects and wrap the result"""
+    label = _describe(name, args, kwargs)
+    locator = factory(*[_unwrap(a) for a in args], **{k: _unwrap(v) for k, v in kwargs.items()})
+    return InstrumentedLocator(locator, metrics, f"{prefix}.{label}" if prefix else label)
+
+
+class _Instrumented:
+    """Delegating proxy that times configured async methods"""
+    def __init__(self, target, metrics: ActionMetrics, label: Optional[str]):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_metrics", metrics)
+        object.__setattr__(self, "_label", label)
+
+    def _timed(self, name: str, method):
+        async def timed(*args, **kwargs):
+            target = self._label
+            if target is None and name in PAGE_SELECTOR_ACTIONS and args and isinstance(args[0], str):
+                target = args[0]
+            started = time.perf_counter()
+            try:
+                result = await method(*args, **kwargs)
+            except Exception:
+                self._metrics.observe(name, target, (time.perf_counter() - started) * 1000, error=True)
+                raise
+            self._metrics.observe(name, target, (time.perf_counter() - started) * 1000)
+            return result
+        return timed
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+
+class InstrumentedLocator(_Instrumented):
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name in LOCATOR_PROPERTIES:
+            return InstrumentedLocator(attr, self._metrics, f"{self._label}.{name}")
+        if name in LOCATOR_FACTORIES and callable(attr):
+            return lambda *args, **kwargs: _build_locator(attr, name, self._metrics, self._label, args, kwargs)
+        if name in LOCATOR_ACTIONS and callable(attr):
+            return self._timed(name, attr)
+        return attr
+
+    @property
+    def unwrapped(self) -> Locator:
+        return self._target
+
+
+class InstrumentedPage(_Instrumented):
+    """Page proxy handed to scripts; records action latencies into `metrics`"""
+    def __init__(self, page: Page, metrics: ActionMetrics):
+        super().__init__(page, metrics, None)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name in PAGE_LOCATOR_FACTORIES and callable(attr):
+            return lambda *args, **kwargs: _build_locator(attr, name, self._metrics, None, args, kwargs)
+        if name in PAGE_ACTIONS and callable(attr):
+            return self._timed(name, attr)
+        return attr
+
+    @property
+    def unwrapped(self) -> Page:
+        return self._target
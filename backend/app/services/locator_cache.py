@@ -0,0 +1,176 @@
+from playwright.async_api import Page, Locator
+from typing import Dict, Any, Callable, Optional, Tuple
+from urllib.parse import urlparse
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Derives a stable CSS selector and a fingerprint for a resolved element.
+# Unique id / test-id / name / aria-label / placeholder attributes are preferred
+# over a structural nth-of-type path.
+_DESCRIBE_JS = """
+el => {
+    const esc = v => CSS.escape(v);
+    const unique = sel => { try { return document.querySelectorAll(sel).length === 1; } catch (e) { return false; } };
+    const tag = el.tagName.toLowerCase();
+    const fingerprint = {
+        tag: el.tagName,
+        text: (el.innerText || '').trim().slice(0, 100),
+        aria: el.getAttribute('aria-label'),
+        placeholder: el.getAttribute('placeholder'),
+        name: el.getAttribute('name'),
+        type: el.getAttribute('type')
+    };
+    let css = null;
+    if (el.id && unique('#' + esc(el.id))) css = '#' + esc(el.id);
+    for (const attr of ['data-testid', 'data-test', 'name', 'aria-label', 'placeholder']) {
+        if (css) break;
+        const v = el.getAttribute(attr);
+        if (v && unique(`${tag}[${attr}="${esc(v)}"]`)) css = `${tag}[${attr}="${esc(v)}"]`;
+    }
+    if (!css) {
+        const parts = [];
+        let node = el;
+        while (node && node.nodeType === 1 && node !== document.documentElement) {
+            if (node.id && unique('#' + esc(node.id))) { parts.unshift('#' + esc(node.id)); break; }
+            let part = node.tagName.toLowerCase();
+            const parent = node.parentElement;
+            if (parent) {
+                const same = Array.from(parent.children).filter(c => c.tagName === node.tagName);
+                if (same.length > 1) part += `:nth-of-type(${same.indexOf(node) + 1})`;
+            }
+            parts.unshift(part);
+            node = parent;
+        }
+        css = parts.join(' > ');
+    }
+    return {css, fingerprint};
+}
+"""
+
+# Fingerprint field -> attribute it records
+_FINGERPRINT_ATTRS = {"aria": "aria-label", "placeholder": "placeholder", "name": "name", "type": "type"}
+
+
+def _css_string(value: str) -> str:
+    """Quote `value` as a CSS string per CSSOM "serialize a string", as browsers serialize attribute selectors"""
+    out = []
+    for ch in value:
+        code = ord(ch)
+        if code == 0:
+            out.append("\ufffd")
+        elif code < 0x20 or code == 0x7f:
+            out.append(f"\\{code:x} ")
+        elif ch in ('"', "\\"):
+            out.append("\\" + ch)
+        else:
+            out.append(ch)
+    return '"' + "".join(out) + '"'
+
+
+def _pinned_locator(page: Page, css: str, fingerprint: Dict[str, Any]) -> Locator:
+    """The derived CSS narrowed by the fingerprint, so a changed element simply does not match"""
+    selector = f"{css}:is({fingerprint['tag'].lower()})"
+    for field, attr in _FINGERPRINT_ATTRS.items():
+        value = fingerprint.get(field)
+        selector += f"[{attr}={_css_string(value)}]" if value is not None else f":not([{attr}])"
+    locator = page.locator(selector)
+    if fingerprint.get("text"):
+        locator = locator.filter(has_text=fingerprint["text"])
+    return locator
+
+
+class CachedLocator:
+    def __init__(self, css: str, fingerprint: Dict[str, Any], locator: Locator):
+        self.css = css
+        self.fingerprint = fingerprint
+        self.locator = locator
+
+
+class PinnedTarget:
+    """Deferred lookup returned by `LocatorCache.role`/`placeholder`; resolution happens in the action"""
+    def __init__(self, cache: "LocatorCache", key: str, build: Callable[[], Locator]):
+        self.cache = cache
+        self.key = key
+        self.build = build
+
+    async def click(self, **kwargs):
+        return await self.cache.act(self.key, self.build, "click", **kwargs)
+
+    async def fill(self, value: str, **kwargs):
+        return await self.cache.act(self.key, self.build, "fill", value, **kwargs)
+
+
+class LocatorCache:
+    """Opt-in cache mapping semantic (role/placeholder) locators to CSS handles.
+
+    The first lookup for a key on a page template (URL without query/fragment)
+    does the full accessibility-tree resolution and derives a CSS selector
+    narrowed by the element's fingerprint. Later actions run straight against
+    that selector with a short timeout, so a valid pin costs no extra round
+    trip; if it no longer matches exactly one element the pin is dropped and
+    the action is retried through full resolution.
+    """
+    def __init__(self, page: Page, enabled: Optional[bool] = None):
+        self.page = page
+        self.enabled = settings.locator_cache_enabled if enabled is None else enabled
+        self._entries: Dict[Tuple[str, str], CachedLocator] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _template(self) -> str:
+        parsed = urlparse(self.page.url)
+        return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+
+    def role(self, role: str, name: Optional[str] = None) -> PinnedTarget:
+        return PinnedTarget(self, f"role={role}[name={name!r}]", lambda: self.page.get_by_role(role, name=name))
+
+    def placeholder(self, text: str) -> PinnedTarget:
+        return PinnedTarget(self, f"placeholder={text!r}", lambda: self.page.get_by_placeholder(text))
+
+    async def act(self, key: str, build: Callable[[], Locator], action: str, *args, **kwargs):
+        """Run `action` (a Locator method) on the pinned handle, falling back to full resolution"""
+        if not self.enabled:
+            return await getattr(build(), action)(*args, **kwargs)
+
+        cache_key = (self._template(), key)
+        cached = self._entries.get(cache_key)
+        if cached:
+            try:
+                result = await getattr(cached.locator, action)(
+                    *args, **{**kwargs, "timeout": settings.locator_cache_attempt_timeout_ms}
+                )
+                self.hits += 1
+                return result
+            except Exception as e:
+                # Missing, ambiguous or changed element: the action did not run, so retry unpinned
+                logger.debug(f"Pinned locator for {key} failed, re-resolving: {e}")
+                self.invalidations += 1
+                self._entries.pop(cache_key, None)
+
+        locator = await self._pin(cache_key, key, build)
+        return await getattr(locator, action)(*args, **kwargs)
+
+    async def _pin(self, cache_key: Tuple[str, str], key: str, build: Callable[[], Locator]) -> Locator:
+        self.misses += 1
+        locator = build()
+        try:
+            described = await locator.evaluate(_DESCRIBE_JS, timeout=settings.playwright_timeout)
+            css, fingerprint = described["css"], described["fingerprint"]
+            self._entries[cache_key] = CachedLocator(css, fingerprint, _pinned_locator(self.page, css, fingerprint))
+        except Exception as e:
+            # Element not resolvable yet (or ambiguous); use the semantic locator uncached
+            logger.debug(f"Locator cache could not pin {key}: {e}")
+        return locator
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
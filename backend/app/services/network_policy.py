@@ -0,0 +1,149 @@
+from playwright.async_api import BrowserContext, Route, Request, Response
+from fnmatch import fnmatch
+from urllib.parse import urlparse
+from typing import Dict, Any, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Well-known analytics / ad hosts blocked when `block_trackers` is enabled
+TRACKER_HOSTS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "segment.io",
+    "segment.com",
+    "mixpanel.com",
+    "amplitude.com",
+    "fullstory.com",
+    "clarity.ms",
+    "newrelic.com",
+    "nr-data.net",
+    "sentry.io",
+]
+
+# Rough typical transfer sizes (bytes) per resource type, only for the separate
+# `estimated_bytes_saved` of types blocked outright (never measured)
+DEFAULT_RESOURCE_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "stylesheet": 20_000,
+    "script": 30_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+}
+
+
+def _host_matches(host: str, patterns: List[str]) -> bool:
+    return any(host == p or host.endswith(f".{p}") for p in patterns)
+
+
+class NetworkPolicyEnforcer:
+    """Applies a task's declarative network policy to a BrowserContext via `context.route`.
+
+    Blocked requests are aborted; everything else falls back to any other
+    route handlers (or the network). Bytes saved are derived from the
+    measured average size of allowed responses of the same resource type.
+    Types that were never allowed through have no measurement; their counts
+    are reported separately, with a rough `estimated_bytes_saved` from
+    `DEFAULT_RESOURCE_BYTES`.
+    """
+    def __init__(self, policy: Dict[str, Any]):
+        policy = policy or {}
+        self.block_resource_types = set(policy.get("block_resource_types") or [])
+        self.block_url_patterns: List[str] = list(policy.get("block_url_patterns") or [])
+        self.block_hosts: List[str] = [h.lower() for h in (policy.get("block_hosts") or [])]
+        self.allow_hosts: List[str] = [h.lower() for h in (policy.get("allow_hosts") or [])]
+        if policy.get("block_trackers"):
+            self.block_hosts.extend(TRACKER_HOSTS)
+
+        self.allowed_count = 0
+        self.blocked_count = 0
+        self.blocked_by_reason: Dict[str, int] = {}
+        self.blocked_by_type: Dict[str, int] = {}
+        self._observed_bytes: Dict[str, int] = {}
+        self._observed_count: Dict[str, int] = {}
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.block_resource_types or self.block_url_patterns or self.block_hosts)
+
+    async def attach(self, context: BrowserContext):
+        """Register the route handler and response observer on the context"""
+        await context.route("**/*", self._handle)
+        context.on("response", self._observe_response)
+
+    def match(self, url: str, resource_type: str) -> Optional[str]:
+        """Return the reason a request is blocked, or None if it is allowed"""
+        host = (urlparse(url).hostname or "").lower()
+        if self.allow_hosts and _host_matches(host, self.allow_hosts):
+            return None
+        if resource_type in self.block_resource_types:
+            return "resource_type"
+        if host and _host_matches(host, self.block_hosts):
+            return "host"
+        if any(fnmatch(url, pattern) for pattern in self.block_url_patterns):
+            return "url_pattern"
+        return None
+
+    async def _handle(self, route: Route, request: Request):
+        reason = self.match(request.url, request.resource_type)
+        if reason is None:
+            self.allowed_count += 1
+            await route.fallback()
+            return
+        self.blocked_count += 1
+        self.blocked_by_reason[reason] = self.blocked_by_reason.get(reason, 0) + 1
+        self.blocked_by_type[request.resource_type] = self.blocked_by_type.get(request.resource_type, 0) + 1
+        await route.abort("blockedbyclient")
+
+    def _observe_response(self, response: Response):
+        try:
+            length = int(response.headers.get("content-length", "0"))
+        except (TypeError, ValueError):
+            return
+        if length <= 0:
+            return
+        resource_type = response.request.resource_type
+        self._observed_bytes[resource_type] = self._observed_bytes.get(resource_type, 0) + length
+        self._observed_count[resource_type] = self._observed_count.get(resource_type, 0) + 1
+
+    def bytes_saved_estimate(self) -> int:
+        """Bytes not downloaded, from the measured average size of allowed responses of each blocked type"""
+        total = 0
+        for resource_type, blocked in self.blocked_by_type.items():
+            count = self._observed_count.get(resource_type)
+            if count:
+                total += blocked * (self._observed_bytes[resource_type] // count)
+        return total
+
+    def unmeasured_blocked(self) -> Dict[str, int]:
+        """Blocked counts for types never seen in an allowed response, so with no measured size"""
+        return {
+            resource_type: blocked
+            for resource_type, blocked in self.blocked_by_type.items()
+            if not self._observed_count.get(resource_type)
+        }
+
+    def estimated_bytes_saved(self) -> int:
+        """Guess for the unmeasured types from `DEFAULT_RESOURCE_BYTES`; not telemetry"""
+        return sum(
+            blocked * DEFAULT_RESOURCE_BYTES.get(resource_type, 0)
+            for resource_type, blocked in self.unmeasured_blocked().items()
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "allowed": self.allowed_count,
+            "blocked": self.blocked_count,
+            "blocked_by_reason": dict(self.blocked_by_reason),
+            "blocked_by_type": dict(self.blocked_by_type),
+            "bytes_saved_estimate": self.bytes_saved_estimate(),
+            "unmeasured_blocked_by_type": self.unmeasured_blocked(),
+            "estimated_bytes_saved": self.estimated_bytes_saved(),
+        }
@@ -0,0 +1,138 @@
+from sqlalchemy import update
+from contextlib import asynccontextmanager
+import asyncio
+import time
+from typing import Dict, Any, Optional
+import logging
+
+from app.config import settings
+from app.models.database import AsyncSessionLocal
+from app.models.execution import Execution
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingUpdate:
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self.count = 0
+        self.first_at = time.monotonic()
+
+
+class ProgressWriter:
+    """Write-behind buffer for Execution row updates.
+
+    Updates for an execution are merged in memory (latest value wins) and
+    written as one UPDATE when `progress_flush_max_pending` updates have
+    accumulated or `progress_flush_interval_ms` has passed. Any status
+    change is flushed immediately together with whatever was buffered.
+    Writes for one execution are serialized by a per-execution lock, so an
+    older batch can never commit after a newer one.
+    """
+    def __init__(self):
+        self._pending: Dict[int, _PendingUpdate] = {}
+        # execution id -> [lock, holders and waiters]; dropped when nobody uses it
+        self._write_locks: Dict[int, list] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self.updates_received = 0
+        self.writes_issued = 0
+        self._per_execution: Dict[int, Dict[str, int]] = {}
+
+    async def update(self, execution_id: int, fields: Dict[str, Any], force: bool = False):
+        """Buffer `fields` for the execution; flush now if forced or over threshold"""
+        if not fields:
+            return
+        self._ensure_flusher()
+        self.updates_received += 1
+        counters = self._per_execution.setdefault(execution_id, {"updates": 0, "writes": 0})
+        counters["updates"] += 1
+
+        pending = self._pending.get(execution_id)
+        if pending is None:
+            pending = self._pending[execution_id] = _PendingUpdate()
+        pending.fields.update(fields)
+        pending.count += 1
+
+        if force or "status" in fields or pending.count >= settings.progress_flush_max_pending:
+            await self.flush(execution_id)
+
+    async def flush(self, execution_id: Optional[int] = None):
+        """Write buffered fields for one execution, or for all when omitted"""
+        ids = [execution_id] if execution_id is not None else list(self._pending.keys())
+        for eid in ids:
+            async with self._serialized(eid):
+                pending = self._pending.pop(eid, None)
+                if pending is not None:
+                    await self._write(eid, pending.fields)
+
+    @asynccontextmanager
+    async def _serialized(self, execution_id: int):
+        entry = self._write_locks.setdefault(execution_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._write_locks[execution_id]
+
+    async def _write(self, execution_id: int, fields: Dict[str, Any]):
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Execution)
+                    .where(Execution.id == execution_id)
+                    .values(**fields)
+                )
+                await db.commit()
+            self.writes_issued += 1
+            counters = self._per_execution.get(execution_id)
+            if counters:
+                counters["writes"] += 1
+        except Exception as e:
+            logger.error(f"Failed to update execution {execution_id}: {e}")
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        interval = settings.progress_flush_interval_ms / 1000
+        while True:
+            try:
+                await asyncio.sleep(interval / 2)
+                now = time.monotonic()
+                due = [eid for eid, p in list(self._pending.items()) if now - p.first_at >= interval]
+                for eid in due:
+                    await self.flush(eid)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Progress flush loop error: {e}")
+
+    async def shutdown(self):
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+    def execution_stats(self, execution_id: int) -> Dict[str, int]:
+        counters = self._per_execution.get(execution_id, {"updates": 0, "writes": 0})
+        return {**counters, "writes_saved": counters["updates"] - counters["writes"]}
+
+    def forget(self, execution_id: int):
+        """Drop the execution's counters once it has ended; buffered fields are still written"""
+        self._per_execution.pop(execution_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "updates_received": self.updates_received,
+            "writes_issued": self.writes_issued,
+            "writes_saved": self.updates_received - self.writes_issued,
+            "pending_executions": len(self._pending),
+        }
+
+
+# Global progress writer instance
+progress_writer = ProgressWriter()
@@ -0,0 +1,133 @@
+from playwright.async_api import Page, CDPSession
+import asyncio
+import time
+from typing import Dict, Any, Awaitable, Callable, Optional
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ScreencastSession:
+    """Streams CDP `Page.startScreencast` JPEG frames to one viewer.
+
+    Chrome only produces the next frame after the previous one is acked, so
+    the Chrome ack is held back until the viewer acks the frame (or
+    `screencast_ack_timeout` elapses) and the `max_fps` interval has passed.
+    A slow viewer therefore slows the stream instead of queueing frames.
+    """
+    def __init__(
+        self,
+        page: Page,
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+        quality: int = None,
+        max_fps: float = None,
+        max_width: Optional[int] = None,
+        max_height: Optional[int] = None
+    ):
+        self.page = page
+        self.send = send
+        self.quality = max(1, min(100, int(quality or settings.screencast_default_quality)))
+        self.max_fps = max(0.1, min(float(max_fps or settings.screencast_default_max_fps), settings.screencast_max_fps))
+        self.max_width = max_width or settings.playwright_viewport_width
+        self.max_height = max_height or settings.playwright_viewport_height
+        self.cdp: Optional[CDPSession] = None
+        self.running = False
+        self._client_ack = asyncio.Event()
+        self._last_frame_id = 0
+        self._last_sent_at = 0.0
+        self._started_at = 0.0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.ack_timeouts = 0
+
+    async def start(self):
+        """Attach a CDP session to the page and start the screencast"""
+        self.cdp = await self.page.context.new_cdp_session(self.page)
+        self.cdp.on("Page.screencastFrame", self._on_frame)
+        self.running = True
+        self._started_at = time.monotonic()
+        await self.cdp.send("Page.startScreencast", {
+            "format": "jpeg",
+            "quality": self.quality,
+            "maxWidth": self.max_width,
+            "maxHeight": self.max_height,
+            "everyNthFrame": 1
+        })
+        logger.info(f"Screencast started (quality={self.quality}, max_fps={self.max_fps})")
+
+    async def stop(self):
+        """Stop the screencast and detach from the page"""
+        if not self.running:
+            return
+        self.running = False
+        self._client_ack.set()
+        try:
+            await self.cdp.send("Page.stopScreencast")
+            await self.cdp.detach()
+        except Exception as e:
+            logger.debug(f"Screencast stop error: {e}")
+        logger.info(f"Screencast stopped: {self.stats()}")
+
+    def ack(self, frame_id: int):
+        """Viewer acknowledged a frame"""
+        if frame_id >= self._last_frame_id:
+            self._client_ack.set()
+
+    def _on_frame(self, params: Dict[str, Any]):
+        asyncio.create_task(self._deliver(params))
+
+    async def _deliver(self, params: Dict[str, Any]):
+        if not self.running:
+            return
+        data = params.get("data", "")
+        self._last_frame_id += 1
+        frame_id = self._last_frame_id
+        self._client_ack.clear()
+        try:
+            await self.send({
+                "type": "screencast_frame",
+                "frame_id": frame_id,
+                "format": "jpeg",
+                "data": data,
+                "metadata": params.get("metadata", {})
+            })
+            self.frames_sent += 1
+            # Base64 payload size is what actually crosses the WebSocket
+            self.bytes_sent += len(data)
+            self._last_sent_at = time.monotonic()
+
+            try:
+                await asyncio.wait_for(self._client_ack.wait(), timeout=settings.screencast_ack_timeout)
+            except asyncio.TimeoutError:
+                self.ack_timeouts += 1
+
+            # Throttle to max_fps by delaying the ack that lets Chrome render the next frame
+            delay = (1.0 / self.max_fps) - (time.monotonic() - self._last_sent_at)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except Exception as e:
+            logger.warning(f"Screencast frame delivery failed: {e}")
+            await self.stop()
+            return
+
+        if self.running:
+            try:
+                await self.cdp.send("Page.screencastFrameAck", {"sessionId": params["sessionId"]})
+            except Exception as e:
+                logger.debug(f"Screencast ack failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self._started_at, 1e-6) if self._started_at else 0.0
+        return {
+            "quality": self.quality,
+            "max_fps": self.max_fps,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "ack_timeouts": self.ack_timeouts,
+            "elapsed_seconds": round(elapsed, 1),
+            "avg_fps": round(self.frames_sent / elapsed, 2) if elapsed else 0.0,
+            "avg_kbps": round(self.bytes_sent * 8 / 1000 / elapsed, 1) if elapsed else 0.0,
+            "avg_frame_bytes": self.bytes_sent // self.frames_sent if self.frames_sent else 0
+        }
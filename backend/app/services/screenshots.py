@@ -0,0 +1,160 @@
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import asyncio
+import contextvars
+import io
+import os
+import time
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Set, Tuple
+import logging
+
+from app.config import settings
+from app.services.artifact_store import artifact_store, artifact_url
+
+logger = logging.getLogger(__name__)
+
+_CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+
+# Owner of captures made in the current task (the engine sets its session id), so
+# an execution drains only its own uploads
+capture_owner: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("screenshot_capture_owner", default=None)
+
+
+def encode_screenshot(raw_png: bytes, fmt: str, quality: int, thumbnail_width: int) -> Tuple[bytes, Optional[bytes]]:
+    """Re-encode a raw PNG capture and build a thumbnail (runs on a worker thread)"""
+    image = Image.open(io.BytesIO(raw_png))
+    if fmt in ("jpeg", "webp") and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    def save(img) -> bytes:
+        buffer = io.BytesIO()
+        if fmt == "webp":
+            img.save(buffer, format="WEBP", quality=quality, method=4)
+        elif fmt == "jpeg":
+            img.save(buffer, format="JPEG", quality=quality, optimize=True)
+        else:
+            img.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue()
+
+    encoded = save(image)
+    thumbnail = None
+    if thumbnail_width and image.width > thumbnail_width:
+        thumb = image.copy()
+        thumb.thumbnail((thumbnail_width, thumbnail_width * image.height // image.width))
+        thumbnail = save(thumb)
+    return encoded, thumbnail
+
+
+class ScreenshotPipeline:
+    """Off-loop screenshot encoding and upload.
+
+    Callers only await the raw in-memory capture. Encoding to WebP/JPEG and
+    thumbnailing run on a worker pool, then both images go to the
+    content-addressed artifact store in the background; `on_stored` is called
+    with their URLs and digests once done.
+    """
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[asyncio.Task] = set()
+        self._pending_by_owner: Dict[Optional[str], Set[asyncio.Task]] = {}
+        self.captured = 0
+        self.stored = 0
+        self.failed = 0
+        self.capture_ms_total = 0.0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.screenshot_workers),
+                thread_name_prefix="screenshot"
+            )
+        return self._executor
+
+    async def capture(
+        self,
+        page,
+        name: str,
+        on_stored: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        full_page: bool = False,
+    ) -> str:
+        """Grab the raw capture and queue encoding/upload; returns the screenshot's file name"""
+        fmt = settings.screenshot_format.lower()
+        if fmt not in _CONTENT_TYPES:
+            raise ValueError(f"Unsupported screenshot format '{settings.screenshot_format}'")
+        stem = os.path.splitext(os.path.basename(name))[0] or f"screenshot_{int(time.time())}"
+        file_name = f"{stem}.{'jpg' if fmt == 'jpeg' else fmt}"
+
+        started = time.perf_counter()
+        raw = await page.screenshot(type="png", full_page=full_page)
+        self.capture_ms_total += (time.perf_counter() - started) * 1000
+        self.captured += 1
+        self.raw_bytes += len(raw)
+
+        task = asyncio.create_task(self._process(raw, fmt, file_name, on_stored))
+        owner = capture_owner.get()
+        self._pending.add(task)
+        self._pending_by_owner.setdefault(owner, set()).add(task)
+        task.add_done_callback(lambda t: self._finished(owner, t))
+        return file_name
+
+    def _finished(self, owner: Optional[str], task: asyncio.Task):
+        self._pending.discard(task)
+        owned = self._pending_by_owner.get(owner)
+        if owned is not None:
+            owned.discard(task)
+            if not owned:
+                del self._pending_by_owner[owner]
+
+    async def _process(self, raw: bytes, fmt: str, file_name: str, on_stored):
+        loop = asyncio.get_running_loop()
+        try:
+            encoded, thumbnail = await loop.run_in_executor(
+                self._pool(), encode_screenshot, raw, fmt, settings.screenshot_quality, settings.screenshot_thumbnail_width
+            )
+            content_type = _CONTENT_TYPES[fmt]
+            digest = await artifact_store.put(encoded, content_type)
+            result = {"screenshot": artifact_url(digest), "artifact": digest, "name": file_name}
+            if thumbnail:
+                thumb_digest = await artifact_store.put(thumbnail, content_type)
+                result["thumbnail"] = artifact_url(thumb_digest)
+                result["thumbnail_artifact"] = thumb_digest
+            self.stored += 1
+            self.stored_bytes += len(encoded)
+            logger.info(f"Screenshot {file_name} stored as {digest[:12]} ({len(raw)} -> {len(encoded)} bytes)")
+            if on_stored:
+                await on_stored({"message": f"Screenshot stored: {result['screenshot']}", **result})
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Failed to store screenshot {file_name}: {e}")
+
+    async def drain(self, owner: Optional[str] = None, timeout: Optional[float] = None):
+        """Wait for `owner`'s queued screenshots (all of them if no owner) to finish uploading"""
+        tasks: List[asyncio.Task] = list(self._pending if owner is None else self._pending_by_owner.get(owner, ()))
+        if not tasks:
+            return
+        done, pending = await asyncio.wait(tasks, timeout=timeout or settings.screenshot_drain_timeout)
+        if pending:
+            logger.warning(f"{len(pending)} screenshot uploads still pending after drain timeout")
+
+    async def shutdown(self):
+        await self.drain()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "captured": self.captured,
+            "stored": self.stored,
+            "failed": self.failed,
+            "pending": len(self._pending),
+            "avg_capture_ms": round(self.capture_ms_total / self.captured, 1) if self.captured else 0.0,
+            "raw_bytes": self.raw_bytes,
+            "stored_bytes": self.stored_bytes,
+        }
+
+
+# Global screenshot pipeline instance
+screenshot_pipeline = ScreenshotPipeline()
@@ -0,0 +1,282 @@
+from playwright.async_api import Page, Locator
+import asyncio
+import re
+import time
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Tuple
+import logging
+
+from app.config import settings
+from app.services.screenshots import screenshot_pipeline
+
+logger = logging.getLogger(__name__)
+
+_TEMPLATE_RE = re.compile(r"\{\{\s*([\w.-]+)\s*\}\}")
+
+SUPPORTED_ACTIONS = {"navigate", "click", "type", "wait", "select", "screenshot", "interactive_pause"}
+# Wait step types as offered by the task builder (`target` holds the type, `value` its argument)
+WAIT_FOR_ELEMENT = "wait_for_element"
+WAIT_DELAY = "delay"
+
+
+class AutomationStopped(Exception):
+    """Raised between operations once the user stops the automation"""
+
+
+class ValueTemplate:
+    """A step value with `{{ field }}` placeholders bound per record"""
+    def __init__(self, raw: Optional[str]):
+        self.raw = raw
+        self.fields = _TEMPLATE_RE.findall(raw) if raw else []
+
+    def render(self, record: Optional[Dict[str, Any]]) -> Optional[str]:
+        if not self.fields or self.raw is None:
+            return self.raw
+        record = record or {}
+
+        def substitute(match):
+            key = match.group(1)
+            if key not in record:
+                raise ValueError(f"Record has no field '{key}'")
+            value = record[key]
+            return "" if value is None else str(value)
+
+        return _TEMPLATE_RE.sub(substitute, self.raw)
+
+
+class PlanOp:
+    """One compiled operation. `fills` holds merged consecutive type steps."""
+    def __init__(self, action: str, target: Optional[str] = None, value: Optional[str] = None,
+                 description: Optional[str] = None, source_index: int = 0):
+        self.action = action
+        self.target = target
+        self.value = ValueTemplate(value)
+        self.description = description
+        self.source_indexes = [source_index]
+        self.fills: List[Tuple[str, ValueTemplate]] = []
+
+    @property
+    def label(self) -> str:
+        if self.action == "fill_batch":
+            return f"fill_batch[{len(self.fills)}]"
+        return f"{self.action}:{self.target}" if self.target else self.action
+
+
+class ExecutionPlan:
+    """Compiled form of a task's steps"""
+    def __init__(self, ops: List[PlanOp], source_step_count: int):
+        self.ops = ops
+        self.source_step_count = source_step_count
+        self.bound_fields = sorted({
+            field
+            for op in ops
+            for template in [op.value, *[t for _, t in op.fills]]
+            for field in template.fields
+        })
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "source_steps": self.source_step_count,
+            "ops": len(self.ops),
+            "bound_fields": self.bound_fields,
+            "plan": [op.label for op in self.ops],
+        }
+
+
+def _wait_ms(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def _wait_args(index: int, target: Optional[str], value: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Normalize a wait step to (selector, delay); a wait op keeps its selector in `target`.
+
+    The task builder stores the wait type in `target` and the selector or
+    milliseconds in `value`. A bare selector in `target` is still accepted for
+    steps written before that schema.
+    """
+    kind = (target or "").strip().lower()
+    if kind == WAIT_DELAY:
+        return None, value
+    if kind == WAIT_FOR_ELEMENT:
+        if not value:
+            raise ValueError(f"Step {index + 1} ('wait_for_element') requires a CSS selector value")
+        return value, None
+    return target, value
+
+
+def compile_steps(steps: List[Dict[str, Any]]) -> ExecutionPlan:
+    """Compile raw TaskStep dicts into an ExecutionPlan.
+
+    - consecutive `type` steps are merged into a single `fill_batch` op
+    - adjacent fixed delays are summed into one, repeated selector waits collapsed
+    - a selector wait directly before an action on the same target is dropped,
+      since Playwright actions already auto-wait for their target
+    """
+    ops: List[PlanOp] = []
+    for index, step in enumerate(steps or []):
+        action = (step.get("action") or "").strip().lower()
+        if not action:
+            continue
+        if action not in SUPPORTED_ACTIONS:
+            raise ValueError(f"Unsupported step action '{action}' at step {index + 1}")
+        target = step.get("target") or None
+        value = step.get("value")
+        value = None if value is None else str(value)
+        if action == "wait":
+            target, value = _wait_args(index, target, value)
+        prev = ops[-1] if ops else None
+
+        if action == "type":
+            if not target:
+                raise ValueError(f"Step {index + 1} ('type') requires a target")
+            if prev and prev.action == "fill_batch":
+                prev.fills.append((target, ValueTemplate(value)))
+                prev.source_indexes.append(index)
+                continue
+            op = PlanOp("fill_batch", description=step.get("description"), source_index=index)
+            op.fills.append((target, ValueTemplate(value)))
+            ops.append(op)
+            continue
+
+        if action == "wait" and prev and prev.action == "wait":
+            delay, prev_delay = _wait_ms(value), _wait_ms(prev.value.raw)
+            if not target and not prev.target and delay is not None and prev_delay is not None:
+                # Two fixed delays in a row wait for their total
+                total = delay + prev_delay
+                prev.value = ValueTemplate(str(int(total) if total.is_integer() else total))
+                prev.source_indexes.append(index)
+                continue
+            if target and target == prev.target:
+                prev.source_indexes.append(index)
+                continue
+
+        if prev and prev.action == "wait" and prev.target and prev.target == target and action in ("click", "select"):
+            ops.pop()
+
+        ops.append(PlanOp(action, target, value, step.get("description"), index))
+
+    return ExecutionPlan(ops, len(steps or []))
+
+
+class BoundPlan:
+    """An ExecutionPlan with locators resolved once against a page"""
+    def __init__(self, plan: ExecutionPlan, page: Page,
+                 on_screenshot: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None):
+        self.plan = plan
+        self.page = page
+        self.on_screenshot = on_screenshot
+        self._locators: Dict[str, Locator] = {}
+
+    def locator(self, target: str) -> Locator:
+        locator = self._locators.get(target)
+        if locator is None:
+            locator = self.page.locator(target)
+            self._locators[target] = locator
+        return locator
+
+    async def run(
+        self,
+        record: Optional[Dict[str, Any]] = None,
+        before_op: Optional[Callable[[PlanOp], Awaitable[None]]] = None,
+        on_interactive_pause: Optional[Callable[[PlanOp], Awaitable[None]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Execute every op for one record; returns per-op timings"""
+        timings = []
+        timeout = settings.playwright_timeout
+        for op in self.plan.ops:
+            if before_op:
+                await before_op(op)
+            started = time.perf_counter()
+            if op.action == "navigate":
+                await self.page.goto(op.target or op.value.render(record), timeout=timeout)
+            elif op.action == "click":
+                await self.locator(op.target).click(timeout=timeout)
+            elif op.action == "fill_batch":
+                for target, template in op.fills:
+                    await self.locator(target).fill(template.render(record) or "", timeout=timeout)
+            elif op.action == "select":
+                await self.locator(op.target).select_option(op.value.render(record), timeout=timeout)
+            elif op.action == "wait":
+                if op.target:
+                    await self.locator(op.target).wait_for(state="visible", timeout=timeout)
+                else:
+                    await asyncio.sleep((_wait_ms(op.value.render(record)) or 0) / 1000)
+            elif op.action == "screenshot":
+                name = op.value.render(record) or f"step_{op.source_indexes[0] + 1}_{int(time.time())}"
+                await screenshot_pipeline.capture(self.page, name, on_stored=self.on_screenshot)
+            elif op.action == "interactive_pause" and on_interactive_pause:
+                await on_interactive_pause(op)
+            timings.append({"op": op.label, "ms": round((time.perf_counter() - started) * 1000, 1)})
+        return timings
+
+
+async def run_task_steps(
+    page: Page,
+    steps: List[Dict[str, Any]],
+    progress_callback: Callable[[Dict[str, Any]], Awaitable[None]],
+    records: Optional[List[Dict[str, Any]]] = None,
+    before_op: Optional[Callable[[PlanOp], Awaitable[None]]] = None,
+    on_interactive_pause: Optional[Callable[[PlanOp], Awaitable[None]]] = None,
+):
+    """
+    Run a task's steps once, or once per record for data-driven tasks.
+
+    Progress follows the same contract as the route automation script
+    (`processed_count`, `success_count`, `total_records`).
+    """
+    plan = compile_steps(steps)
+    if not plan.ops:
+        raise ValueError("Task has no executable steps.")
+    if plan.bound_fields and not records:
+        raise ValueError(f"Steps reference record fields {plan.bound_fields} but no records were provided.")
+
+    bound = BoundPlan(plan, page, on_screenshot=progress_callback)
+    runs = records or [None]
+    total_records = len(runs)
+    success_count = 0
+    op_totals: Dict[str, float] = {}
+
+    await progress_callback({
+        "status": "running",
+        "message": f"Compiled {plan.source_step_count} steps into {len(plan.ops)} operations.",
+        "processed_count": 0,
+        "total_records": total_records,
+        "success_count": 0,
+        "plan": plan.summary()
+    })
+
+    for i, record in enumerate(runs, 1):
+        try:
+            timings = await bound.run(record, before_op, on_interactive_pause)
+            success_count += 1
+            for timing in timings:
+                op_totals[timing["op"]] = op_totals.get(timing["op"], 0.0) + timing["ms"]
+            await progress_callback({
+                "message": f"Successfully processed record {i}/{total_records}.",
+                "processed_count": i,
+                "success_count": success_count,
+                "record_number": i,
+                "record_status": "succeeded",
+                "timings": timings
+            })
+        except AutomationStopped:
+            # Not a record failure: leave the remaining records unprocessed
+            raise
+        except Exception as e:
+            logger.error(f"Failed to run steps for record {i}: {e}")
+            await progress_callback({
+                "message": f"Error processing record {i}: {e}",
+                "processed_count": i,
+                "record_number": i,
+                "record_status": "failed",
+                "error": str(e)
+            })
+
+    await progress_callback({
+        "status": "completed",
+        "message": f"Processed {total_records} records, {success_count} succeeded.",
+        "success_count": success_count,
+        "op_totals_ms": {k: round(v, 1) for k, v in op_totals.items()}
+    })
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+import io
 import os
 from minio import Minio
 from minio.error import S3Error
@@ -22,6 +23,22 @@ class StorageService(ABC):
     def download_file(self, file_path: str, destination_path: str):
         pass
 
+    @abstractmethod
+    def upload_bytes(self, data: bytes, file_name: str, content_type: str) -> str:
+        pass
+
+    @abstractmethod
+    def download_bytes(self, file_path: str) -> bytes:
+        pass
+
+    @abstractmethod
+    def download_range(self, file_path: str, offset: int, length: int) -> bytes:
+        pass
+
+    @abstractmethod
+    def delete_file(self, file_path: str):
+        pass
+
 class LocalStorage(StorageService):
     def __init__(self, upload_dir: str = "uploads"):
         self.upload_dir = upload_dir
@@ -43,6 +60,42 @@ class LocalStorage(StorageService):
         else:
             raise FileNotFoundError(f"File not found at {file_path}")
 
+    def upload_bytes(self, data: bytes, file_name: str, content_type: str) -> str:
+        destination = os.path.join(self.upload_dir, file_name)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial object
+        tmp_path = f"{destination}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, destination)
+        return destination
+
+    def _resolve(self, file_path: str) -> str:
+        # Accept either the path returned by upload_* or the bare object name
+        if os.path.exists(file_path) or os.path.isabs(file_path):
+            return file_path
+        return os.path.join(self.upload_dir, file_path)
+
+    def download_bytes(self, file_path: str) -> bytes:
+        path = self._resolve(file_path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File not found at {path}")
+        with open(path, "rb") as f:
+            return f.read()
+
+    def download_range(self, file_path: str, offset: int, length: int) -> bytes:
+        path = self._resolve(file_path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"File not found at {path}")
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def delete_file(self, file_path: str):
+        path = self._resolve(file_path)
+        if os.path.exists(path):
+            os.remove(path)
+
 class MinioStorage(StorageService):
     def __init__(self):
         try:
@@ -105,6 +158,53 @@ class MinioStorage(StorageService):
             logger.error(f"Failed to download {file_path} from MinIO: {e}")
             raise
 
+    def upload_bytes(self, data: bytes, file_name: str, content_type: str) -> str:
+        try:
+            self.client_internal.put_object(
+                self.bucket_name, file_name, io.BytesIO(data), length=len(data), content_type=content_type
+            )
+            return file_name
+        except S3Error as e:
+            logger.error(f"Failed to upload {file_name} to MinIO: {e}")
+            raise
+
+    def download_bytes(self, file_path: str) -> bytes:
+        response = None
+        try:
+            response = self.client_internal.get_object(self.bucket_name, file_path)
+            return response.read()
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                raise FileNotFoundError(f"Object not found: {file_path}")
+            logger.error(f"Failed to download {file_path} from MinIO: {e}")
+            raise
+        finally:
+            if response is not None:
+                response.close()
+                response.release_conn()
+
+    def download_range(self, file_path: str, offset: int, length: int) -> bytes:
+        response = None
+        try:
+            response = self.client_internal.get_object(self.bucket_name, file_path, offset=offset, length=length)
+            return response.read()
+        except S3Error as e:
+            if e.code == "NoSuchKey":
+                raise FileNotFoundError(f"Object not found: {file_path}")
+            logger.error(f"Failed to download range of {file_path} from MinIO: {e}")
+            raise
+        finally:
+            if response is not None:
+                response.close()
+                response.release_conn()
+
+    def delete_file(self, file_path: str):
+        try:
+            self.client_internal.remove_object(self.bucket_name, file_path)
+        except S3Error as e:
+            logger.error(f"Failed to delete {file_path} from MinIO: {e}")
+            raise
+
 def get_storage_service() -> StorageService:
     if settings.STORAGE_BACKEND == "minio":
         return MinioStorage()
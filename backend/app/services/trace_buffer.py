@@ -0,0 +1,150 @@
+from playwright.async_api import BrowserContext
+from collections import deque
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, Any, Deque, List, Optional, Tuple
+import logging
+
+from app.config import settings
+from app.services.artifact_store import artifact_store
+
+logger = logging.getLogger(__name__)
+
+
+class TraceRingBuffer:
+    """Rolling Playwright trace chunks, kept only when something fails.
+
+    Tracing runs for the whole context and is cut into one chunk per record.
+    The last `trace_buffer_chunks` chunks are kept in a temp directory; older
+    ones are deleted. When a record fails, the buffered chunks are stored as
+    trace zips in the artifact store. Time spent rotating chunks is measured
+    so the overhead can be reported per execution.
+
+    Playwright traces a whole context, so when several shard pages share it a
+    per-record chunk would mix records from every shard. The engine then sets
+    `per_record = False`: the run stays one chunk, and it is persisted when
+    tracing stops if any record failed (`failed_records`).
+    """
+    def __init__(self, context: BrowserContext, capacity: Optional[int] = None):
+        self.context = context
+        self.capacity = max(1, capacity or settings.trace_buffer_chunks)
+        self._chunks: Deque[Tuple[str, str]] = deque()  # (label, zip path)
+        self._dir: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._chunk_seq = 0
+        self.active = False
+        self.per_record = True
+        self.failed_records = 0
+        self.started_at = 0.0
+        self.stopped_at = 0.0
+        self.rotations = 0
+        self.overhead_ms = 0.0
+        self.bytes_written = 0
+        self.persisted: List[Dict[str, Any]] = []
+
+    async def start(self):
+        started = time.perf_counter()
+        self._dir = await asyncio.to_thread(tempfile.mkdtemp, prefix="trace_")
+        await self.context.tracing.start(
+            screenshots=settings.trace_buffer_screenshots, snapshots=True, sources=False
+        )
+        await self.context.tracing.start_chunk()
+        self.active = True
+        self.started_at = time.perf_counter()
+        self.overhead_ms += (self.started_at - started) * 1000
+
+    async def rotate(self, failed: bool = False, label: str = "") -> List[str]:
+        """Close the current chunk and open the next; on failure persist the buffered chunks.
+
+        Returns the artifact digests of any persisted chunks.
+        """
+        if not self.active:
+            return []
+        async with self._lock:
+            started = time.perf_counter()
+            self._chunk_seq += 1
+            try:
+                if self.capacity == 1 and not failed:
+                    # Nothing older is ever kept, so a passing chunk need not be written at all
+                    await self.context.tracing.stop_chunk()
+                else:
+                    path = os.path.join(self._dir, f"chunk_{self._chunk_seq}.zip")
+                    await self.context.tracing.stop_chunk(path=path)
+                    self.bytes_written += os.path.getsize(path)
+                    self._chunks.append((label or f"chunk_{self._chunk_seq}", path))
+                    while len(self._chunks) > self.capacity:
+                        _, expired = self._chunks.popleft()
+                        self._remove(expired)
+                await self.context.tracing.start_chunk()
+            except Exception as e:
+                logger.warning(f"Trace chunk rotation failed; tracing disabled for this execution: {e}")
+                self.active = False
+            finally:
+                self.rotations += 1
+                self.overhead_ms += (time.perf_counter() - started) * 1000
+
+            if failed:
+                return await self._persist()
+            return []
+
+    async def _persist(self) -> List[str]:
+        digests = []
+        chunks = list(self._chunks)
+        self._chunks.clear()
+        for label, path in chunks:
+            try:
+                data = await asyncio.to_thread(self._read, path)
+                digest = await artifact_store.put(data, "application/zip")
+                digests.append(digest)
+                self.persisted.append({"label": label, "artifact": digest, "bytes": len(data)})
+            except Exception as e:
+                logger.error(f"Failed to persist trace chunk {label}: {e}")
+            finally:
+                self._remove(path)
+        return digests
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    async def stop(self, failed: bool = False, label: str = "") -> List[str]:
+        """Stop tracing; persist what is buffered if the execution failed, or had failed records that were not cut per record"""
+        digests = []
+        if self.active:
+            if failed or (not self.per_record and self.failed_records):
+                digests = await self.rotate(failed=True, label=label)
+            try:
+                await self.context.tracing.stop_chunk()
+                await self.context.tracing.stop()
+            except Exception as e:
+                logger.debug(f"Stopping tracing failed: {e}")
+            self.active = False
+            self.stopped_at = time.perf_counter()
+        if self._dir:
+            await asyncio.to_thread(shutil.rmtree, self._dir, True)
+            self._dir = None
+        return digests
+
+    def stats(self) -> Dict[str, Any]:
+        wall_ms = ((self.stopped_at or time.perf_counter()) - self.started_at) * 1000 if self.started_at else 0.0
+        return {
+            "chunks_capacity": self.capacity,
+            "per_record": self.per_record,
+            "rotations": self.rotations,
+            "overhead_ms": round(self.overhead_ms, 1),
+            "avg_rotation_ms": round(self.overhead_ms / self.rotations, 1) if self.rotations else 0.0,
+            "overhead_ratio": round(self.overhead_ms / wall_ms, 4) if wall_ms else 0.0,
+            "bytes_written": self.bytes_written,
+            "persisted": self.persisted,
+        }
@@ -0,0 +1,195 @@
+from playwright.async_api import Page, Locator, Request, TimeoutError as PlaywrightTimeoutError
+import asyncio
+import time
+import weakref
+from typing import Dict, Any, Optional, Set
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Resolves once `root` has seen no mutations for `quietMs`, or with false after `timeoutMs`
+_DOM_QUIESCENCE_JS = """
+([selector, quietMs, timeoutMs]) => new Promise(resolve => {
+    const root = (selector && document.querySelector(selector)) || document.body;
+    let quietTimer = null;
+    let hardTimer = null;
+    const observer = new MutationObserver(() => arm());
+    function finish(ok) {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(hardTimer);
+        resolve(ok);
+    }
+    function arm() {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish(true), quietMs);
+    }
+    observer.observe(root, {childList: true, subtree: true, attributes: true, characterData: true});
+    hardTimer = setTimeout(() => finish(false), timeoutMs);
+    arm();
+})
+"""
+
+
+class WaitResult:
+    """Outcome of an event-driven wait"""
+    def __init__(self, name: str, satisfied: bool, elapsed_ms: float, detail: Optional[str] = None):
+        self.name = name
+        self.satisfied = satisfied
+        self.elapsed_ms = elapsed_ms
+        self.detail = detail
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wait": self.name,
+            "satisfied": self.satisfied,
+            "elapsed_ms": round(self.elapsed_ms, 1),
+            "detail": self.detail
+        }
+
+
+class NetworkActivity:
+    """In-flight request tracker for one page, fed by its request lifecycle events.
+
+    Unlike `wait_for_load_state("networkidle")`, which resolves immediately once
+    the frame reached network idle after its last navigation, this sees XHRs
+    started by in-page actions such as SPA clicks.
+    """
+    def __init__(self, page: Page):
+        self.in_flight: Set[Request] = set()
+        self.last_change = time.perf_counter()
+        self._changed = asyncio.Event()
+        page.on("request", self._started)
+        page.on("requestfinished", self._ended)
+        page.on("requestfailed", self._ended)
+
+    def _started(self, request: Request):
+        self.in_flight.add(request)
+        self._touch()
+
+    def _ended(self, request: Request):
+        self.in_flight.discard(request)
+        self._touch()
+
+    def _touch(self):
+        self.last_change = time.perf_counter()
+        self._changed.set()
+
+    async def wait_idle(self, quiet_ms: float, timeout_ms: float) -> bool:
+        """True once nothing is in flight and nothing started or ended for `quiet_ms`"""
+        deadline = time.perf_counter() + timeout_ms / 1000
+        while True:
+            now = time.perf_counter()
+            remaining = deadline - now
+            wait = remaining
+            if not self.in_flight:
+                quiet_left = self.last_change + quiet_ms / 1000 - now
+                if quiet_left <= 0:
+                    return True
+                wait = min(wait, quiet_left)
+            if remaining <= 0:
+                return False
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+
+_network_activity: "weakref.WeakKeyDictionary[Page, NetworkActivity]" = weakref.WeakKeyDictionary()
+
+
+def network_activity(page: Page) -> NetworkActivity:
+    """The page's request tracker, attached on first use.
+
+    Call this before the action that triggers requests so their start is seen.
+    """
+    page = getattr(page, "unwrapped", page)
+    tracker = _network_activity.get(page)
+    if tracker is None:
+        tracker = _network_activity[page] = NetworkActivity(page)
+    return tracker
+
+
+def _timeout(timeout: Optional[float]) -> float:
+    return float(timeout if timeout is not None else settings.playwright_timeout)
+
+
+def _result(name: str, started: float, satisfied: bool, detail: Optional[str] = None) -> WaitResult:
+    result = WaitResult(name, satisfied, (time.perf_counter() - started) * 1000, detail)
+    logger.debug(f"Wait {name} {'satisfied' if satisfied else 'timed out'} after {result.elapsed_ms:.1f}ms")
+    return result
+
+
+async def count_rows(page: Page, selector: str) -> int:
+    """Current number of elements matching `selector`"""
+    return await page.locator(selector).count()
+
+
+async def wait_for_row_count_change(
+    page: Page,
+    selector: str,
+    previous_count: int,
+    timeout: Optional[float] = None
+) -> WaitResult:
+    """Wait until the number of elements matching `selector` differs from `previous_count`"""
+    started = time.perf_counter()
+    try:
+        await page.wait_for_function(
+            "([selector, previous]) => document.querySelectorAll(selector).length !== previous",
+            arg=[selector, previous_count],
+            timeout=_timeout(timeout)
+        )
+        return _result("row_count_change", started, True, selector)
+    except PlaywrightTimeoutError:
+        return _result("row_count_change", started, False, selector)
+
+
+async def wait_for_dom_quiescence(
+    page: Page,
+    selector: Optional[str] = None,
+    quiet_ms: int = 150,
+    timeout: Optional[float] = None
+) -> WaitResult:
+    """Wait until the subtree under `selector` (default: body) stops mutating for `quiet_ms`"""
+    started = time.perf_counter()
+    satisfied = await page.evaluate(_DOM_QUIESCENCE_JS, [selector, quiet_ms, _timeout(timeout)])
+    return _result("dom_quiescence", started, bool(satisfied), selector or "body")
+
+
+async def wait_for_network_idle_on_selector(
+    page: Page,
+    selector: str,
+    timeout: Optional[float] = None,
+    quiet_ms: int = 500
+) -> WaitResult:
+    """Wait for `selector` to become visible and for the page's requests to settle for `quiet_ms`"""
+    started = time.perf_counter()
+    tracker = network_activity(page)
+    budget = _timeout(timeout)
+    try:
+        await page.wait_for_selector(selector, state="visible", timeout=max(1.0, budget))
+    except PlaywrightTimeoutError:
+        return _result("network_idle_on_selector", started, False, selector)
+    # Playwright treats timeout=0 as "no timeout", so a spent budget is a timeout here
+    remaining = budget - (time.perf_counter() - started) * 1000
+    if remaining <= 0:
+        return _result("network_idle_on_selector", started, False, f"{selector} (budget spent)")
+    idle = await tracker.wait_idle(quiet_ms, remaining)
+    detail = selector if idle else f"{selector} ({len(tracker.in_flight)} requests in flight)"
+    return _result("network_idle_on_selector", started, idle, detail)
+
+
+async def wait_for_locator_detached(
+    locator: Locator,
+    timeout: Optional[float] = None
+) -> WaitResult:
+    """Wait until `locator` is removed from the DOM"""
+    started = time.perf_counter()
+    try:
+        await locator.wait_for(state="detached", timeout=_timeout(timeout))
+        return _result("locator_detached", started, True)
+    except PlaywrightTimeoutError:
+        return _result("locator_detached", started, False)
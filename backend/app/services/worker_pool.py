@@ -0,0 +1,109 @@
+import asyncio
+import os
+import sys
+from typing import Dict, Any, List
+import logging
+
+from app.config import settings
+from app.services.engine_registry import engine_registry
+
+logger = logging.getLogger(__name__)
+
+# Directory containing the `app` package, used as the workers' working directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class WorkerPool:
+    """Supervises out-of-process execution workers.
+
+    Each worker is a separate `python -m app.worker` process with its own
+    event loop that dispatches queued executions and runs their engines. The
+    API process keeps serving HTTP/WebSocket traffic and reaches the engines
+    through the engine registry. Workers that exit are restarted after
+    `execution_worker_restart_delay` seconds.
+    """
+    def __init__(self):
+        self.size = settings.execution_workers
+        self._procs: Dict[int, asyncio.subprocess.Process] = {}
+        self._supervisors: List[asyncio.Task] = []
+        self._stopping = False
+        self.active = False
+        self.restarts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def start(self) -> bool:
+        """Spawn the workers; returns False when engines should run in this process instead"""
+        if not self.enabled:
+            return False
+        if not engine_registry.connected:
+            logger.error("EXECUTION_WORKERS needs a reachable engine registry (ENGINE_REGISTRY_ENABLED); running engines in-process")
+            return False
+        self._stopping = False
+        self._supervisors = [asyncio.create_task(self._supervise(index)) for index in range(self.size)]
+        self.active = True
+        logger.info(f"Started execution worker pool with {self.size} processes")
+        return True
+
+    async def _supervise(self, index: int):
+        while not self._stopping:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    sys.executable, "-m", "app.worker",
+                    cwd=BACKEND_DIR,
+                    env={**os.environ, "EXECUTION_WORKER_INDEX": str(index)}
+                )
+            except Exception as e:
+                logger.error(f"Failed to start execution worker {index}: {e}")
+                await asyncio.sleep(settings.execution_worker_restart_delay)
+                continue
+            self._procs[index] = proc
+            logger.info(f"Execution worker {index} started (pid {proc.pid})")
+            code = await proc.wait()
+            self._procs.pop(index, None)
+            if self._stopping:
+                return
+            self.restarts += 1
+            logger.warning(
+                f"Execution worker {index} (pid {proc.pid}) exited with code {code}; "
+                f"restarting in {settings.execution_worker_restart_delay}s"
+            )
+            await asyncio.sleep(settings.execution_worker_restart_delay)
+
+    async def shutdown(self):
+        if not self.active:
+            return
+        self._stopping = True
+        procs = [p for p in self._procs.values() if p.returncode is None]
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=settings.execution_worker_stop_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Execution worker pid {proc.pid} did not stop in time; killing it")
+                proc.kill()
+                await proc.wait()
+        for task in self._supervisors:
+            task.cancel()
+        self._supervisors = []
+        self._procs = {}
+        self.active = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "size": self.size,
+            "restarts": self.restarts,
+            "processes": [
+                {"index": index, "pid": proc.pid, "alive": proc.returncode is None}
+                for index, proc in sorted(self._procs.items())
+            ],
+        }
+
+
+# Global worker pool instance
+worker_pool = WorkerPool()
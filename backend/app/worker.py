@@ -0,0 +1,90 @@
+"""Execution worker process, started by the API's worker pool (`python -m app.worker`).
+
+Runs queued executions on its own event loop. Control commands and session
+events travel through the engine registry, so ENGINE_REGISTRY_ENABLED is required.
+"""
+import asyncio
+import os
+import signal
+import sys
+import logging
+
+from app.config import settings
+from app.services.automation import automation_engines, websocket_manager, run_engine_command
+from app.services.browser_pool import browser_pool
+from app.services.asset_cache import asset_cache
+from app.services.progress_writer import progress_writer
+from app.services.checkpoints import checkpoint_writer
+from app.services.screenshots import screenshot_pipeline
+from app.services.engine_registry import engine_registry
+from app.services.execution_queue import execution_queue
+
+WORKER_INDEX = os.getenv("EXECUTION_WORKER_INDEX", "0")
+
+logging.basicConfig(
+    level=logging.INFO,
+    format=f'%(asctime)s - worker[{WORKER_INDEX}] - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def _stop_engines():
+    """Stop running executions (resumable from their checkpoints) and release browsers"""
+    for session_id, engine in list(automation_engines.items()):
+        try:
+            if engine.is_running and engine.execution_id is not None:
+                await engine.stop(engine.execution_id)
+            await engine.end_session()
+        except Exception as e:
+            logger.error(f"Failed to stop engine {session_id}: {e}")
+
+
+async def run_worker() -> int:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await engine_registry.start(
+            run_engine_command,
+            websocket_manager.deliver_local,
+            wake_handler=execution_queue.wake_local,
+            load_provider=lambda: {"role": "worker", "index": int(WORKER_INDEX), **execution_queue.load()}
+        )
+    except Exception as e:
+        logger.error(f"Engine registry startup failed: {str(e)}")
+    if not engine_registry.connected:
+        # Without the registry the API could neither control nor observe our engines
+        logger.error("Execution worker requires a reachable engine registry; exiting")
+        return 1
+
+    if settings.asset_cache_enabled:
+        try:
+            await asset_cache.load()
+        except Exception as e:
+            logger.error(f"Asset cache initialization failed: {str(e)}")
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        logger.error(f"Browser pool warm-up failed: {str(e)}")
+
+    await execution_queue.start(local_capacity=settings.execution_worker_max_engines)
+    logger.info(f"Execution worker {WORKER_INDEX} ready ({engine_registry.worker_id})")
+    await stop.wait()
+
+    logger.info(f"Execution worker {WORKER_INDEX} shutting down")
+    await execution_queue.shutdown()
+    await _stop_engines()
+    await engine_registry.shutdown(list(automation_engines.keys()))
+    await screenshot_pipeline.shutdown()
+    await checkpoint_writer.shutdown()
+    await progress_writer.shutdown()
+    await browser_pool.shutdown()
+    if settings.asset_cache_enabled:
+        await asset_cache.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run_worker()))
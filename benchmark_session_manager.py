@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for the session manager's create endpoint.
+
+Fires 1, 10 and 50 simultaneous POST /api/sessions/create requests (distinct
+users, so none are reused), reports create throughput and latency, and probes
+/api/health during each burst to show whether the event loop stays responsive.
+Created sessions are destroyed after every level. Run against a session manager
+whose MAX_SESSIONS and display/port ranges cover the largest level.
+
+Usage: python benchmark_session_manager.py [--url http://localhost:8001] [--levels 1,10,50]
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def create_one(client, results):
+    started = time.perf_counter()
+    try:
+        resp = await client.post("/api/sessions/create", json={"user_id": f"bench-{uuid.uuid4().hex[:8]}"})
+        elapsed = time.perf_counter() - started
+        if resp.status_code == 200:
+            results["ok"].append((elapsed, resp.json()["session_id"]))
+        else:
+            results["failed"].append(f"{resp.status_code} {resp.text[:80]}")
+    except Exception as e:
+        results["failed"].append(str(e))
+
+
+async def probe_health(client, stop, latencies):
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            await client.get("/api/health")
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+
+
+async def run_level(client, concurrency):
+    results = {"ok": [], "failed": []}
+    health = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe_health(client, stop, health))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(create_one(client, results) for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await prober
+
+    latencies = [elapsed for elapsed, _ in results["ok"]]
+    print(
+        f"{concurrency:>5} | {len(results['ok']):>3} ok {len(results['failed']):>3} failed | "
+        f"{len(results['ok']) / wall:7.2f} sessions/s | "
+        f"create p50 {percentile(latencies, 0.5):6.2f}s p95 {percentile(latencies, 0.95):6.2f}s | "
+        f"health max {max(health, default=0.0) * 1000:7.1f}ms"
+    )
+    for reason in results["failed"][:3]:
+        print(f"        failure: {reason}")
+
+    await asyncio.gather(*(client.delete(f"/api/sessions/{sid}") for _, sid in results["ok"]))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8001")
+    parser.add_argument("--levels", default="1,10,50")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=120.0) as client:
+        print("concurrency | results | throughput | create latency | /api/health during burst")
+        for level in (int(n) for n in args.levels.split(",")):
+            await run_level(client, level)
+            # Let the warm pool settle so levels are comparable
+            await asyncio.sleep(2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,15 +1,17 @@
 import asyncio
 import json
 import logging
+import math
 import os
-import socket
 import subprocess
+import time
 import uuid
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, Optional
+from typing import Deque, Dict, List, Optional
 
 import psutil
-import redis
+import redis.asyncio as aioredis
 from fastapi import BackgroundTasks, FastAPI, HTTPException
 from pydantic import BaseModel
 
@@ -21,7 +23,8 @@ app = FastAPI(title="TigerVNC Session Manager")
 # Redis (use docker service name)
 REDIS_HOST = os.getenv("REDIS_HOST", "redis")
 REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
-redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+REDIS_URL = os.getenv("REDIS_URL", f"redis://{REDIS_HOST}:{REDIS_PORT}/0")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
 
 # Resource and pool configuration
 MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "100"))
@@ -37,6 +40,16 @@ VNC_PORT_END = int(os.getenv("VNC_PORT_END", "6000"))
 WEB_PORT_START = int(os.getenv("WEB_PORT_START", "7901"))
 WEB_PORT_END = int(os.getenv("WEB_PORT_END", "8000"))
 
+# Warm pool: spare, fully started sessions handed out by create_session
+WARM_POOL_MIN = int(os.getenv("WARM_POOL_MIN", "1"))
+WARM_POOL_MAX = int(os.getenv("WARM_POOL_MAX", "5"))
+WARM_POOL_LEAD_SECONDS = float(os.getenv("WARM_POOL_LEAD_SECONDS", "60"))  # demand to cover with spares
+WARM_POOL_DEMAND_WINDOW_SECONDS = float(os.getenv("WARM_POOL_DEMAND_WINDOW_SECONDS", "600"))
+WARM_POOL_REFILL_INTERVAL = float(os.getenv("WARM_POOL_REFILL_INTERVAL", "5"))
+
+# Upper bound for vncpasswd/vncserver invocations
+COMMAND_TIMEOUT = float(os.getenv("SESSION_COMMAND_TIMEOUT", "30"))
+
 # Host capacity estimates (for soft gating)
 HOST_CPU_CORES = float(os.getenv("HOST_CPU_CORES", "64"))
 HOST_MEMORY_MB = float(os.getenv("HOST_MEMORY_MB", "131072"))  # 128GB by default
@@ -54,8 +67,99 @@ class SessionRequest(BaseModel):
     task_id: Optional[int] = None
     timeout_minutes: int = DEFAULT_TIMEOUT_MINUTES
 
+# Session payload for a user's current session, resolved server-side in one round trip
+_USER_SESSION_SCRIPT = """
+local session_id = redis.call('GET', KEYS[1])
+if not session_id then
+    return nil
+end
+return redis.call('GET', 'session:' .. session_id)
+"""
+
+# Delete a session and, if it still points here, its user mapping; returns the old payload
+_POP_SESSION_SCRIPT = """
+local payload = redis.call('GET', KEYS[1])
+if not payload then
+    return nil
+end
+redis.call('DEL', KEYS[1])
+local user_id = cjson.decode(payload)['user_id']
+if type(user_id) == 'string' then
+    local user_key = 'user_session:' .. user_id
+    if redis.call('GET', user_key) == ARGV[1] then
+        redis.call('DEL', user_key)
+    end
+end
+return payload
+"""
+
+# Delete a session and its user mapping, the latter only if it still points at this session
+_DELETE_SESSION_SCRIPT = """
+redis.call('DEL', KEYS[1])
+if redis.call('GET', KEYS[2]) == ARGV[1] then
+    redis.call('DEL', KEYS[2])
+end
+return 1
+"""
+
+class SessionStore:
+    """Async Redis bookkeeping for sessions (`session:<id>` and `user_session:<user>` keys).
+
+    Takes any redis.asyncio-compatible client, so a local Redis or an
+    in-process stand-in such as fakeredis can be passed in for testing.
+    """
+    def __init__(self, client: aioredis.Redis):
+        self.client = client
+        self._user_session = client.register_script(_USER_SESSION_SCRIPT)
+        self._pop_session = client.register_script(_POP_SESSION_SCRIPT)
+        self._delete_session = client.register_script(_DELETE_SESSION_SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str, max_connections: int = REDIS_MAX_CONNECTIONS) -> "SessionStore":
+        pool = aioredis.ConnectionPool.from_url(url, max_connections=max_connections, decode_responses=True)
+        return cls(aioredis.Redis(connection_pool=pool))
+
+    async def save(self, session_data: Dict, ttl: timedelta):
+        """Write the session and its user mapping atomically"""
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.setex(f"session:{session_data['session_id']}", ttl, json.dumps(session_data))
+            pipe.setex(f"user_session:{session_data['user_id']}", ttl, session_data["session_id"])
+            await pipe.execute()
+
+    async def get(self, session_id: str) -> Optional[Dict]:
+        payload = await self.client.get(f"session:{session_id}")
+        return json.loads(payload) if payload else None
+
+    async def get_for_user(self, user_id: str) -> Optional[Dict]:
+        payload = await self._user_session(keys=[f"user_session:{user_id}"])
+        return json.loads(payload) if payload else None
+
+    async def delete(self, session_id: str, user_id: Optional[str]):
+        """Delete a session; a newer session mapped to the same user is left alone"""
+        if not user_id:
+            await self.client.delete(f"session:{session_id}")
+            return
+        await self._delete_session(keys=[f"session:{session_id}", f"user_session:{user_id}"], args=[session_id])
+
+    async def pop(self, session_id: str) -> Optional[Dict]:
+        """Delete a session this process does not track and return what was stored"""
+        payload = await self._pop_session(keys=[f"session:{session_id}"], args=[session_id])
+        return json.loads(payload) if payload else None
+
+    async def close(self):
+        await self.client.close()
+        await self.client.connection_pool.disconnect()
+
+session_store = SessionStore.from_url(REDIS_URL)
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
 class Session:
-    def __init__(self, session_id: str, display: int, vnc_port: int, web_port: int, user_id: str):
+    def __init__(self, session_id: str, display: int, vnc_port: int, web_port: int, user_id: Optional[str]):
         self.session_id = session_id
         self.display = display
         self.vnc_port = vnc_port
@@ -64,6 +168,7 @@ class Session:
         self.created_at = datetime.utcnow()
         self.last_accessed = datetime.utcnow()
         self.pid_novnc: Optional[int] = None
+        self.novnc_process: Optional[asyncio.subprocess.Process] = None
         self.status = "starting"
         self.password: Optional[str] = None
         self.passfile: Optional[str] = None
@@ -74,48 +179,98 @@ class SessionManager:
         self.display_pool = list(range(DISPLAY_START, DISPLAY_END + 1))
         self.vnc_port_pool = list(range(VNC_PORT_START, VNC_PORT_END + 1))
         self.web_port_pool = list(range(WEB_PORT_START, WEB_PORT_END + 1))
+        # Spare sessions that are started but not yet handed to a user
+        self.warm_sessions: List[Session] = []
+        self._warming = 0
+        self._starting = 0  # create_session calls past the capacity check but not yet registered
+        self._pool_event = asyncio.Event()
+        self._demand: Deque[float] = deque()  # allocation request times within the demand window
+        self.pool_hits = 0
+        self.pool_misses = 0
+        self.allocation_ms: Deque[float] = deque(maxlen=1000)
+        self.startup_seconds: Deque[float] = deque(maxlen=100)
 
     def _generate_vnc_password(self) -> str:
         return str(uuid.uuid4())[:8]
 
-    def _write_vnc_passfile(self, session_id: str, password: str) -> str:
-        passfile = f"/tmp/vncpass_{session_id}"
-        process = subprocess.run(
-            ["vncpasswd", "-f"],
-            input=password.encode(),
-            stdout=subprocess.PIPE,
-            check=True
+    async def _run(self, cmd: List[str], input: Optional[bytes] = None, check: bool = True, capture: bool = True) -> bytes:
+        """Run a command without blocking the event loop; returns its stdout.
+
+        Use capture=False for commands that daemonize (vncserver): a detached
+        child inheriting our pipes would keep them open after the command exits.
+        """
+        output = subprocess.PIPE if capture else subprocess.DEVNULL
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=output,
+            stderr=output
         )
-        with open(passfile, "wb") as f:
-            f.write(process.stdout)
-        os.chmod(passfile, 0o600)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(input), timeout=COMMAND_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise RuntimeError(f"{cmd[0]} timed out after {COMMAND_TIMEOUT}s")
+        if check and process.returncode != 0:
+            detail = stderr.decode(errors="replace").strip() if stderr else ""
+            raise RuntimeError(f"{' '.join(cmd)} exited with {process.returncode}: {detail}")
+        return stdout or b""
+
+    async def _write_vnc_passfile(self, session_id: str, password: str) -> str:
+        passfile = f"/tmp/vncpass_{session_id}"
+        encrypted = await self._run(["vncpasswd", "-f"], input=password.encode())
+        # Create with 0600 directly so the password is never world-readable
+        fd = os.open(passfile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(encrypted)
         return passfile
 
     async def _wait_for_port(self, host: str, port: int, timeout: float = 10.0) -> bool:
-        start = datetime.utcnow()
-        while (datetime.utcnow() - start).total_seconds() < timeout:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-                sock.settimeout(0.5)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=0.5)
+                writer.close()
                 try:
-                    sock.connect((host, port))
-                    return True
+                    await writer.wait_closed()
                 except Exception:
-                    await asyncio.sleep(0.2)
+                    pass
+                return True
+            except (OSError, asyncio.TimeoutError):
+                await asyncio.sleep(0.2)
         return False
 
-    def _resource_ok(self) -> bool:
-        active = len(self.sessions)
-        next_count = active + 1
+    async def _kill_vnc(self, display: int):
+        try:
+            await self._run(["vncserver", "-kill", f":{display}"], check=False, capture=False)
+        except Exception as e:
+            logger.warning(f"Failed to stop vncserver :{display}: {e}")
+
+    def _resource_ok(self, extra: int = 1) -> bool:
+        """Whether `extra` more sessions fit, counting spares and creates already in flight"""
+        active = len(self.sessions) + len(self.warm_sessions) + self._warming + self._starting
+        next_count = active + extra
         cpu_need = next_count * RESOURCES_PER_SESSION["cpu"]
         mem_need = next_count * RESOURCES_PER_SESSION["memory"]
         bw_need = next_count * RESOURCES_PER_SESSION["bandwidth"]
         return (cpu_need <= HOST_CPU_CORES) and (mem_need <= HOST_MEMORY_MB) and (bw_need <= HOST_BANDWIDTH_MBPS)
 
-    async def create_session(self, user_id: str, task_id: Optional[int] = None) -> Session:
-        # Capacity and resource checks
-        if len(self.sessions) >= MAX_SESSIONS or not self._resource_ok():
-            raise HTTPException(status_code=503, detail="Maximum sessions reached or insufficient resources")
-
+    async def _take_warm(self) -> Optional[Session]:
+        """Pop the oldest spare session whose websockify and Xvnc are still alive"""
+        while self.warm_sessions:
+            session = self.warm_sessions.pop(0)
+            novnc_alive = session.novnc_process and session.novnc_process.returncode is None
+            # Xvnc is daemonized by vncserver, so probe its port rather than a pid
+            if novnc_alive and await self._wait_for_port("127.0.0.1", session.vnc_port, timeout=0.5):
+                return session
+            logger.warning(f"Discarding dead warm session on display :{session.display}")
+            asyncio.create_task(self._teardown(session))
+        return None
+
+    async def _start_session(self, user_id: Optional[str] = None) -> Session:
+        """Reserve a display and ports, then start Xvnc and websockify for a new session"""
         if not self.display_pool or not self.vnc_port_pool or not self.web_port_pool:
             raise HTTPException(status_code=503, detail="No resources available")
 
@@ -125,6 +280,7 @@ class SessionManager:
         session_id = str(uuid.uuid4())
 
         session = Session(session_id, display, vnc_port, web_port, user_id)
+        started = time.monotonic()
         try:
             # Ensure xstartup exists (Dockerfile already creates it)
             xstartup_path = "/root/.vnc/xstartup"
@@ -139,7 +295,7 @@ class SessionManager:
 
             # Generate VNC password and passfile
             vnc_password = self._generate_vnc_password()
-            passfile = self._write_vnc_passfile(session_id, vnc_password)
+            passfile = await self._write_vnc_passfile(session_id, vnc_password)
             session.password = vnc_password
             session.passfile = passfile
 
@@ -155,7 +311,7 @@ class SessionManager:
             ]
             logger.info(f"Starting vncserver: {' '.join(vnc_cmd)}")
             # vncserver daemonizes and spawns Xvnc; use -kill for teardown
-            subprocess.run(vnc_cmd, check=True)
+            await self._run(vnc_cmd, capture=False)
 
             # Wait for VNC port to be ready
             ok = await self._wait_for_port("127.0.0.1", vnc_port, timeout=10.0)
@@ -170,101 +326,199 @@ class SessionManager:
                 f"localhost:{vnc_port}"
             ]
             logger.info(f"Starting websockify: {' '.join(novnc_cmd)}")
-            novnc_process = subprocess.Popen(
-                novnc_cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
+            novnc_process = await asyncio.create_subprocess_exec(
+                *novnc_cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
             )
+            session.novnc_process = novnc_process
             session.pid_novnc = novnc_process.pid
-
-            # Persist session to Redis
-            session_data = {
-                "session_id": session_id,
-                "user_id": user_id,
-                "display": display,
-                "vnc_port": vnc_port,
-                "web_port": web_port,
-                "created_at": session.created_at.isoformat(),
-                "task_id": task_id,
-                "password": vnc_password,
-                "status": "active"
-            }
-            redis_client.setex(
-                f"session:{session_id}",
-                timedelta(hours=SESSION_TTL_HOURS),
-                json.dumps(session_data)
-            )
-            redis_client.setex(
-                f"user_session:{user_id}",
-                timedelta(hours=SESSION_TTL_HOURS),
-                session_id
-            )
-
-            self.sessions[session_id] = session
-            session.status = "active"
-            logger.info(f"Created session {session_id} for user {user_id} on display :{display}")
+            session.status = "ready"
+            self.startup_seconds.append(time.monotonic() - started)
             return session
 
         except Exception as e:
             # Return resources on failure
-            logger.error(f"Failed to create session: {e}", exc_info=True)
+            logger.error(f"Failed to start session: {e}", exc_info=True)
             self.display_pool.insert(0, display)
             self.vnc_port_pool.insert(0, vnc_port)
             self.web_port_pool.insert(0, web_port)
             # Best-effort cleanup if partially started
+            await self._kill_vnc(display)
+            raise HTTPException(status_code=500, detail=str(e))
+
+    async def create_session(self, user_id: str, task_id: Optional[int] = None) -> Session:
+        # Capacity and resource checks; creates already in flight count as sessions
+        if len(self.sessions) + self._starting >= MAX_SESSIONS:
+            raise HTTPException(status_code=503, detail="Maximum sessions reached or insufficient resources")
+
+        requested = time.monotonic()
+        self._demand.append(requested)
+        # Reserve our slot before the first await so parallel creates see it
+        self._starting += 1
+        try:
+            session = await self._take_warm()
+            if session:
+                self.pool_hits += 1
+            else:
+                self.pool_misses += 1
+                # Our own slot is already counted in _starting
+                if not self._resource_ok(extra=0):
+                    raise HTTPException(status_code=503, detail="Maximum sessions reached or insufficient resources")
+                session = await self._start_session(user_id)
+            self.wake_pool()
+
+            session.user_id = user_id
+            session.created_at = datetime.utcnow()
+            session.last_accessed = session.created_at
             try:
-                subprocess.run(["vncserver", "-kill", f":{display}"], check=False)
-            except Exception:
+                # Persist session to Redis
+                session_data = {
+                    "session_id": session.session_id,
+                    "user_id": user_id,
+                    "display": session.display,
+                    "vnc_port": session.vnc_port,
+                    "web_port": session.web_port,
+                    "created_at": session.created_at.isoformat(),
+                    "task_id": task_id,
+                    "password": session.password,
+                    "status": "active"
+                }
+                await session_store.save(session_data, timedelta(hours=SESSION_TTL_HOURS))
+            except Exception as e:
+                logger.error(f"Failed to create session: {e}", exc_info=True)
+                await self._teardown(session)
+                raise HTTPException(status_code=500, detail=str(e))
+
+            self.sessions[session.session_id] = session
+        finally:
+            self._starting -= 1
+
+        session.status = "active"
+        self.allocation_ms.append((time.monotonic() - requested) * 1000)
+        logger.info(f"Created session {session.session_id} for user {user_id} on display :{session.display}")
+        return session
+
+    async def _teardown(self, session: Session):
+        """Stop a session's VNC server and websockify and return its display and ports"""
+        # Kill VNC server
+        await self._kill_vnc(session.display)
+
+        # Kill noVNC
+        if session.novnc_process and session.novnc_process.returncode is None:
+            try:
+                session.novnc_process.terminate()
+                await asyncio.wait_for(session.novnc_process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                session.novnc_process.kill()
+            except ProcessLookupError:
                 pass
-            raise HTTPException(status_code=500, detail=str(e))
+
+        # Return resources
+        self.display_pool.append(session.display)
+        self.vnc_port_pool.append(session.vnc_port)
+        self.web_port_pool.append(session.web_port)
+
+    def wake_pool(self):
+        self._pool_event.set()
+
+    def pool_target(self) -> int:
+        """Spare sessions needed to cover WARM_POOL_LEAD_SECONDS of recent demand"""
+        now = time.monotonic()
+        while self._demand and now - self._demand[0] > WARM_POOL_DEMAND_WINDOW_SECONDS:
+            self._demand.popleft()
+        rate = len(self._demand) / WARM_POOL_DEMAND_WINDOW_SECONDS
+        return max(WARM_POOL_MIN, min(WARM_POOL_MAX, math.ceil(rate * WARM_POOL_LEAD_SECONDS)))
+
+    async def maintain_pool(self):
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._pool_event.wait(), timeout=WARM_POOL_REFILL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._pool_event.clear()
+                await self._refill_pool()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Warm pool maintenance error: {e}")
+
+    async def _refill_pool(self):
+        target = self.pool_target()
+        spare = len(self.warm_sessions) + self._warming
+        if spare > target and self.warm_sessions:
+            # Shrink gradually: one spare per pass once demand drops
+            await self._teardown(self.warm_sessions.pop(0))
+            return
+        missing = target - spare
+        while missing > 0 and len(self.sessions) + self._starting + spare < MAX_SESSIONS and self._resource_ok():
+            self._warming += 1
+            spare += 1
+            missing -= 1
+            asyncio.create_task(self._warm_one())
+
+    async def _warm_one(self):
+        try:
+            session = await self._start_session()
+            self.warm_sessions.append(session)
+        except Exception as e:
+            logger.warning(f"Failed to pre-start warm session: {getattr(e, 'detail', e)}")
+        finally:
+            self._warming -= 1
+
+    async def shutdown_pool(self):
+        warm, self.warm_sessions = self.warm_sessions, []
+        for session in warm:
+            await self._teardown(session)
+
+    def pool_stats(self) -> Dict:
+        requests = self.pool_hits + self.pool_misses
+        startup = list(self.startup_seconds)
+        return {
+            "warm": len(self.warm_sessions),
+            "warming": self._warming,
+            "starting": self._starting,
+            "target": self.pool_target(),
+            "min": WARM_POOL_MIN,
+            "max": WARM_POOL_MAX,
+            "hits": self.pool_hits,
+            "misses": self.pool_misses,
+            "hit_rate": round(self.pool_hits / requests, 3) if requests else None,
+            "allocation_ms": {
+                "p50": _percentile(self.allocation_ms, 0.5),
+                "p95": _percentile(self.allocation_ms, 0.95),
+                "p99": _percentile(self.allocation_ms, 0.99),
+                "max": round(max(self.allocation_ms), 1) if self.allocation_ms else None,
+            },
+            "startup_seconds_avg": round(sum(startup) / len(startup), 2) if startup else None,
+        }
 
     async def destroy_session(self, session_id: str):
         session = self.sessions.get(session_id)
         if not session:
             # Attempt to fetch from Redis to free pools if present (best-effort)
-            data = redis_client.get(f"session:{session_id}")
-            if not data:
+            payload = await session_store.pop(session_id)
+            if not payload:
                 return
             try:
-                payload = json.loads(data)
                 display = int(payload.get("display"))
                 vnc_port = int(payload.get("vnc_port"))
                 web_port = int(payload.get("web_port"))
             except Exception:
                 return
             # Kill VNC
-            subprocess.run(["vncserver", "-kill", f":{display}"], check=False)
+            await self._kill_vnc(display)
             # Return pools
             self.display_pool.append(display)
             self.vnc_port_pool.append(vnc_port)
             self.web_port_pool.append(web_port)
-            # Cleanup Redis
-            redis_client.delete(f"session:{session_id}")
-            if payload.get("user_id"):
-                redis_client.delete(f"user_session:{payload['user_id']}")
             return
 
-        # Kill VNC server
-        try:
-            subprocess.run(["vncserver", "-kill", f":{session.display}"], check=False)
-        except Exception:
-            pass
-
-        # Kill noVNC
-        if session.pid_novnc:
-            try:
-                os.kill(session.pid_novnc, 15)
-            except Exception:
-                pass
-
-        # Return resources
-        self.display_pool.append(session.display)
-        self.vnc_port_pool.append(session.vnc_port)
-        self.web_port_pool.append(session.web_port)
+        await self._teardown(session)
 
         # Cleanup Redis
-        redis_client.delete(f"session:{session_id}")
-        redis_client.delete(f"user_session:{session.user_id}")
+        await session_store.delete(session_id, session.user_id)
 
         # Remove from memory
         del self.sessions[session_id]
@@ -295,19 +549,16 @@ def external_host() -> str:
 @app.post("/api/sessions/create")
 async def create_session(request: SessionRequest, background_tasks: BackgroundTasks):
     # Reuse existing session for user if available
-    existing_id = redis_client.get(f"user_session:{request.user_id}")
-    if existing_id:
-        payload = redis_client.get(f"session:{existing_id}")
-        if payload:
-            data = json.loads(payload)
-            # Touch last_accessed
-            s = session_manager.sessions.get(existing_id)
-            if s:
-                s.last_accessed = datetime.utcnow()
-            host = external_host()
-            data["vnc_url"] = f"ws://{host}:{data['web_port']}/websockify"
-            data["web_url"] = f"http://{host}:{data['web_port']}/vnc.html"
-            return data
+    data = await session_store.get_for_user(request.user_id)
+    if data:
+        # Touch last_accessed
+        s = session_manager.sessions.get(data["session_id"])
+        if s:
+            s.last_accessed = datetime.utcnow()
+        host = external_host()
+        data["vnc_url"] = f"ws://{host}:{data['web_port']}/websockify"
+        data["web_url"] = f"http://{host}:{data['web_port']}/vnc.html"
+        return data
 
     # Create new session
     session = await session_manager.create_session(request.user_id, request.task_id)
@@ -336,10 +587,9 @@ async def destroy_session(session_id: str):
 
 @app.get("/api/sessions/{session_id}")
 async def get_session(session_id: str):
-    payload = redis_client.get(f"session:{session_id}")
-    if not payload:
+    data = await session_store.get(session_id)
+    if not data:
         raise HTTPException(status_code=404, detail="Session not found")
-    data = json.loads(payload)
     host = external_host()
     data["vnc_url"] = f"ws://{host}:{data['web_port']}/websockify"
     data["web_url"] = f"http://{host}:{data['web_port']}/vnc.html"
@@ -368,6 +618,10 @@ async def queue_status():
     # Stub for now (no queue implemented in Phase A)
     return {"position": 0, "total": 0}
 
+@app.get("/api/sessions/pool/stats")
+async def pool_stats():
+    return session_manager.pool_stats()
+
 @app.get("/api/sessions/stats")
 async def stats():
     return {
@@ -383,6 +637,7 @@ async def health():
         "status": "healthy",
         "active_sessions": len(session_manager.sessions),
         "available_displays": len(session_manager.display_pool),
+        "warm_sessions": len(session_manager.warm_sessions),
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -406,3 +661,12 @@ async def periodic_cleanup():
 async def on_startup():
     # Kick off periodic cleanup
     asyncio.create_task(periodic_cleanup())
+    # Keep spare sessions started ahead of demand
+    if WARM_POOL_MAX > 0:
+        asyncio.create_task(session_manager.maintain_pool())
+        session_manager.wake_pool()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await session_manager.shutdown_pool()
+    await session_store.close()
@@ -0,0 +1,125 @@
+"""BrowserPool sizing and recycling against a fake Playwright driver; no Chromium is launched.
+
+Run from the repository root: python -m pytest tests/test_browser_pool.py
+"""
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("playwright")
+pytest.importorskip("pydantic_settings")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+from app.config import settings  # noqa: E402
+from app.services.browser_pool import BrowserPool  # noqa: E402
+
+DISPLAY = ":42"  # not the default display, so release() does not top it up
+
+
+class FakeContext:
+    async def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        return FakeContext()
+
+    async def close(self):
+        self.connected = False
+
+
+@pytest.fixture(autouse=True)
+def pool_settings(monkeypatch):
+    monkeypatch.setattr(settings, "browser_pool_min_size", 0)
+    monkeypatch.setattr(settings, "browser_pool_max_size", 2)
+    monkeypatch.setattr(settings, "browser_pool_contexts_per_browser", 8)
+    monkeypatch.setattr(settings, "browser_pool_max_uses", 2)
+
+
+def _pool():
+    pool = BrowserPool()
+    pool.launched = []
+
+    async def launch(**kwargs):
+        browser = FakeBrowser()
+        pool.launched.append(browser)
+        return browser
+
+    pool._playwright = SimpleNamespace(chromium=SimpleNamespace(launch=launch))
+    return pool
+
+
+def _run(coro_fn):
+    asyncio.run(coro_fn(_pool()))
+
+
+def test_exhausted_browser_is_closed_once_its_contexts_drain():
+    async def check(pool):
+        first = await pool.acquire(DISPLAY)
+        second = await pool.acquire(DISPLAY)
+        assert first.pooled is second.pooled
+        assert first.pooled.retired
+
+        await pool.release(first)
+        assert first.browser.is_connected()
+        await pool.release(second)
+        assert not first.browser.is_connected()
+        assert pool.stats()["displays"][DISPLAY] == []
+        assert pool.stats_counters["recycled"] == 1
+    _run(check)
+
+
+def test_acquire_waits_for_a_slot_at_max_size(monkeypatch):
+    monkeypatch.setattr(settings, "browser_pool_max_uses", 1)
+
+    async def check(pool):
+        leases = [await pool.acquire(DISPLAY), await pool.acquire(DISPLAY)]
+        assert len(pool.launched) == 2
+
+        waiting = asyncio.create_task(pool.acquire(DISPLAY))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        assert len(pool.launched) == 2
+
+        await pool.release(leases[0])
+        lease = await asyncio.wait_for(waiting, timeout=1)
+        assert len(pool.launched) == 3
+        assert len(pool.stats()["displays"][DISPLAY]) == 2
+        assert lease.pooled is not leases[1].pooled
+    _run(check)
+
+
+def test_full_browser_is_shared_rather_than_exceeding_max_size(monkeypatch):
+    monkeypatch.setattr(settings, "browser_pool_max_uses", 50)
+    monkeypatch.setattr(settings, "browser_pool_contexts_per_browser", 1)
+
+    async def check(pool):
+        leases = [await pool.acquire(DISPLAY) for _ in range(3)]
+        assert len(pool.launched) == 2
+        assert sorted(p.active_contexts for p in pool._browsers[DISPLAY]) == [1, 2]
+        for lease in leases:
+            await pool.release(lease)
+    _run(check)
+
+
+def test_top_up_counts_draining_browsers_toward_max_size(monkeypatch):
+    monkeypatch.setattr(settings, "browser_pool_min_size", 2)
+    monkeypatch.setattr(settings, "browser_pool_max_uses", 1)
+
+    async def check(pool):
+        lease = await pool.acquire(DISPLAY)
+        assert lease.pooled.retired
+        await pool._top_up(DISPLAY)
+        assert len(pool.launched) == 2
+        assert len(pool._browsers[DISPLAY]) == 2
+    _run(check)
@@ -0,0 +1,167 @@
+"""SessionManager warm-pool sizing and capacity accounting; no VNC processes are started.
+
+Run from the repository root: python -m pytest tests/test_session_manager_pool.py
+"""
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("psutil")
+pytest.importorskip("redis")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import session_manager  # noqa: E402
+from session_manager import Session, SessionManager, _percentile  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def pool_settings(monkeypatch):
+    monkeypatch.setattr(session_manager, "WARM_POOL_MIN", 1)
+    monkeypatch.setattr(session_manager, "WARM_POOL_MAX", 5)
+    monkeypatch.setattr(session_manager, "WARM_POOL_LEAD_SECONDS", 60)
+    monkeypatch.setattr(session_manager, "WARM_POOL_DEMAND_WINDOW_SECONDS", 600)
+    monkeypatch.setattr(session_manager, "MAX_SESSIONS", 100)
+    monkeypatch.setattr(session_manager, "HOST_CPU_CORES", 1000)
+    monkeypatch.setattr(session_manager, "HOST_MEMORY_MB", 10_000_000)
+    monkeypatch.setattr(session_manager, "HOST_BANDWIDTH_MBPS", 100_000)
+
+
+def _session(n, alive=True):
+    session = Session(f"s{n}", display=n, vnc_port=5900 + n, web_port=7900 + n, user_id=None)
+    session.novnc_process = SimpleNamespace(returncode=None if alive else 1)
+    return session
+
+
+def _manager():
+    """A SessionManager whose process-level operations are recorded instead of run"""
+    manager = SessionManager()
+    manager.started = []
+    manager.torn_down = []
+
+    async def start_session(user_id=None):
+        manager.started.append(user_id)
+        return _session(100 + len(manager.started))
+
+    async def teardown(session):
+        manager.torn_down.append(session.session_id)
+
+    manager._start_session = start_session
+    manager._teardown = teardown
+    return manager
+
+
+def _run(coro_fn):
+    async def wrapper():
+        manager = _manager()
+        await coro_fn(manager)
+    asyncio.run(wrapper())
+
+
+def test_percentile():
+    assert _percentile([], 0.5) is None
+    assert _percentile([7], 0.99) == 7
+    values = list(range(1, 101))
+    assert _percentile(values, 0.5) == 51
+    assert _percentile(reversed(values), 0.95) == 96
+    assert _percentile(values, 1.0) == 100
+
+
+def test_pool_target_follows_recent_demand():
+    manager = SessionManager()
+    assert manager.pool_target() == 1
+
+    now = time.monotonic()
+    # 30 requests in a 600s window cover 60s of lead time with 3 spares
+    manager._demand.extend(now - i for i in range(30))
+    assert manager.pool_target() == 3
+
+    manager._demand.extend(now for _ in range(100))
+    assert manager.pool_target() == 5
+
+
+def test_pool_target_drops_demand_outside_the_window():
+    manager = SessionManager()
+    now = time.monotonic()
+    manager._demand.extend(now - 700 for _ in range(50))
+    manager._demand.extend(now for _ in range(20))
+    assert manager.pool_target() == 2
+    assert len(manager._demand) == 20
+
+
+def test_refill_shrinks_one_spare_per_pass():
+    async def check(manager):
+        manager.warm_sessions = [_session(1), _session(2), _session(3)]
+        await manager._refill_pool()
+        assert manager.torn_down == ["s1"]
+        assert [s.session_id for s in manager.warm_sessions] == ["s2", "s3"]
+        await manager._refill_pool()
+        assert manager.torn_down == ["s1", "s2"]
+        await manager._refill_pool()
+        assert manager.torn_down == ["s1", "s2"]
+        assert manager.started == []
+    _run(check)
+
+
+def test_refill_counts_warming_spares_toward_the_target():
+    async def check(manager):
+        manager._demand.extend(time.monotonic() for _ in range(30))
+        manager._warming = 1
+        await manager._refill_pool()
+        assert manager._warming == 3
+        await asyncio.sleep(0)
+        assert manager.started == [None, None]
+        assert len(manager.warm_sessions) == 2
+        # The pre-existing in-flight warm-up is still counted until it finishes
+        assert manager._warming == 1
+    _run(check)
+
+
+def test_refill_respects_max_sessions_including_starting(monkeypatch):
+    monkeypatch.setattr(session_manager, "MAX_SESSIONS", 4)
+
+    async def check(manager):
+        manager._demand.extend(time.monotonic() for _ in range(50))
+        manager.sessions = {"a": _session(1), "b": _session(2)}
+        manager._starting = 1
+        await manager._refill_pool()
+        await asyncio.sleep(0)
+        assert len(manager.started) == 1
+    _run(check)
+
+
+def test_resource_check_counts_spares_and_creates_in_flight(monkeypatch):
+    monkeypatch.setattr(session_manager, "HOST_CPU_CORES", 4 * session_manager.RESOURCES_PER_SESSION["cpu"])
+    manager = _manager()
+    manager.sessions = {"a": _session(1)}
+    manager.warm_sessions = [_session(2)]
+    manager._warming = 1
+    assert manager._resource_ok()
+    manager._starting = 1
+    assert not manager._resource_ok()
+    assert manager._resource_ok(extra=0)
+
+
+def test_take_warm_skips_dead_spares():
+    async def check(manager):
+        async def port_open(host, port, timeout=10.0):
+            return port != 5902
+
+        manager._wait_for_port = port_open
+        # s1: websockify exited; s2: Xvnc port closed; s3: healthy; s4 stays pooled
+        manager.warm_sessions = [_session(1, alive=False), _session(2), _session(3), _session(4)]
+        taken = await manager._take_warm()
+        assert taken.session_id == "s3"
+        assert [s.session_id for s in manager.warm_sessions] == ["s4"]
+        await asyncio.sleep(0)
+        assert manager.torn_down == ["s1", "s2"]
+    _run(check)
+
+
+def test_take_warm_empty_pool():
+    async def check(manager):
+        assert await manager._take_warm() is None
+    _run(check)
@@ -0,0 +1,68 @@
+"""SessionStore against an in-process Redis stand-in (fakeredis with Lua support).
+
+Run from the repository root: python -m pytest tests/test_session_store.py
+"""
+import asyncio
+import os
+import sys
+from datetime import timedelta
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")  # fakeredis needs it for EVAL
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from session_manager import SessionStore  # noqa: E402
+
+TTL = timedelta(hours=1)
+
+
+def _session(session_id, user_id="alice"):
+    return {"session_id": session_id, "user_id": user_id, "display": 1, "vnc_port": 5901, "web_port": 7901}
+
+
+def _run(coro_fn):
+    async def wrapper():
+        store = SessionStore(fakeredis.FakeAsyncRedis(decode_responses=True))
+        await coro_fn(store)
+    asyncio.run(wrapper())
+
+
+def test_save_and_lookup():
+    async def check(store):
+        await store.save(_session("s1"), TTL)
+        assert (await store.get("s1"))["user_id"] == "alice"
+        assert (await store.get_for_user("alice"))["session_id"] == "s1"
+        assert await store.get_for_user("bob") is None
+        assert await store.client.ttl("user_session:alice") > 0
+    _run(check)
+
+
+def test_delete_keeps_newer_user_session():
+    async def check(store):
+        await store.save(_session("old"), TTL)
+        await store.save(_session("new"), TTL)
+        await store.delete("old", "alice")
+        assert await store.get("old") is None
+        assert (await store.get_for_user("alice"))["session_id"] == "new"
+
+        await store.delete("new", "alice")
+        assert await store.get("new") is None
+        assert await store.get_for_user("alice") is None
+    _run(check)
+
+
+def test_pop_returns_payload_and_keeps_newer_user_session():
+    async def check(store):
+        await store.save(_session("old"), TTL)
+        await store.save(_session("new"), TTL)
+        popped = await store.pop("old")
+        assert popped["session_id"] == "old"
+        assert await store.get("old") is None
+        assert (await store.get_for_user("alice"))["session_id"] == "new"
+
+        assert (await store.pop("new"))["session_id"] == "new"
+        assert await store.get_for_user("alice") is None
+        assert await store.pop("missing") is None
+    _run(check)
@@ -0,0 +1,94 @@
+"""compile_steps: the task-step compiler is pure logic, no browser needed.
+
+Run from the repository root: python -m pytest tests/test_step_engine.py
+"""
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("playwright")
+pytest.importorskip("pydantic_settings")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+from app.services.step_engine import compile_steps  # noqa: E402
+
+
+def _step(action, target="", value="", description=""):
+    return {"action": action, "target": target, "value": value, "description": description}
+
+
+def test_consecutive_types_merge_into_one_fill_batch():
+    plan = compile_steps([
+        _step("type", "#from", "{{ start_location }}"),
+        _step("type", "#to", "{{ end_location }}"),
+        _step("click", "#save"),
+        _step("type", "#note", "done"),
+    ])
+    assert [op.label for op in plan.ops] == ["fill_batch[2]", "click:#save", "fill_batch[1]"]
+    assert plan.ops[0].source_indexes == [0, 1]
+    assert plan.bound_fields == ["end_location", "start_location"]
+
+
+def test_builder_delay_wait_sleeps_for_value():
+    plan = compile_steps([_step("wait", "delay", "500")])
+    (op,) = plan.ops
+    assert op.action == "wait"
+    assert op.target is None
+    assert op.value.raw == "500"
+
+
+def test_builder_element_wait_targets_the_selector_value():
+    plan = compile_steps([_step("wait", "wait_for_element", ".results")])
+    (op,) = plan.ops
+    assert op.target == ".results"
+    assert op.value.raw is None
+
+
+def test_element_wait_requires_a_selector():
+    with pytest.raises(ValueError, match="wait_for_element"):
+        compile_steps([_step("wait", "wait_for_element", "")])
+
+
+def test_adjacent_delays_are_summed():
+    plan = compile_steps([_step("wait", "delay", "300"), _step("wait", "delay", "200"), _step("wait", "delay", "0.5")])
+    (op,) = plan.ops
+    assert op.value.raw == "500.5"
+    assert op.source_indexes == [0, 1, 2]
+
+
+def test_templated_delay_is_not_merged():
+    plan = compile_steps([_step("wait", "delay", "300"), _step("wait", "delay", "{{ pause_ms }}")])
+    assert len(plan.ops) == 2
+
+
+def test_repeated_element_waits_collapse():
+    plan = compile_steps([_step("wait", "wait_for_element", "#list"), _step("wait", "wait_for_element", "#list")])
+    (op,) = plan.ops
+    assert op.source_indexes == [0, 1]
+
+
+def test_element_wait_before_click_on_same_target_is_dropped():
+    plan = compile_steps([_step("wait", "wait_for_element", "#save"), _step("click", "#save")])
+    assert [op.label for op in plan.ops] == ["click:#save"]
+
+
+def test_element_wait_before_click_elsewhere_is_kept():
+    plan = compile_steps([_step("wait", "wait_for_element", "#dialog"), _step("click", "#save")])
+    assert [op.label for op in plan.ops] == ["wait:#dialog", "click:#save"]
+
+
+def test_legacy_selector_in_target_still_waits_for_it():
+    plan = compile_steps([_step("wait", "#legacy"), _step("click", "#legacy")])
+    assert [op.label for op in plan.ops] == ["click:#legacy"]
+
+
+def test_unknown_action_and_blank_steps():
+    assert compile_steps([_step(""), _step("  ")]).ops == []
+    with pytest.raises(ValueError, match="Unsupported step action 'hover' at step 2"):
+        compile_steps([_step("click", "#a"), _step("hover", "#b")])
+
+
+def test_type_requires_target():
+    with pytest.raises(ValueError, match="requires a target"):
+        compile_steps([_step("type", "", "x")])